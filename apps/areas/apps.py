@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class AreasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.areas'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
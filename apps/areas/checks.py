@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core import checks
+
+LOCMEM = 'django.core.cache.backends.locmem.LocMemCache'
+
+
+@checks.register(checks.Tags.caches)
+def versiones_de_cache(app_configs, **kwargs):
+    """Las versiones de caché (mapa semanal, disponibilidad, calendario) deben verse en todos los workers"""
+    if settings.CACHES['default']['BACKEND'] != LOCMEM or settings.WEB_CONCURRENCY <= 1:
+        return []
+    if settings.CACHE_VERSION_SEGUNDOS is None:
+        return [checks.Error(
+            f'La caché en memoria no se comparte entre los {settings.WEB_CONCURRENCY} workers y las '
+            'versiones de caché no vencen: un worker nunca vería los cambios hechos en otro.',
+            hint='Configura REDIS_URL o un CACHE_VERSION_SEGUNDOS mayor que 0.',
+            id='areas.E001',
+        )]
+    return [checks.Warning(
+        f'La caché en memoria no se comparte entre los {settings.WEB_CONCURRENCY} workers: un cambio '
+        f'de áreas, horarios o reservas tarda hasta {settings.CACHE_VERSION_SEGUNDOS} s en verse en los demás.',
+        hint='Configura REDIS_URL para compartir la caché.',
+        id='areas.W001',
+    )]
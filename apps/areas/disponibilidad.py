@@ -0,0 +1,177 @@
+"""
+Cálculo de horarios libres de un área común.
+
+Para cada día se toma la ventana del ``Horario`` activo de ese día de la
+semana, se le restan las reservas no canceladas y las ocurrencias de series
+recurrentes (ordenadas por inicio y fusionadas en un solo barrido) y se
+conservan los huecos de al menos ``tiempo_reserva_minima`` minutos.
+
+El resultado se guarda en caché por área y día. Las claves incluyen una
+versión por área: cambiar el área o sus horarios cambia la versión (y con eso
+invalida todos sus días), y una reserva solo invalida los días que toca.
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Horario
+
+DIAS = Horario.DIAS
+MINUTOS_DIA = 24 * 60
+
+
+def _clave_version(area_id):
+    return f'disponibilidad:v:{area_id}'
+
+
+def _version(area_id):
+    version = cache.get(_clave_version(area_id))
+    if version is None:
+        version = time.time_ns()
+        cache.add(_clave_version(area_id), version, settings.CACHE_VERSION_SEGUNDOS)
+        version = cache.get(_clave_version(area_id), version)
+    return version
+
+
+def _clave_dia(area_id, version, fecha):
+    return f'disponibilidad:{area_id}:{version}:{fecha.isoformat()}'
+
+
+def invalidar_area(area_id):
+    """Invalida todos los días cacheados del área (cambió el área o su horario)"""
+    cache.set(_clave_version(area_id), time.time_ns(), settings.CACHE_VERSION_SEGUNDOS)
+
+
+def invalidar_reserva(area_id, fecha):
+    """Invalida los días afectados por una reserva del área en ``fecha``"""
+    if area_id is None or fecha is None:
+        return
+    version = _version(area_id)
+    # Una reserva que termina después de medianoche ocupa también el día siguiente
+    cache.delete_many([
+        _clave_dia(area_id, version, fecha),
+        _clave_dia(area_id, version, fecha + timedelta(days=1)),
+    ])
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def _hora(minutos):
+    return f'{minutos // 60:02d}:{minutos % 60:02d}'
+
+
+def huecos(inicio, fin, ocupados, minimo=0):
+    """Tramos libres de [inicio, fin) descontando los intervalos ``ocupados``"""
+    libres = []
+    cursor = inicio
+    for ocupado_inicio, ocupado_fin in sorted(ocupados):
+        if ocupado_fin <= cursor:
+            continue
+        if ocupado_inicio >= fin:
+            break
+        if ocupado_inicio - cursor >= max(minimo, 1):
+            libres.append((cursor, ocupado_inicio))
+        cursor = max(cursor, ocupado_fin)
+    if fin - cursor >= max(minimo, 1):
+        libres.append((cursor, fin))
+    return libres
+
+
+def _ocupacion(reservas, desde, hasta):
+    """{fecha: [(inicio, fin), ...]} en minutos, partiendo las reservas que cruzan medianoche"""
+    ocupacion = {}
+    for fecha, hora_inicio, hora_fin in reservas:
+        inicio, fin = _minutos(hora_inicio), _minutos(hora_fin)
+        if fin > inicio:
+            tramos = [(fecha, inicio, fin)]
+        else:
+            tramos = [(fecha, inicio, MINUTOS_DIA), (fecha + timedelta(days=1), 0, fin)]
+        for dia, a, b in tramos:
+            if desde <= dia <= hasta and b > a:
+                ocupacion.setdefault(dia, []).append((a, b))
+    return ocupacion
+
+
+def _calcular(area, fechas):
+    """Disponibilidad sin caché de ``fechas`` (lista ordenada)"""
+    from apps.reserva_pagos import series
+    from apps.reserva_pagos.models import Reserva
+
+    desde, hasta = fechas[0], fechas[-1]
+    ventanas = {
+        h.dia_numero: (h.hora_apertura, h.hora_cierre)
+        for h in Horario.objects.filter(area=area, activo=True)
+    }
+    reservas = (
+        Reserva.objects
+        .filter(
+            area=area,
+            fecha_reserva__range=(desde - timedelta(days=1), hasta),
+            hora_inicio__isnull=False,
+            hora_fin__isnull=False,
+        )
+        .exclude(estado='cancelada')
+        .values_list('fecha_reserva', 'hora_inicio', 'hora_fin')
+    )
+    # Ocurrencias de series todavía no materializadas
+    recurrentes = [
+        (fecha, serie.hora_inicio, serie.hora_fin)
+        for fecha, _, serie in series.virtuales(
+            series.activas_del_area(area.pk, desde - timedelta(days=1), hasta), desde - timedelta(days=1), hasta
+        )
+    ]
+    ocupacion = _ocupacion([*reservas, *recurrentes], desde, hasta)
+    abierta = area.activo and area.estado == 'disponible'
+    minimo = area.tiempo_reserva_minima or 0
+
+    dias = {}
+    for fecha in fechas:
+        dia_semana = DIAS[fecha.weekday()]
+        ventana = ventanas.get(fecha.weekday()) if abierta else None
+        libres = []
+        if ventana:
+            inicio, fin = _minutos(ventana[0]), _minutos(ventana[1])
+            libres = [
+                {'inicio': _hora(a), 'fin': _hora(b), 'minutos': b - a}
+                for a, b in huecos(inicio, fin, ocupacion.get(fecha, []), minimo)
+            ]
+        dias[fecha] = {
+            'fecha': fecha.isoformat(),
+            'dia_semana': dia_semana,
+            'horario': {'apertura': _hora(_minutos(ventana[0])), 'cierre': _hora(_minutos(ventana[1]))}
+            if ventana else None,
+            'libres': libres,
+        }
+    return dias
+
+
+def disponibilidad(area, desde, hasta):
+    """Lista de días de ``desde`` a ``hasta`` (inclusive) con sus tramos libres"""
+    fechas = [desde + timedelta(days=i) for i in range((hasta - desde).days + 1)]
+    version = _version(area.pk)
+    claves = {fecha: _clave_dia(area.pk, version, fecha) for fecha in fechas}
+    en_cache = cache.get_many(list(claves.values()))
+    dias = {fecha: en_cache[clave] for fecha, clave in claves.items() if clave in en_cache}
+
+    faltantes = [fecha for fecha in fechas if fecha not in dias]
+    if faltantes:
+        calculados = _calcular(area, faltantes)
+        cache.set_many(
+            {claves[fecha]: dia for fecha, dia in calculados.items()},
+            settings.DISPONIBILIDAD_CACHE_SEGUNDOS,
+        )
+        dias.update(calculados)
+
+    return {
+        'area': area.pk,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'estado': area.estado,
+        'duracion_minima': area.tiempo_reserva_minima,
+        'duracion_maxima': area.tiempo_reserva_maxima,
+        'dias': [dias[fecha] for fecha in fechas],
+    }
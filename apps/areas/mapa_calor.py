@@ -0,0 +1,155 @@
+"""
+Mapa de calor de ocupación de las áreas: día de la semana x hora.
+
+La base devuelve las reservas del período ya reducidas a enteros (área, día
+de la semana, minuto de inicio, minuto de fin, cantidad), se agregan las
+ocurrencias no materializadas de las series activas agrupadas igual, y con
+NumPy se acumulan todas de una vez con un arreglo de diferencias por área sobre los 7 x 1440 minutos
+de la semana: +1 en el minuto de inicio, -1 en el de fin, ``cumsum`` y se
+suman los minutos de cada hora. Las que cruzan la medianoche del domingo
+caen en una franja extra de un día que se pliega sobre el lunes.
+
+La ocupación de una celda es minutos reservados / minutos que esa hora tuvo
+en el período (60 x cantidad de ese día de la semana). El resultado se
+guarda en caché por período.
+"""
+from collections import Counter
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from .models import AreaComun, Horario
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+# La semana más un día para las reservas del domingo que terminan el lunes
+ANCHO = MINUTOS_SEMANA + MINUTOS_DIA
+
+
+def _intervalos(desde, hasta, area_id=None):
+    """Arreglo (n, 5) de int64: área, día (0 = Lunes), minuto de inicio, duración, reservas.
+
+    Las reservas con el mismo área, día y horario llegan agrupadas en una fila
+    con su cantidad: años de reservas en franjas repetidas son pocas filas.
+    Incluye las ocurrencias virtuales de las series (``_intervalos_series``).
+    """
+    from apps.reserva_pagos.models import Reserva
+
+    tabla = connection.ops.quote_name(Reserva._meta.db_table)
+    filtro_area = 'AND area_id = %s' if area_id is not None else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT area_id,
+                   EXTRACT(ISODOW FROM fecha_reserva)::int - 1,
+                   (EXTRACT(EPOCH FROM hora_inicio) / 60)::int,
+                   (EXTRACT(EPOCH FROM hora_fin) / 60)::int,
+                   COUNT(*)
+            FROM {tabla}
+            WHERE fecha_reserva BETWEEN %s AND %s
+              AND estado <> 'cancelada'
+              AND hora_inicio IS NOT NULL AND hora_fin IS NOT NULL
+              {filtro_area}
+            GROUP BY 1, 2, 3, 4
+            """,
+            [desde, hasta] + ([area_id] if area_id is not None else []),
+        )
+        filas = np.array(cursor.fetchall(), dtype=np.int64).reshape(-1, 5)
+    filas = np.concatenate([filas, _intervalos_series(desde, hasta, area_id)])
+    # Si hora_fin no es posterior a hora_inicio la reserva sigue al día siguiente
+    duracion = (filas[:, 3] - filas[:, 2]) % MINUTOS_DIA
+    filas[:, 3] = np.where(duracion == 0, MINUTOS_DIA, duracion)
+    return filas
+
+
+def _intervalos_series(desde, hasta, area_id=None):
+    """Filas como las de ``_intervalos`` para las ocurrencias no materializadas de las series activas.
+
+    Las materializadas ya están entre las reservas guardadas (``series.virtuales`` las omite).
+    """
+    from apps.reserva_pagos import series
+    from apps.reserva_pagos.models import SerieReserva
+
+    activas = SerieReserva.objects.filter(estado='activa', fecha_inicio__lte=hasta).filter(
+        Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=desde)
+    )
+    if area_id is not None:
+        activas = activas.filter(area_id=area_id)
+    cuenta = Counter(
+        (serie.area_id, fecha.weekday(), hora_inicio.hour * 60 + hora_inicio.minute,
+         serie.hora_fin.hour * 60 + serie.hora_fin.minute)
+        for fecha, hora_inicio, serie in series.virtuales(activas, desde, hasta)
+    )
+    return np.array([(*clave, n) for clave, n in cuenta.items()], dtype=np.int64).reshape(-1, 5)
+
+
+def _dias_semana(desde, hasta):
+    """Cuántas veces aparece cada día de la semana en [desde, hasta]"""
+    dias = (hasta - desde).days + 1
+    cuenta = np.full(7, dias // 7, dtype=np.int64)
+    for i in range(dias % 7):
+        cuenta[(desde + timedelta(days=i)).weekday()] += 1
+    return cuenta
+
+
+def calcular(desde, hasta, area_id=None):
+    """{area_id: {'reservas', 'minutos' (7x24), 'ocupacion' (7x24)}} sin caché"""
+    filas = _intervalos(desde, hasta, area_id)
+    area_ids, indice = np.unique(filas[:, 0], return_inverse=True)
+    if area_ids.size == 0:
+        return {}
+
+    inicio = filas[:, 1] * MINUTOS_DIA + filas[:, 2]
+    fin = inicio + filas[:, 3]
+    cantidad = filas[:, 4]
+    base = indice * (ANCHO + 1)
+    total = area_ids.size * (ANCHO + 1)
+    diferencias = (
+        np.bincount(base + inicio, weights=cantidad, minlength=total)
+        - np.bincount(base + fin, weights=cantidad, minlength=total)
+    ).astype(np.int64).reshape(area_ids.size, ANCHO + 1)
+    ocupados = np.cumsum(diferencias, axis=1)[:, :ANCHO]
+    semana = ocupados[:, :MINUTOS_SEMANA].copy()
+    semana[:, :MINUTOS_DIA] += ocupados[:, MINUTOS_SEMANA:]
+
+    minutos = semana.reshape(area_ids.size, 7, 24, 60).sum(axis=3)
+    disponibles = np.broadcast_to((_dias_semana(desde, hasta) * 60)[None, :, None], minutos.shape)
+    # Un período de menos de una semana no tiene todos los días: ocupación 0
+    ocupacion = np.round(
+        np.divide(minutos, disponibles, out=np.zeros(minutos.shape), where=disponibles > 0), 4
+    )
+    reservas = np.bincount(indice, weights=cantidad, minlength=area_ids.size).astype(np.int64)
+
+    return {
+        int(area): {
+            'reservas': int(reservas[i]),
+            'minutos': minutos[i].tolist(),
+            'ocupacion': ocupacion[i].tolist(),
+        }
+        for i, area in enumerate(area_ids)
+    }
+
+
+def mapa_calor(desde, hasta, area_id=None):
+    """Mapa de calor del período por área (con caché por período)"""
+    clave = f'areas:mapa_calor:{desde.isoformat()}:{hasta.isoformat()}:{area_id or "todas"}'
+    resultado = cache.get(clave)
+    if resultado is None:
+        por_area = calcular(desde, hasta, area_id)
+        nombres = dict(AreaComun.objects.filter(id__in=list(por_area)).values_list('id', 'nombre'))
+        areas = []
+        for area, datos in sorted(por_area.items()):
+            pico = int(np.argmax(datos['minutos']))
+            areas.append({
+                'area': area,
+                'nombre': nombres.get(area),
+                **datos,
+                'pico': {'dia': Horario.DIAS[pico // 24], 'hora': pico % 24},
+            })
+        resultado = {'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'dias': Horario.DIAS, 'areas': areas}
+        cache.set(clave, resultado, settings.MAPA_CALOR_CACHE_SEGUNDOS)
+    return resultado
@@ -0,0 +1,112 @@
+"""
+Mapa semanal de apertura de las áreas, en memoria del proceso.
+
+Cada área tiene un entero de 7 x 1440 bits: el bit ``dia * 1440 + minuto`` está
+encendido si el área abre en ese minuto de la semana (dia 0 = Lunes). Saber si
+un área está abierta es probar un bit, y saber si un rango entra en su horario
+es comparar con una máscara.
+
+Junto al mapa se guardan las reglas de reserva del área (costo por hora,
+capacidad, duración mínima y máxima), así validar y cotizar una reserva no
+consulta la base.
+
+El mapa se reconstruye (dos consultas) cuando cambia la versión guardada en la
+caché compartida; los cambios de ``AreaComun`` u ``Horario`` la renuevan. Sin
+Redis la versión vence a los ``CACHE_VERSION_SEGUNDOS``: es lo que tarda un
+worker en ver un cambio hecho en otro.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import AreaComun, Horario
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+CLAVE_VERSION = 'areas:mapa_semanal:v'
+
+_bloqueo = threading.Lock()
+_estado = {'version': None, 'areas': {}}
+
+
+def invalidar_mapa():
+    cache.set(CLAVE_VERSION, time.time_ns(), settings.CACHE_VERSION_SEGUNDOS)
+
+
+def _version_actual():
+    version = cache.get(CLAVE_VERSION)
+    if version is None:
+        cache.add(CLAVE_VERSION, time.time_ns(), settings.CACHE_VERSION_SEGUNDOS)
+        version = cache.get(CLAVE_VERSION)
+    return version
+
+
+def _minuto_semana(dia, hora):
+    return dia * MINUTOS_DIA + hora.hour * 60 + hora.minute
+
+
+def _mascara(inicio, duracion):
+    """Bits [inicio, inicio + duracion) dando la vuelta al final de la semana"""
+    inicio %= MINUTOS_SEMANA
+    duracion = min(duracion, MINUTOS_SEMANA)
+    if inicio + duracion <= MINUTOS_SEMANA:
+        return ((1 << duracion) - 1) << inicio
+    resto = inicio + duracion - MINUTOS_SEMANA
+    return (((1 << (MINUTOS_SEMANA - inicio)) - 1) << inicio) | ((1 << resto) - 1)
+
+
+def _construir():
+    areas = {
+        a['id']: {**a, 'mapa': 0, 'con_horario': False}
+        for a in AreaComun.objects.values(
+            'id', 'nombre', 'estado', 'activo', 'requiere_reserva', 'capacidad_maxima',
+            'costo_reserva', 'tiempo_reserva_minima', 'tiempo_reserva_maxima',
+        )
+    }
+    for h in Horario.objects.values('area_id', 'dia_numero', 'hora_apertura', 'hora_cierre', 'activo'):
+        area = areas.get(h['area_id'])
+        if area is None:
+            continue
+        area['con_horario'] = True
+        if not h['activo']:
+            continue
+        inicio = _minuto_semana(h['dia_numero'], h['hora_apertura'])
+        fin = _minuto_semana(h['dia_numero'], h['hora_cierre'])
+        area['mapa'] |= _mascara(inicio, fin - inicio)
+    return areas
+
+
+def areas():
+    """{area_id: {'nombre', 'estado', 'activo', reglas de reserva, 'mapa', 'con_horario'}} al día"""
+    version = _version_actual()
+    if _estado['version'] != version:
+        with _bloqueo:
+            if _estado['version'] != version:
+                _estado['areas'] = _construir()
+                _estado['version'] = version
+    return _estado['areas']
+
+
+def abierta(area, momento):
+    """¿El área está disponible y dentro de su horario en ``momento`` (hora local)?"""
+    if not area['activo'] or area['estado'] != 'disponible':
+        return False
+    bit = _minuto_semana(momento.weekday(), momento)
+    return bool(area['mapa'] >> bit & 1)
+
+
+def rango_en_horario(area_id, fecha, hora_inicio, hora_fin):
+    """¿[hora_inicio, hora_fin) de ``fecha`` entra en el horario del área?
+
+    Si ``hora_fin`` no es posterior a ``hora_inicio`` el rango sigue al día
+    siguiente. Las áreas sin ningún horario cargado no tienen restricción.
+    """
+    area = areas().get(area_id)
+    if area is None or not area['con_horario']:
+        return True
+    inicio = _minuto_semana(fecha.weekday(), hora_inicio)
+    duracion = (_minuto_semana(fecha.weekday(), hora_fin) - inicio) % MINUTOS_DIA or MINUTOS_DIA
+    mascara = _mascara(inicio, duracion)
+    return area['mapa'] & mascara == mascara
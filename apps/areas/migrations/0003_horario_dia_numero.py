@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+DIAS = ['Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo']
+
+
+def llenar_dia_numero(apps, schema_editor):
+    Horario = apps.get_model('areas', 'Horario')
+    for numero, dia in enumerate(DIAS):
+        Horario.objects.filter(dia_semana=dia).update(dia_numero=numero)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0002_areacomun_capacidad_maxima_areacomun_costo_reserva_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='horario',
+            options={'ordering': ['dia_numero', 'hora_apertura'], 'verbose_name': 'Horario', 'verbose_name_plural': 'Horarios'},
+        ),
+        migrations.AddField(
+            model_name='horario',
+            name='dia_numero',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='0 = Lunes ... 6 = Domingo'),
+        ),
+        migrations.RunPython(llenar_dia_numero, migrations.RunPython.noop),
+    ]
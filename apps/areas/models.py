@@ -59,8 +59,11 @@ class Horario(models.Model):
         ('Domingo', 'Domingo'),
     ]
     
+    DIAS = [dia for dia, _ in DIAS_CHOICES]  # índice = date.weekday() (0 = Lunes)
+    
     area = models.ForeignKey(AreaComun, on_delete=models.CASCADE, related_name='horarios')
     dia_semana = models.CharField(max_length=20, choices=DIAS_CHOICES)
+    dia_numero = models.PositiveSmallIntegerField(default=0, editable=False, help_text="0 = Lunes ... 6 = Domingo")
     hora_apertura = models.TimeField()
     hora_cierre = models.TimeField()
     
@@ -70,10 +73,14 @@ class Horario(models.Model):
     actualizado = models.DateTimeField(auto_now=True)
 
     class Meta:
-        ordering = ['dia_semana', 'hora_apertura']
+        ordering = ['dia_numero', 'hora_apertura']
         verbose_name = 'Horario'
         verbose_name_plural = 'Horarios'
         unique_together = ['area', 'dia_semana'] 
 
+    def save(self, *args, **kwargs):
+        self.dia_numero = self.DIAS.index(self.dia_semana)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.area.nombre} - {self.dia_semana}: {self.hora_apertura} - {self.hora_cierre}"
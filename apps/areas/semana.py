@@ -0,0 +1,78 @@
+"""
+Carga del horario semanal completo de una o varias áreas.
+
+Se compara la semana pedida con los ``Horario`` existentes y los cambios se
+aplican con un ``bulk_create`` y un ``bulk_update`` dentro de una sola
+transacción. Como esas operaciones no disparan señales, las cachés de
+disponibilidad y el mapa semanal se invalidan aquí.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .disponibilidad import invalidar_area
+from .mapa_semanal import invalidar_mapa
+from .models import Horario
+
+
+def semana_de(area):
+    """{dia_semana: (apertura, cierre)} con los horarios activos del área"""
+    return {
+        h.dia_semana: (h.hora_apertura, h.hora_cierre)
+        for h in area.horarios.filter(activo=True)
+    }
+
+
+def aplicar_semana(area_ids, semana):
+    """Deja a cada área de ``area_ids`` con exactamente la ``semana`` indicada.
+
+    ``semana`` es {dia_semana: (hora_apertura, hora_cierre)}. Los días que ya
+    existen se actualizan (y se reactivan), los nuevos se crean y los que no
+    están en ``semana`` se desactivan.
+    """
+    ahora = timezone.now()
+    existentes = {
+        (h.area_id, h.dia_semana): h
+        for h in Horario.objects.filter(area_id__in=area_ids)
+    }
+    crear, actualizar = [], []
+    for area_id in area_ids:
+        for dia in Horario.DIAS:
+            horario = existentes.get((area_id, dia))
+            if dia in semana:
+                apertura, cierre = semana[dia]
+                if horario is None:
+                    crear.append(Horario(
+                        area_id=area_id,
+                        dia_semana=dia,
+                        dia_numero=Horario.DIAS.index(dia),
+                        hora_apertura=apertura,
+                        hora_cierre=cierre,
+                        creado=ahora,
+                    ))
+                elif (horario.hora_apertura, horario.hora_cierre, horario.activo) != (apertura, cierre, True):
+                    horario.hora_apertura, horario.hora_cierre, horario.activo = apertura, cierre, True
+                    horario.actualizado = ahora
+                    actualizar.append(horario)
+            elif horario is not None and horario.activo:
+                horario.activo = False
+                horario.actualizado = ahora
+                actualizar.append(horario)
+
+    with transaction.atomic():
+        Horario.objects.bulk_create(crear)
+        Horario.objects.bulk_update(
+            actualizar, ['hora_apertura', 'hora_cierre', 'activo', 'actualizado']
+        )
+
+        def invalidar():
+            for area_id in area_ids:
+                invalidar_area(area_id)
+            invalidar_mapa()
+
+        transaction.on_commit(invalidar)
+
+    return {
+        'creados': len(crear),
+        'actualizados': sum(1 for h in actualizar if h.activo),
+        'desactivados': sum(1 for h in actualizar if not h.activo),
+    }
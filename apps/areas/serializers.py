@@ -12,6 +12,7 @@ class HorarioSerializer(serializers.ModelSerializer):
             "area",
             "area_nombre",
             "dia_semana",
+            "dia_numero",
             "hora_apertura",
             "hora_cierre",
             "activo",
@@ -53,6 +54,39 @@ class HorarioCreateSerializer(serializers.ModelSerializer):
         return attrs
 
 
+class DiaSemanaSerializer(serializers.Serializer):
+    dia_semana = serializers.ChoiceField(choices=Horario.DIAS_CHOICES)
+    hora_apertura = serializers.TimeField()
+    hora_cierre = serializers.TimeField()
+
+    def validate(self, attrs):
+        if attrs["hora_apertura"] >= attrs["hora_cierre"]:
+            raise serializers.ValidationError(
+                {"hora_cierre": "La hora de cierre debe ser mayor que la de apertura."}
+            )
+        return attrs
+
+
+class SemanaSerializer(serializers.Serializer):
+    """Semana completa de un área: los días que no vengan quedan desactivados"""
+    horarios = DiaSemanaSerializer(many=True)
+
+    def validate_horarios(self, value):
+        dias = [h["dia_semana"] for h in value]
+        repetidos = sorted({d for d in dias if dias.count(d) > 1})
+        if repetidos:
+            raise serializers.ValidationError(
+                f"Días repetidos: {', '.join(repetidos)}."
+            )
+        return value
+
+    def semana(self):
+        return {
+            h["dia_semana"]: (h["hora_apertura"], h["hora_cierre"])
+            for h in self.validated_data["horarios"]
+        }
+
+
 class ReglaSerializer(serializers.ModelSerializer):
     areas_ids = serializers.PrimaryKeyRelatedField(
         many=True, source="areas", queryset=AreaComun.objects.all(), required=False
@@ -0,0 +1,92 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .disponibilidad import invalidar_area, invalidar_reserva
+from .mapa_semanal import invalidar_mapa
+from .models import AreaComun, Horario
+
+
+@receiver(post_init, sender=AreaComun)
+def area_cargada(sender, instance, **kwargs):
+    # Sin leer campos diferidos (.only()/.defer() harían una consulta por instancia)
+    instance._estado_original = instance.__dict__.get('estado')
+
+
+@receiver(post_save, sender=AreaComun)
+@receiver(post_delete, sender=AreaComun)
+def area_cambiada(sender, instance, **kwargs):
+    invalidar_area(instance.pk)
+    invalidar_mapa()
+
+
+@receiver(post_save, sender=AreaComun)
+def area_cerrada(sender, instance, created, **kwargs):
+    """Al pasar a mantenimiento o cerrado se cancelan en bloque sus reservas futuras"""
+    from apps.reserva_pagos.cierres import ESTADOS_CIERRE, cerrar_area
+
+    original, instance._estado_original = getattr(instance, '_estado_original', None), instance.estado
+    if not created and instance.estado in ESTADOS_CIERRE and original not in ESTADOS_CIERRE:
+        # Los conteos quedan en la instancia para que la vista los devuelva
+        instance.cierre = cerrar_area(instance.pk)
+
+
+@receiver(post_save, sender=Horario)
+@receiver(post_delete, sender=Horario)
+def horario_cambiado(sender, instance, **kwargs):
+    invalidar_area(instance.area_id)
+    invalidar_mapa()
+
+
+@receiver(post_init, sender='reserva_pagos.Reserva')
+def reserva_cargada(sender, instance, **kwargs):
+    # Área y fecha originales: si se mueve la reserva hay que liberar el día anterior
+    instance._disponibilidad_original = (instance.area_id, instance.fecha_reserva)
+
+
+@receiver(post_save, sender='reserva_pagos.Reserva')
+@receiver(post_delete, sender='reserva_pagos.Reserva')
+def reserva_cambiada(sender, instance, **kwargs):
+    from apps.reserva_pagos.calendario import invalidar_meses
+
+    actual = (instance.area_id, instance.fecha_reserva)
+    original = getattr(instance, '_disponibilidad_original', actual)
+    instance._disponibilidad_original = actual
+
+    # Después del COMMIT: antes, otra petición volvería a cachear los datos viejos
+    def invalidar():
+        invalidar_reserva(*actual)
+        if original != actual:
+            invalidar_reserva(*original)
+        invalidar_meses([actual[1], original[1]])
+
+    transaction.on_commit(invalidar)
+
+
+@receiver(post_save, sender='reserva_pagos.SerieReserva')
+@receiver(post_delete, sender='reserva_pagos.SerieReserva')
+def serie_cambiada(sender, instance, **kwargs):
+    from apps.reserva_pagos.calendario import invalidar_todo
+
+    # Una serie ocupa días sin límite: se invalida toda el área y todos los meses
+    area_id = instance.area_id
+
+    def invalidar():
+        invalidar_area(area_id)
+        invalidar_todo()
+
+    transaction.on_commit(invalidar)
+
+
+@receiver(post_save, sender='reserva_pagos.ExcepcionSerie')
+@receiver(post_delete, sender='reserva_pagos.ExcepcionSerie')
+def excepcion_cambiada(sender, instance, **kwargs):
+    from apps.reserva_pagos.calendario import invalidar_meses
+
+    area_id, fecha = instance.serie.area_id, instance.fecha
+
+    def invalidar():
+        invalidar_reserva(area_id, fecha)
+        invalidar_meses([fecha])
+
+    transaction.on_commit(invalidar)
@@ -1,3 +1,54 @@
+from datetime import date, time
+
 from django.test import TestCase
 
-# Create your tests here.
+from apps.reserva_pagos.models import ExcepcionSerie, Reserva, SerieReserva
+from apps.residentes.models import Residente
+from . import mapa_calor
+from .models import AreaComun
+
+
+class MapaCalorSeriesTests(TestCase):
+    """El mapa de calor cuenta las ocurrencias de las series, sin duplicar las materializadas"""
+
+    def setUp(self):
+        self.area = AreaComun.objects.create(nombre='Cancha', requiere_reserva=True)
+        self.residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='88001', sexo='F', tipo='PROPIETARIO')
+
+    def _reserva(self, fecha, hora_inicio, hora_fin, **extra):
+        return Reserva.objects.create(
+            area=self.area, residente=self.residente, fecha_reserva=fecha,
+            hora_inicio=hora_inicio, hora_fin=hora_fin, estado='confirmada', **extra,
+        )
+
+    def test_ocurrencias_de_series(self):
+        # Martes 7, 14, 21 y 28 de enero de 2025, de 18 a 20
+        serie = SerieReserva.objects.create(
+            residente=self.residente, area=self.area, hora_inicio=time(18), hora_fin=time(20),
+            frecuencia='semanal', dias_semana=[1], fecha_inicio=date(2025, 1, 1),
+        )
+        self._reserva(date(2025, 1, 14), time(18), time(20), serie=serie)
+        ExcepcionSerie.objects.create(serie=serie, fecha=date(2025, 1, 21))
+        self._reserva(date(2025, 1, 8), time(10), time(11))
+        SerieReserva.objects.create(
+            residente=self.residente, area=self.area, hora_inicio=time(7), hora_fin=time(8),
+            frecuencia='diaria', fecha_inicio=date(2025, 1, 1), estado='cancelada',
+        )
+
+        datos = mapa_calor.calcular(date(2025, 1, 1), date(2025, 1, 31))[self.area.pk]
+
+        # 7 y 28 virtuales, 14 materializada, 21 con excepción; más la reserva suelta
+        self.assertEqual(datos['reservas'], 4)
+        self.assertEqual(datos['minutos'][1][18], 3 * 60)
+        self.assertEqual(datos['minutos'][1][19], 3 * 60)
+        self.assertEqual(datos['minutos'][2][10], 60)
+        self.assertEqual(sum(map(sum, datos['minutos'])), 7 * 60)
+
+    def test_filtro_por_area(self):
+        otra = AreaComun.objects.create(nombre='Piscina', requiere_reserva=True)
+        SerieReserva.objects.create(
+            residente=self.residente, area=otra, hora_inicio=time(9), hora_fin=time(10),
+            frecuencia='diaria', fecha_inicio=date(2025, 1, 1),
+        )
+        self.assertEqual(mapa_calor.calcular(date(2025, 1, 1), date(2025, 1, 7), self.area.pk), {})
+        self.assertEqual(mapa_calor.calcular(date(2025, 1, 1), date(2025, 1, 7), otra.pk)[otra.pk]['reservas'], 7)
@@ -1,5 +1,10 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.shortcuts import render
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -9,14 +14,32 @@ from .serializers import (
     AreaComunSerializer, 
     ReglaSerializer, 
     HorarioSerializer,
-    HorarioCreateSerializer
+    HorarioCreateSerializer,
+    SemanaSerializer
 )
+from .disponibilidad import disponibilidad
+from .mapa_calor import mapa_calor
+from . import mapa_semanal
+from .semana import aplicar_semana, semana_de
 
 class AreaComunViewSet(viewsets.ModelViewSet):
     queryset = AreaComun.objects.all().order_by('id')
     serializer_class = AreaComunSerializer
     permission_classes = [IsAuthenticated]
 
+    def update(self, request, *args, **kwargs):
+        # Pasar a mantenimiento o cerrado cancela las reservas futuras (señal area_cerrada)
+        with transaction.atomic():
+            respuesta = super().update(request, *args, **kwargs)
+        cierre = getattr(self, 'cierre', None)
+        if cierre is not None:
+            respuesta.data['cierre'] = cierre
+        return respuesta
+
+    def perform_update(self, serializer):
+        area = serializer.save()
+        self.cierre = getattr(area, 'cierre', None)
+
     @action(detail=True, methods=['post'], url_path='asignar-reglas')
     def asignar_reglas(self, request, pk=None):
         area = self.get_object()
@@ -47,6 +70,98 @@ class AreaComunViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, methods=['put'], url_path='semana')
+    def semana(self, request, pk=None):
+        """Reemplaza el horario semanal completo del área"""
+        area = self.get_object()
+        serializer = SemanaSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        resumen = aplicar_semana([area.id], serializer.semana())
+        horarios = HorarioSerializer(area.horarios.filter(activo=True), many=True)
+        return Response({**resumen, 'horarios': horarios.data})
+
+    @action(detail=True, methods=['post'], url_path='clonar-semana')
+    def clonar_semana(self, request, pk=None):
+        """Copia el horario semanal activo del área a las áreas indicadas"""
+        area = self.get_object()
+        areas_ids = request.data.get('areas', [])
+        try:
+            if not isinstance(areas_ids, list) or not areas_ids:
+                raise ValueError
+            areas_ids = {int(i) for i in areas_ids}
+        except (TypeError, ValueError):
+            return Response({'detail': 'Formato inválido. Debe ser lista de IDs.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        destino = list(
+            AreaComun.objects.filter(id__in=areas_ids).exclude(id=area.id).values_list('id', flat=True)
+        )
+        faltantes = areas_ids - set(destino) - {area.id}
+        if faltantes:
+            return Response({'detail': f'Áreas no encontradas: {sorted(faltantes)}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        resumen = aplicar_semana(destino, semana_de(area))
+        return Response({**resumen, 'areas': destino})
+
+    @action(detail=True, methods=['get'], url_path='disponibilidad')
+    def disponibilidad(self, request, pk=None):
+        """Tramos libres por día: ?desde=AAAA-MM-DD&hasta=AAAA-MM-DD"""
+        area = self.get_object()
+        desde = request.query_params.get('desde')
+        hasta = request.query_params.get('hasta')
+        try:
+            desde = parse_date(desde) if desde else timezone.localdate()
+            hasta = parse_date(hasta) if hasta else desde
+        except ValueError:
+            desde = None
+        if desde is None or hasta is None:
+            return Response({'detail': 'Fecha inválida. Use AAAA-MM-DD.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if hasta < desde:
+            return Response({'detail': '"hasta" no puede ser anterior a "desde".'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if hasta - desde >= timedelta(days=settings.DISPONIBILIDAD_MAX_DIAS):
+            return Response({'detail': f'El rango máximo es de {settings.DISPONIBILIDAD_MAX_DIAS} días.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(disponibilidad(area, desde, hasta))
+
+    @action(detail=False, methods=['get'], url_path='mapa-calor')
+    def mapa_calor(self, request):
+        """Ocupación por día de la semana y hora: ?desde=&hasta=[&area=] (por defecto, el último año)"""
+        hasta = request.query_params.get('hasta')
+        desde = request.query_params.get('desde')
+        area = request.query_params.get('area')
+        try:
+            hasta = parse_date(hasta) if hasta else timezone.localdate()
+            if desde:
+                desde = parse_date(desde)
+            elif hasta:
+                desde = hasta - timedelta(days=364)
+            area = int(area) if area else None
+        except ValueError:
+            desde = None
+        if desde is None or hasta is None:
+            return Response({'detail': 'Parámetros inválidos. Use fechas AAAA-MM-DD y un id de área.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if hasta < desde:
+            return Response({'detail': '"hasta" no puede ser anterior a "desde".'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if hasta - desde >= timedelta(days=settings.MAPA_CALOR_MAX_DIAS):
+            return Response({'detail': f'El rango máximo es de {settings.MAPA_CALOR_MAX_DIAS} días.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(mapa_calor(desde, hasta, area))
+
+    @action(detail=False, methods=['get'], url_path='abiertas-ahora')
+    def abiertas_ahora(self, request):
+        """Estado de apertura de todas las áreas en este momento (sin consultar la base)"""
+        ahora = timezone.localtime()
+        areas = [
+            {'id': area_id, 'nombre': area['nombre'], 'abierta': mapa_semanal.abierta(area, ahora)}
+            for area_id, area in sorted(mapa_semanal.areas().items())
+            if area['activo']
+        ]
+        return Response({'momento': ahora.isoformat(), 'areas': areas})
+
 class ReglaViewSet(viewsets.ModelViewSet):
     queryset = Regla.objects.all().order_by('id')
     serializer_class = ReglaSerializer
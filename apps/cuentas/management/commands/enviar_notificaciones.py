@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from django.utils.html import escape
+
+from apps.cuentas.models import Notificacion
+from apps.cuentas.utils import enviar_email_brevo
+
+
+class Command(BaseCommand):
+    help = 'Envía por correo las notificaciones pendientes de los residentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=200, help='Notificaciones por ejecución')
+        parser.add_argument('--max-intentos', type=int, default=3)
+
+    def handle(self, *args, **options):
+        enviadas = fallidas = 0
+        with transaction.atomic():
+            # SKIP LOCKED: dos envíos simultáneos no mandan dos veces la misma
+            pendientes = list(
+                Notificacion.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(estado='PENDIENTE')
+                .select_related('residente')
+                .order_by('id')[:options['lote']]
+            )
+            for notificacion in pendientes:
+                notificacion.intentos += 1
+                correo = notificacion.residente.correo
+                try:
+                    if not correo:
+                        raise ValueError('El residente no tiene correo')
+                    respuesta = enviar_email_brevo(correo, notificacion.asunto, f'<p>{escape(notificacion.mensaje)}</p>')
+                    if 'messageId' not in respuesta:
+                        raise ValueError(respuesta.get('message', 'Respuesta inesperada de Brevo'))
+                except Exception as e:
+                    notificacion.error = str(e)
+                    if notificacion.intentos >= options['max_intentos'] or not correo:
+                        notificacion.estado = 'FALLIDO'
+                    fallidas += 1
+                else:
+                    notificacion.estado = 'ENVIADO'
+                    notificacion.enviado = timezone.now()
+                    notificacion.error = ''
+                    enviadas += 1
+            Notificacion.objects.bulk_update(pendientes, ['estado', 'intentos', 'error', 'enviado'])
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {enviadas} notificaciones enviadas, {fallidas} con error'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cuentas', '0001_initial'),
+        ('residentes', '0003_indices_residente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Notificacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('asunto', models.CharField(max_length=200)),
+                ('mensaje', models.TextField()),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('ENVIADO', 'Enviado'), ('FALLIDO', 'Fallido')], default='PENDIENTE', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('enviado', models.DateTimeField(blank=True, null=True)),
+                ('residente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones', to='residentes.residente')),
+            ],
+            options={
+                'verbose_name': 'Notificación',
+                'verbose_name_plural': 'Notificaciones',
+                'db_table': 'notificacion',
+                'ordering': ['-id'],
+                'indexes': [models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['id'], name='notificacion_pendiente_idx')],
+            },
+        ),
+    ]
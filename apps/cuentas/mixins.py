@@ -0,0 +1,62 @@
+"""
+Alcance de los datos según el rol del usuario.
+
+- Administración (``is_staff``, superusuario o rol de administración): todo.
+- Usuario vinculado a un residente: solo sus filas, con un ``WHERE
+  residente_id = ...`` en la consulta (apoyado en los índices
+  ``(residente, <columna de orden>)`` de cada tabla).
+- Personal (``Usuario.personal`` o rol de seguridad): todo en los ViewSets
+  que lo permiten (``acceso_personal``), p. ej. visitantes y vehículos para
+  el control de acceso; nada en el resto.
+- Cualquier otro usuario: nada.
+
+Las operaciones de la administración (facturación masiva, reportes) usan el
+permiso ``EsAdministracion``.
+"""
+from rest_framework.permissions import BasePermission
+
+ROLES_ADMINISTRACION = ('Admin', 'Administrador', 'Supervisor')
+ROLES_PERSONAL = ('Personal', 'Seguridad', 'Personal de Seguridad')
+
+
+def _rol(usuario):
+    return usuario.rol.nombre if usuario.rol_id else None
+
+
+def es_administracion(usuario):
+    return usuario.is_staff or usuario.is_superuser or _rol(usuario) in ROLES_ADMINISTRACION
+
+
+class EsAdministracion(BasePermission):
+    """Solo usuarios de administración"""
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated and es_administracion(request.user))
+
+
+def es_personal(usuario):
+    return bool(usuario.personal_id) or _rol(usuario) in ROLES_PERSONAL
+
+
+def filtrar_por_residente(queryset, usuario, campo='residente', acceso_personal=False):
+    """Filtra ``queryset`` a lo que ``usuario`` puede ver; ``campo`` es el FK al residente"""
+    if not usuario.is_authenticated:
+        return queryset.none()
+    if es_administracion(usuario):
+        return queryset
+    if usuario.residente_id:
+        return queryset.filter(**{f'{campo}_id': usuario.residente_id})
+    if acceso_personal and es_personal(usuario):
+        return queryset
+    return queryset.none()
+
+
+class AlcanceResidenteMixin:
+    """Aplica ``filtrar_por_residente`` al ``get_queryset`` del ViewSet"""
+    campo_residente = 'residente'
+    acceso_personal = False
+
+    def get_queryset(self):
+        return filtrar_por_residente(
+            super().get_queryset(), self.request.user, self.campo_residente, self.acceso_personal
+        )
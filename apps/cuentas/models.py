@@ -144,4 +144,38 @@ class Aviso(models.Model):
         db_table = 'aviso'
         verbose_name = 'Aviso'
         verbose_name_plural = 'Avisos'
-        ordering = ['-fecha_push']
\ No newline at end of file
+        ordering = ['-fecha_push']
+
+
+class Notificacion(models.Model):
+    """Aviso a un residente en cola de envío; lo despacha ``enviar_notificaciones``"""
+    ESTADO_CHOICES = (
+        ('PENDIENTE', 'Pendiente'),
+        ('ENVIADO', 'Enviado'),
+        ('FALLIDO', 'Fallido'),
+    )
+
+    residente = models.ForeignKey(
+        'residentes.Residente', on_delete=models.CASCADE, related_name='notificaciones'
+    )
+    asunto = models.CharField(max_length=200)
+    mensaje = models.TextField()
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='PENDIENTE')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(default=timezone.now)
+    enviado = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.asunto
+
+    class Meta:
+        db_table = 'notificacion'
+        verbose_name = 'Notificación'
+        verbose_name_plural = 'Notificaciones'
+        ordering = ['-id']
+        indexes = [
+            # Solo la cola: es lo que recorre el envío
+            models.Index(fields=['id'], name='notificacion_pendiente_idx',
+                         condition=models.Q(estado='PENDIENTE')),
+        ]
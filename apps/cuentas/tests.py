@@ -1,3 +1,53 @@
+from django.contrib.auth.models import AnonymousUser
 from django.test import TestCase
 
-# Create your tests here.
+from apps.personal.models import Personal
+from apps.residentes.models import Residente
+from .mixins import filtrar_por_residente
+from .models import Notificacion, Rol, Usuario
+
+
+class FiltrarPorResidenteTests(TestCase):
+    """Qué filas ve cada rol con ``filtrar_por_residente``"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ana = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='92001', sexo='F', tipo='PROPIETARIO')
+        cls.luis = Residente.objects.create(nombre='Luis', apellidos='Prueba', dni='92002', sexo='M', tipo='PROPIETARIO')
+        cls.de_ana = Notificacion.objects.create(residente=cls.ana, asunto='a', mensaje='a')
+        cls.de_luis = Notificacion.objects.create(residente=cls.luis, asunto='b', mensaje='b')
+        guardia = Personal.objects.create(nombre='Pedro', apellido='Prueba', dni='P-1')
+
+        def usuario(correo, **extra):
+            return Usuario.objects.create_user(correo, 'clave', **extra)
+
+        cls.usuarios = {
+            'residente': usuario('ana@example.com', residente=cls.ana),
+            'staff': usuario('staff@example.com', is_staff=True),
+            'supervisor': usuario('supervisor@example.com', rol=Rol.objects.create(nombre='Supervisor')),
+            'seguridad': usuario('seguridad@example.com', rol=Rol.objects.create(nombre='Seguridad')),
+            'personal': usuario('pedro@example.com', personal=guardia),
+            'sin_rol': usuario('nadie@example.com'),
+        }
+
+    def _visibles(self, usuario, acceso_personal=False):
+        return set(filtrar_por_residente(Notificacion.objects.all(), usuario, acceso_personal=acceso_personal))
+
+    def test_administracion_ve_todo(self):
+        for nombre in ('staff', 'supervisor'):
+            with self.subTest(nombre):
+                self.assertEqual(self._visibles(self.usuarios[nombre]), {self.de_ana, self.de_luis})
+
+    def test_residente_ve_solo_lo_suyo(self):
+        self.assertEqual(self._visibles(self.usuarios['residente']), {self.de_ana})
+        self.assertEqual(self._visibles(self.usuarios['residente'], acceso_personal=True), {self.de_ana})
+
+    def test_personal_segun_acceso_personal(self):
+        for nombre in ('seguridad', 'personal'):
+            with self.subTest(nombre):
+                self.assertEqual(self._visibles(self.usuarios[nombre]), set())
+                self.assertEqual(self._visibles(self.usuarios[nombre], acceso_personal=True), {self.de_ana, self.de_luis})
+
+    def test_sin_rol_ni_anonimo_no_ven_nada(self):
+        self.assertEqual(self._visibles(self.usuarios['sin_rol'], acceso_personal=True), set())
+        self.assertEqual(self._visibles(AnonymousUser(), acceso_personal=True), set())
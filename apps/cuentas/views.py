@@ -14,6 +14,8 @@ import random
 import string
 import secrets
 
+from config.exportacion import ExportacionMixin
+
 from .models import Usuario, Rol, Bitacora, Aviso
 from .serializers import (
     UsuarioReadSerializer,
@@ -353,7 +355,7 @@ class ConfirmarRecuperacionView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BitacoraViewSet(viewsets.ReadOnlyModelViewSet):
+class BitacoraViewSet(ExportacionMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Bitacora.objects.all().select_related("usuario").order_by("-fecha")
     serializer_class = BitacoraSerializer
     permission_classes = [IsAuthenticated]
@@ -0,0 +1,136 @@
+"""
+Calendario mensual de reservas: por área y día, cantidad y minutos reservados.
+
+Una consulta agrupada por ``(area_id, fecha_reserva)`` sobre el índice
+parcial ``reserva_calendario_idx`` (solo reservas no canceladas, con las
+horas incluidas: se resuelve sin leer la tabla). Las ocurrencias de series
+todavía no materializadas se suman en memoria. Los minutos de una reserva
+que cruza la medianoche cuentan en el día en que empieza.
+
+El resultado se guarda en caché con una versión por mes y otra global: una
+reserva solo invalida el mes en que está (y del que se movió), y un cambio
+de serie, que ocupa meses sin límite, invalida todos.
+"""
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Q
+
+from apps.areas.models import AreaComun
+from . import series
+from .models import Reserva, SerieReserva
+
+CLAVE_GLOBAL = 'calendario:v'
+
+
+def _clave_mes(fecha):
+    return f'calendario:v:{fecha:%Y-%m}'
+
+
+def _versiones(claves):
+    versiones = cache.get_many(claves)
+    faltantes = [clave for clave in claves if clave not in versiones]
+    if faltantes:
+        ahora = time.time_ns()
+        for clave in faltantes:
+            cache.add(clave, ahora, settings.CACHE_VERSION_SEGUNDOS)
+        versiones.update(cache.get_many(faltantes))
+    return [versiones.get(clave) for clave in claves]
+
+
+def invalidar_meses(fechas):
+    """Invalida los meses de ``fechas`` (se ignoran las None)"""
+    claves = {_clave_mes(fecha) for fecha in fechas if fecha is not None}
+    if claves:
+        ahora = time.time_ns()
+        cache.set_many({clave: ahora for clave in claves}, settings.CACHE_VERSION_SEGUNDOS)
+
+
+def invalidar_todo():
+    cache.set(CLAVE_GLOBAL, time.time_ns(), settings.CACHE_VERSION_SEGUNDOS)
+
+
+def _agrupado(primero, ultimo, area_id=None):
+    """[(area_id, fecha, reservas, pendientes, minutos)] de las reservas no canceladas"""
+    tabla = connection.ops.quote_name(Reserva._meta.db_table)
+    filtro_area = 'AND area_id = %s' if area_id is not None else ''
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            SELECT area_id, fecha_reserva, COUNT(*),
+                   COUNT(*) FILTER (WHERE estado = 'pendiente'),
+                   COALESCE(SUM(
+                       CASE WHEN hora_fin > hora_inicio
+                            THEN EXTRACT(EPOCH FROM hora_fin - hora_inicio)
+                            ELSE 86400 - EXTRACT(EPOCH FROM hora_inicio - hora_fin)
+                       END
+                   ) / 60, 0)::int
+            FROM {tabla}
+            WHERE fecha_reserva BETWEEN %s AND %s
+              AND estado <> 'cancelada'
+              {filtro_area}
+            GROUP BY area_id, fecha_reserva
+            """,
+            [primero, ultimo] + ([area_id] if area_id is not None else []),
+        )
+        return cursor.fetchall()
+
+
+def _minutos(hora_inicio, hora_fin):
+    inicio = hora_inicio.hour * 60 + hora_inicio.minute
+    fin = hora_fin.hour * 60 + hora_fin.minute
+    return (fin - inicio) % (24 * 60) or 24 * 60
+
+
+def calcular(primero, ultimo, area_id=None):
+    """{area_id: {dia: [reservas, pendientes, minutos, recurrentes]}} sin caché"""
+    areas = {}
+    for area, fecha, reservas, pendientes, minutos in _agrupado(primero, ultimo, area_id):
+        areas.setdefault(area, {})[fecha.day] = [reservas, pendientes, minutos, 0]
+
+    recurrentes = SerieReserva.objects.filter(estado='activa', fecha_inicio__lte=ultimo).filter(
+        Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=primero)
+    )
+    if area_id is not None:
+        recurrentes = recurrentes.filter(area_id=area_id)
+    for fecha, _, serie in series.virtuales(recurrentes, primero, ultimo):
+        dia = areas.setdefault(serie.area_id, {}).setdefault(fecha.day, [0, 0, 0, 0])
+        dia[0] += 1
+        dia[2] += _minutos(serie.hora_inicio, serie.hora_fin)
+        dia[3] += 1
+    return areas
+
+
+def calendario(mes, area_id=None):
+    """Resumen del mes de ``mes`` (cualquier fecha del mes) por área y día"""
+    primero = date(mes.year, mes.month, 1)
+    ultimo = (primero + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    global_, del_mes = _versiones([CLAVE_GLOBAL, _clave_mes(primero)])
+    clave = f'calendario:{primero:%Y-%m}:{global_}:{del_mes}:{area_id or "todas"}'
+
+    resultado = cache.get(clave)
+    if resultado is None:
+        por_area = calcular(primero, ultimo, area_id)
+        nombres = dict(AreaComun.objects.filter(id__in=list(por_area)).values_list('id', 'nombre'))
+        resultado = {
+            'mes': f'{primero:%Y-%m}',
+            'dias': ultimo.day,
+            'areas': [
+                {
+                    'area': area,
+                    'nombre': nombres.get(area),
+                    'reservas': sum(d[0] for d in dias.values()),
+                    'minutos': sum(d[2] for d in dias.values()),
+                    'dias': [
+                        {'dia': dia, 'reservas': r, 'pendientes': p, 'minutos': m, 'recurrentes': s}
+                        for dia, (r, p, m, s) in sorted(dias.items())
+                    ],
+                }
+                for area, dias in sorted(por_area.items())
+            ],
+        }
+        cache.set(clave, resultado, settings.CALENDARIO_CACHE_SEGUNDOS)
+    return resultado
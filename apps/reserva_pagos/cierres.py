@@ -0,0 +1,193 @@
+"""
+Cierre de un área común (mantenimiento o cerrada): cancelación en bloque.
+
+``cerrar_area`` cancela con un solo ``UPDATE ... RETURNING`` todas las
+reservas futuras del área, y con otro las series activas que aún tienen
+ocurrencias por delante (sus ocurrencias virtuales dejan de generarse). Sobre
+los detalles de factura de esas reservas:
+
+- factura pendiente o vencida: se anula el detalle (se borra y se descuenta
+  del total);
+- factura pagada: se agrega un detalle negativo (crédito) y el libro deja el
+  saldo a favor del residente.
+
+Cada caso es un statement (CTE que modifica detalles y totales a la vez) y
+luego ``libro.sincronizar_facturas`` asienta las diferencias. Las
+notificaciones a los residentes se encolan con un ``bulk_create``.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.areas.disponibilidad import invalidar_area
+from apps.areas.models import AreaComun
+from apps.cuentas.models import Notificacion
+from . import calendario, libro
+from .models import DetalleFactura, Factura, Reserva, SerieReserva
+
+ESTADOS_CIERRE = ('mantenimiento', 'cerrado')
+
+_q = connection.ops.quote_name
+RESERVAS = _q(Reserva._meta.db_table)
+DETALLES = _q(DetalleFactura._meta.db_table)
+FACTURAS = _q(Factura._meta.db_table)
+SERIES = _q(SerieReserva._meta.db_table)
+
+# Descuenta de cada factura la suma de los detalles afectados y devuelve (factura_id, monto, detalles)
+_TOTALES = f"""
+    totales AS (
+        SELECT factura_id, SUM(monto) AS monto, COUNT(*) AS detalles
+        FROM afectados GROUP BY factura_id
+    ),
+    ajustadas AS (
+        UPDATE {FACTURAS} f SET monto_total = f.monto_total - t.monto, fecha_actualizacion = now()
+        FROM totales t WHERE f.id = t.factura_id
+        RETURNING f.id
+    )
+    SELECT factura_id, monto, detalles FROM totales
+"""
+
+
+def _cancelar_reservas(area_id, ahora):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {RESERVAS} SET estado = 'cancelada'
+            WHERE area_id = %s
+              AND estado IN ('pendiente', 'confirmada')
+              AND (fecha_reserva > %s
+                   OR (fecha_reserva = %s AND (hora_inicio IS NULL OR hora_inicio >= %s)))
+            RETURNING id, residente_id, fecha_reserva, hora_inicio
+            """,
+            [area_id, ahora.date(), ahora.date(), ahora.time()],
+        )
+        return cursor.fetchall()
+
+
+def _cancelar_series(area_id, hoy):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            UPDATE {SERIES} SET estado = 'cancelada'
+            WHERE area_id = %s
+              AND estado = 'activa'
+              AND (fecha_fin IS NULL OR fecha_fin >= %s)
+            RETURNING id, residente_id, hora_inicio
+            """,
+            [area_id, hoy],
+        )
+        return cursor.fetchall()
+
+
+def _anular_detalles(reserva_ids):
+    """Borra los detalles en facturas impagas; devuelve [(factura_id, monto, detalles)]"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH afectados AS (
+                DELETE FROM {DETALLES} d USING {FACTURAS} f
+                WHERE d.factura_id = f.id
+                  AND d.reserva_id = ANY(%s)
+                  AND f.estado IN ('pendiente', 'vencida')
+                RETURNING d.factura_id, d.monto
+            ),
+            {_TOTALES}
+            """,
+            [reserva_ids],
+        )
+        return cursor.fetchall()
+
+
+def _acreditar_detalles(reserva_ids):
+    """Agrega un detalle negativo por cada detalle en facturas pagadas"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+            WITH afectados AS (
+                INSERT INTO {DETALLES} (factura_id, concepto_id, reserva_id, monto)
+                SELECT d.factura_id, d.concepto_id, d.reserva_id, -d.monto
+                FROM {DETALLES} d JOIN {FACTURAS} f ON f.id = d.factura_id
+                WHERE d.reserva_id = ANY(%s) AND f.estado = 'pagada' AND d.monto > 0
+                RETURNING factura_id, -monto AS monto
+            ),
+            {_TOTALES}
+            """,
+            [reserva_ids],
+        )
+        return cursor.fetchall()
+
+
+def cerrar_area(area_id):
+    """Cancela las reservas y series futuras del área y anula o acredita lo facturado.
+
+    Devuelve los conteos de lo afectado.
+    """
+    area = AreaComun.objects.get(pk=area_id)
+    ahora = timezone.localtime()
+    with transaction.atomic():
+        canceladas = _cancelar_reservas(area_id, ahora)
+        series = _cancelar_series(area_id, ahora.date())
+        reserva_ids = [fila[0] for fila in canceladas]
+        anuladas = acreditadas = []
+        if reserva_ids:
+            # Bloquea las facturas afectadas: un pago simultáneo no cambia su estado a mitad del cierre
+            list(
+                Factura.objects.select_for_update(of=('self',))
+                .filter(detalles__reserva_id__in=reserva_ids)
+                .order_by('id').values_list('id')
+            )
+            anuladas = _anular_detalles(reserva_ids)
+            acreditadas = _acreditar_detalles(reserva_ids)
+            libro.sincronizar_facturas(
+                [f for f, _, _ in anuladas + acreditadas],
+                descripcion=f'Cancelación de reservas: {area.nombre} ({area.estado})',
+            )
+
+        notificaciones = Notificacion.objects.bulk_create([
+            Notificacion(
+                residente_id=residente_id,
+                asunto=f'Reserva cancelada: {area.nombre}',
+                mensaje=(
+                    f'Tu reserva del {fecha:%d/%m/%Y}'
+                    + (f' a las {hora:%H:%M}' if hora else '')
+                    + f' en {area.nombre} fue cancelada: el área pasó a "{area.get_estado_display()}".'
+                    ' Si ya estaba facturada, el monto se anuló o quedó como saldo a favor.'
+                ),
+            )
+            for _, residente_id, fecha, hora in canceladas
+        ] + [
+            Notificacion(
+                residente_id=residente_id,
+                asunto=f'Reserva recurrente cancelada: {area.nombre}',
+                mensaje=(
+                    f'Tu reserva recurrente de las {hora:%H:%M} en {area.nombre} fue cancelada:'
+                    f' el área pasó a "{area.get_estado_display()}". No se generarán más ocurrencias.'
+                ),
+            )
+            for _, residente_id, hora in series
+        ], batch_size=500)
+
+        # Los UPDATE en bloque no disparan las señales de Reserva ni de SerieReserva
+        def invalidar():
+            invalidar_area(area_id)
+            if series:
+                calendario.invalidar_todo()
+            else:
+                calendario.invalidar_meses([fila[2] for fila in canceladas])
+
+        transaction.on_commit(invalidar)
+
+    return {
+        'area': area_id,
+        'estado': area.estado,
+        'reservas_canceladas': len(canceladas),
+        'series_canceladas': len(series),
+        'residentes': len({fila[1] for fila in canceladas + series}),
+        'detalles_anulados': sum(d for _, _, d in anuladas),
+        'monto_anulado': sum((m for _, m, _ in anuladas), Decimal('0.00')),
+        'detalles_acreditados': sum(d for _, _, d in acreditadas),
+        'monto_acreditado': sum((m for _, m, _ in acreditadas), Decimal('0.00')),
+        'facturas': len({f for f, _, _ in anuladas + acreditadas}),
+        'notificaciones': len(notificaciones),
+    }
@@ -0,0 +1,125 @@
+"""
+Facturación masiva por ejecuciones.
+
+Una ``EjecucionFacturacion`` guarda qué conceptos cobrar y a qué residentes
+(filtros por residencia, tipo de residencia y tipo de residente). Al ejecutarla
+se crean ``Factura`` y ``DetalleFactura`` con ``bulk_create`` por lotes, cada
+lote en su transacción y con el total ya calculado.
+
+La clave de la ejecución hace la operación idempotente: volver a lanzarla con
+la misma clave no duplica facturas, solo completa a los residentes que falten
+(la restricción única ``(ejecucion, residente)`` lo garantiza en la base).
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.residentes.models import Residente
+from . import libro
+from .models import ConceptoPago, DetalleFactura, EjecucionFacturacion, Factura
+
+TAMANO_LOTE = 2000
+
+
+def crear_ejecucion(clave, conceptos, residencias=None, tipos_residencia=None,
+                    tipos_residente=None, fecha_limite=None, descripcion=''):
+    """Devuelve ``(ejecucion, creada)``; si la clave ya existe no se modifica"""
+    return EjecucionFacturacion.objects.get_or_create(
+        clave=clave,
+        defaults={
+            'descripcion': descripcion,
+            'fecha_limite': fecha_limite,
+            'parametros': {
+                'conceptos': sorted(set(conceptos)),
+                'residencias': sorted(set(residencias or [])),
+                'tipos_residencia': sorted(set(tipos_residencia or [])),
+                'tipos_residente': sorted(set(tipos_residente or [])),
+            },
+        },
+    )
+
+
+def residentes_objetivo(parametros):
+    residentes = Residente.objects.filter(activo=True)
+    if parametros.get('residencias'):
+        residentes = residentes.filter(residencia_id__in=parametros['residencias'])
+    if parametros.get('tipos_residencia'):
+        residentes = residentes.filter(residencia__tipo__in=parametros['tipos_residencia'])
+    if parametros.get('tipos_residente'):
+        residentes = residentes.filter(tipo__in=parametros['tipos_residente'])
+    return residentes
+
+
+def ejecutar(ejecucion_id, tamano_lote=TAMANO_LOTE, progreso=None, reanudar=False):
+    """Genera las facturas pendientes de la ejecución.
+
+    ``progreso(hechas, total)`` se llama después de cada lote. Si la ejecución
+    ya está completada, o en proceso en otra llamada, se devuelve sin hacer
+    nada; ``reanudar=True`` retoma una que quedó "en_proceso" (proceso caído).
+    """
+    omitir = ['completada'] if reanudar else ['en_proceso', 'completada']
+    with transaction.atomic():
+        ejecucion = (
+            EjecucionFacturacion.objects
+            .select_for_update(skip_locked=True)
+            .filter(pk=ejecucion_id)
+            .exclude(estado__in=omitir)
+            .first()
+        )
+        if ejecucion is None:
+            return EjecucionFacturacion.objects.get(pk=ejecucion_id)
+        ejecucion.estado = 'en_proceso'
+        ejecucion.iniciado = ejecucion.iniciado or timezone.now()
+        ejecucion.error = ''
+        ejecucion.save(update_fields=['estado', 'iniciado', 'error'])
+
+    try:
+        conceptos = list(ConceptoPago.objects.filter(id__in=ejecucion.parametros['conceptos']))
+        monto = sum((c.monto for c in conceptos), Decimal('0'))
+        ya_facturados = Factura.objects.filter(ejecucion=ejecucion).values('residente_id')
+        pendientes = list(
+            residentes_objetivo(ejecucion.parametros)
+            .exclude(id__in=ya_facturados)
+            .order_by('id')
+            .values_list('id', flat=True)
+        )
+        hechas = ejecucion.facturas_creadas
+        total = hechas + len(pendientes)
+        EjecucionFacturacion.objects.filter(pk=ejecucion.pk).update(total_residentes=total)
+        descripcion = ejecucion.descripcion or f'Facturación {ejecucion.clave}'
+
+        for i in range(0, len(pendientes), tamano_lote):
+            lote = pendientes[i:i + tamano_lote]
+            with transaction.atomic():
+                facturas = Factura.objects.bulk_create([
+                    Factura(
+                        residente_id=residente_id,
+                        ejecucion=ejecucion,
+                        monto_total=monto,
+                        fecha_limite=ejecucion.fecha_limite,
+                        descripcion=descripcion,
+                    )
+                    for residente_id in lote
+                ], batch_size=tamano_lote)
+                DetalleFactura.objects.bulk_create([
+                    DetalleFactura(factura_id=factura.id, concepto=concepto, monto=concepto.monto)
+                    for factura in facturas
+                    for concepto in conceptos
+                ], batch_size=tamano_lote)
+                libro.sincronizar_facturas([f.id for f in facturas], descripcion)
+                EjecucionFacturacion.objects.filter(pk=ejecucion.pk).update(
+                    facturas_creadas=F('facturas_creadas') + len(facturas),
+                    monto_facturado=F('monto_facturado') + monto * len(facturas),
+                )
+            hechas += len(facturas)
+            if progreso:
+                progreso(hechas, total)
+    except Exception as e:
+        EjecucionFacturacion.objects.filter(pk=ejecucion.pk).update(estado='fallida', error=str(e))
+        raise
+
+    EjecucionFacturacion.objects.filter(pk=ejecucion.pk).update(estado='completada', finalizado=timezone.now())
+    ejecucion.refresh_from_db()
+    return ejecucion
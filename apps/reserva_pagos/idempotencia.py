@@ -0,0 +1,80 @@
+"""
+Header ``Idempotency-Key`` para endpoints que no deben ejecutarse dos veces.
+
+La respuesta de la primera petición se guarda con la clave (por usuario) en
+la misma transacción que sus cambios; un reintento con la misma clave y el
+mismo cuerpo recibe esa respuesta sin volver a escribir nada. La misma
+clave con otro cuerpo es un error del cliente (422).
+"""
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import RespuestaIdempotente
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+
+
+def clave(request):
+    return (request.META.get(HEADER) or '').strip()[:255] or None
+
+
+def huella(request):
+    # request.data y no request.body: DRF ya consumió el stream al parsear
+    datos = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f'{request.method}\n{request.path}\n{datos}'.encode()).hexdigest()
+
+
+def vigentes():
+    return RespuestaIdempotente.objects.filter(
+        creado__gte=timezone.now() - timedelta(hours=settings.IDEMPOTENCIA_HORAS)
+    )
+
+
+def repetida(request):
+    """Respuesta guardada para la clave de la petición, o None si es la primera vez.
+
+    Llamar dentro de la transacción y después de bloquear el recurso, así una
+    petición simultánea con la misma clave espera y encuentra la respuesta.
+    """
+    valor = clave(request)
+    if valor is None:
+        return None
+    guardada = vigentes().filter(usuario=request.user, clave=valor).first()
+    if guardada is None:
+        return None
+    if guardada.huella != huella(request):
+        return Response(
+            {'error': 'La clave de idempotencia ya se usó con otra petición'},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    respuesta = Response(guardada.respuesta, status=guardada.codigo)
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def guardar(request, respuesta):
+    """Guarda la respuesta si la petición trae clave (las vencidas se reemplazan)"""
+    valor = clave(request)
+    if valor is not None:
+        RespuestaIdempotente.objects.update_or_create(
+            usuario=request.user, clave=valor,
+            defaults={
+                'huella': huella(request),
+                'codigo': respuesta.status_code,
+                'respuesta': respuesta.data,
+                'creado': timezone.now(),
+            },
+        )
+    return respuesta
+
+
+def purgar():
+    """Borra las respuestas vencidas; devuelve cuántas"""
+    limite = timezone.now() - timedelta(hours=settings.IDEMPOTENCIA_HORAS)
+    return RespuestaIdempotente.objects.filter(creado__lt=limite).delete()[0]
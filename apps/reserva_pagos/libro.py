@@ -0,0 +1,145 @@
+"""
+Libro de cuenta de los residentes.
+
+Cada cambio en lo que debe un residente queda como un ``MovimientoCuenta``
+(solo inserciones) y el mismo statement suma su efecto a ``SaldoResidente``
+con ``INSERT ... ON CONFLICT DO UPDATE``: asiento y saldo no pueden quedar
+separados, y consultar el saldo es una lectura por clave primaria.
+
+- Cargos: ``sincronizar_facturas`` asienta la diferencia entre el total de la
+  factura (0 si está cancelada) y lo que ya se le cargó. Sirve igual al
+  emitirla, al agregar o quitar detalles, al recargar mora o al cancelarla.
+- Pagos: ``abonar`` y ``reembolsar`` son idempotentes por pago (restricción
+  única ``(pago, tipo)``), así el webhook y la conciliación pueden avisar
+  el mismo pago sin duplicar el abono.
+"""
+from django.db import connection, transaction
+
+from .models import Factura, MovimientoCuenta, Pago, SaldoResidente
+
+_q = connection.ops.quote_name
+MOVIMIENTOS = _q(MovimientoCuenta._meta.db_table)
+SALDOS = _q(SaldoResidente._meta.db_table)
+FACTURAS = _q(Factura._meta.db_table)
+PAGOS = _q(Pago._meta.db_table)
+
+
+def _asentar(select_sql, params):
+    """Inserta los movimientos de ``select_sql`` y los suma a los saldos en un solo statement.
+
+    ``select_sql`` devuelve (residente_id, tipo, monto, factura_id, pago_id, descripcion).
+    Devuelve la cantidad de residentes cuyo saldo cambió.
+    """
+    sql = f"""
+        WITH nuevos AS (
+            INSERT INTO {MOVIMIENTOS} (residente_id, tipo, monto, factura_id, pago_id, descripcion, creado)
+            SELECT m.*, NOW() FROM ({select_sql}) AS m
+            ON CONFLICT DO NOTHING
+            RETURNING residente_id, tipo, monto
+        )
+        INSERT INTO {SALDOS} (residente_id, saldo, total_cargos, total_pagado, movimientos, actualizado)
+        SELECT residente_id,
+               SUM(monto),
+               COALESCE(SUM(monto) FILTER (WHERE tipo IN ('cargo', 'anulacion')), 0),
+               COALESCE(-SUM(monto) FILTER (WHERE tipo IN ('abono', 'reembolso')), 0),
+               COUNT(*),
+               NOW()
+        FROM nuevos
+        GROUP BY residente_id
+        ORDER BY residente_id
+        ON CONFLICT (residente_id) DO UPDATE SET
+            saldo = {SALDOS}.saldo + EXCLUDED.saldo,
+            total_cargos = {SALDOS}.total_cargos + EXCLUDED.total_cargos,
+            total_pagado = {SALDOS}.total_pagado + EXCLUDED.total_pagado,
+            movimientos = {SALDOS}.movimientos + EXCLUDED.movimientos,
+            actualizado = EXCLUDED.actualizado
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def sincronizar_facturas(factura_ids, descripcion=''):
+    """Asienta en el libro la diferencia entre el total de cada factura y lo ya cargado"""
+    ids = sorted(set(factura_ids))
+    if not ids:
+        return 0
+    with transaction.atomic():
+        # Bloquea las facturas: dos sincronizaciones simultáneas no cargan dos veces la diferencia
+        list(Factura.objects.select_for_update().filter(id__in=ids).order_by('id').values_list('id'))
+        objetivo = "CASE WHEN f.estado = 'cancelada' THEN 0 ELSE f.monto_total END"
+        return _asentar(
+            f"""
+            SELECT f.residente_id,
+                   CASE WHEN f.estado = 'cancelada' THEN 'anulacion' ELSE 'cargo' END,
+                   {objetivo} - COALESCE(c.cargado, 0),
+                   f.id,
+                   NULL::bigint,
+                   LEFT(COALESCE(NULLIF(%s, ''), 'Factura #' || f.id), 200)
+            FROM {FACTURAS} f
+            LEFT JOIN (
+                SELECT factura_id, SUM(monto) AS cargado
+                FROM {MOVIMIENTOS}
+                WHERE factura_id = ANY(%s) AND tipo IN ('cargo', 'anulacion')
+                GROUP BY factura_id
+            ) c ON c.factura_id = f.id
+            WHERE f.id = ANY(%s) AND {objetivo} <> COALESCE(c.cargado, 0)
+            """,
+            [descripcion, ids, ids],
+        )
+
+
+def revertir_factura(factura_id, incluir_pagos=False, descripcion=''):
+    """Anula lo cargado a una factura (y sus pagos si ``incluir_pagos``), por residente.
+
+    Se usa antes de borrarla o de pasarla a otro residente.
+    """
+    tipos = ['cargo', 'anulacion'] + (['abono', 'reembolso'] if incluir_pagos else [])
+    return _asentar(
+        f"""
+        SELECT residente_id, 'anulacion', -SUM(monto), factura_id, NULL::bigint,
+               COALESCE(NULLIF(%s, ''), 'Anulación factura #' || factura_id)
+        FROM {MOVIMIENTOS}
+        WHERE factura_id = %s AND tipo = ANY(%s)
+        GROUP BY residente_id, factura_id
+        HAVING SUM(monto) <> 0
+        """,
+        [descripcion, factura_id, tipos],
+    )
+
+
+def abonar(pago_ids):
+    """Abona los pagos completados que todavía no estén en el libro"""
+    ids = sorted(set(pago_ids))
+    if not ids:
+        return 0
+    return _asentar(
+        f"""
+        SELECT residente_id, 'abono', -monto, factura_id, id, 'Pago #' || id
+        FROM {PAGOS}
+        WHERE id = ANY(%s) AND estado = 'completado'
+        """,
+        [ids],
+    )
+
+
+def reembolsar(pago_ids):
+    """Devuelve al saldo los pagos reembolsados que se habían abonado"""
+    ids = sorted(set(pago_ids))
+    if not ids:
+        return 0
+    return _asentar(
+        f"""
+        SELECT p.residente_id, 'reembolso', p.monto, p.factura_id, p.id, 'Reembolso pago #' || p.id
+        FROM {PAGOS} p
+        WHERE p.id = ANY(%s) AND p.estado = 'reembolsado'
+          AND EXISTS (SELECT 1 FROM {MOVIMIENTOS} m WHERE m.pago_id = p.id AND m.tipo = 'abono')
+        """,
+        [ids],
+    )
+
+
+def registrar_pagos(pagos):
+    """Abona o reembolsa según el estado actual de cada pago"""
+    abonar([p.id for p in pagos if p.estado == 'completado'])
+    reembolsar([p.id for p in pagos if p.estado == 'reembolsado'])
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.reserva_pagos.reportes import actualizar
+
+
+class Command(BaseCommand):
+    help = (
+        'Actualiza las tablas de resumen de los reportes financieros desde la última marca. '
+        'Pensado para cron, p. ej.: 15 * * * * python manage.py actualizar_resumenes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Recalcula desde esta fecha AAAA-MM-DD (ignora la marca)')
+        parser.add_argument('--completo', action='store_true', help='Recalcula todo el historial')
+
+    def handle(self, *args, **options):
+        desde = None
+        if options['completo']:
+            desde = parse_date('1900-01-01')
+        elif options['desde']:
+            desde = parse_date(options['desde'])
+            if desde is None:
+                raise CommandError('Fecha inválida, use AAAA-MM-DD')
+
+        inicio = time.perf_counter()
+        resumen = actualizar(desde=desde)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Resúmenes del {resumen['desde']} al {resumen['hasta']}: {resumen['dias']} días, "
+            f"{resumen['dias_anteriores']} anteriores con facturas cambiadas, "
+            f"{resumen['filas_conceptos']} filas por concepto ({time.perf_counter() - inicio:.2f}s)"
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.areas.models import AreaComun
+from apps.reserva_pagos.cierres import ESTADOS_CIERRE, cerrar_area
+
+
+class Command(BaseCommand):
+    help = 'Cancela las reservas y series futuras de un área en mantenimiento o cerrada y anula o acredita lo facturado'
+
+    def add_arguments(self, parser):
+        parser.add_argument('area_id', type=int)
+
+    def handle(self, *args, **options):
+        area = AreaComun.objects.filter(pk=options['area_id']).first()
+        if area is None:
+            raise CommandError(f"No existe el área {options['area_id']}")
+        if area.estado not in ESTADOS_CIERRE:
+            raise CommandError(f'El área "{area.nombre}" está {area.estado}: no hay nada que cancelar')
+
+        r = cerrar_area(area.pk)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {area.nombre}: {r['reservas_canceladas']} reservas y {r['series_canceladas']} series canceladas "
+            f"de {r['residentes']} residentes, "
+            f"{r['detalles_anulados']} detalles anulados ({r['monto_anulado']}), "
+            f"{r['detalles_acreditados']} acreditados ({r['monto_acreditado']}), "
+            f"{r['notificaciones']} notificaciones en cola"
+        ))
@@ -0,0 +1,55 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.reserva_pagos import facturacion
+
+
+class Command(BaseCommand):
+    help = 'Facturación masiva: una factura por residente con los conceptos indicados (idempotente por --clave)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clave', required=True, help='Clave única de la ejecución, p. ej. mantenimiento-2025-10')
+        parser.add_argument('--conceptos', type=int, nargs='+', required=True, help='IDs de ConceptoPago')
+        parser.add_argument('--residencias', type=int, nargs='*', help='Números de residencia')
+        parser.add_argument('--tipo-residencia', nargs='*', dest='tipos_residencia', help='APARTAMENTO, CASA')
+        parser.add_argument('--tipo-residente', nargs='*', dest='tipos_residente', help='PROPIETARIO, INQUILINO, ...')
+        parser.add_argument('--fecha-limite', help='AAAA-MM-DD')
+        parser.add_argument('--descripcion', default='')
+        parser.add_argument('--lote', type=int, default=facturacion.TAMANO_LOTE)
+        parser.add_argument('--reanudar', action='store_true', help='Retoma una ejecución que quedó en proceso')
+
+    def handle(self, *args, **options):
+        fecha_limite = None
+        if options['fecha_limite']:
+            fecha_limite = parse_date(options['fecha_limite'])
+            if fecha_limite is None:
+                raise CommandError('Fecha límite inválida, use AAAA-MM-DD')
+
+        ejecucion, creada = facturacion.crear_ejecucion(
+            clave=options['clave'],
+            conceptos=options['conceptos'],
+            residencias=options['residencias'],
+            tipos_residencia=options['tipos_residencia'],
+            tipos_residente=options['tipos_residente'],
+            fecha_limite=fecha_limite,
+            descripcion=options['descripcion'],
+        )
+        if not creada:
+            self.stdout.write(f'ℹ️  La ejecución "{ejecucion.clave}" ya existe ({ejecucion.estado}); se completan los residentes que falten')
+
+        inicio = time.perf_counter()
+
+        def progreso(hechas, total):
+            self.stdout.write(f'  {hechas:,}/{total:,} facturas ({time.perf_counter() - inicio:.1f}s)')
+
+        ejecucion = facturacion.ejecutar(
+            ejecucion.id, tamano_lote=options['lote'], progreso=progreso, reanudar=options['reanudar']
+        )
+        if ejecucion.estado != 'completada':
+            raise CommandError(f'La ejecución está "{ejecucion.estado}"; use --reanudar si quedó interrumpida')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {ejecucion.facturas_creadas:,} facturas, Bs{ejecucion.monto_facturado} '
+            f'en {time.perf_counter() - inicio:.1f}s'
+        ))
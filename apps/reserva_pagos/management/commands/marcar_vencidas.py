@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.reserva_pagos.models import ConceptoPago
+from apps.reserva_pagos.vencimientos import marcar_vencidas, pendientes_vencidas
+
+
+class Command(BaseCommand):
+    help = (
+        'Pasa a "vencida" las facturas pendientes cuya fecha límite ya pasó. '
+        'Pensado para ejecutarse a diario (cron), p. ej.: 5 0 * * * python manage.py marcar_vencidas'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help='Fecha de corte AAAA-MM-DD (por defecto hoy)')
+        parser.add_argument('--concepto-mora', type=int, help='ID de ConceptoPago a agregar como recargo')
+        parser.add_argument('--simular', action='store_true', help='Solo muestra cuántas facturas cambiarían')
+
+    def handle(self, *args, **options):
+        corte = timezone.localdate()
+        if options['fecha']:
+            corte = parse_date(options['fecha'])
+            if corte is None:
+                raise CommandError('Fecha inválida, use AAAA-MM-DD')
+
+        if options['simular']:
+            resumen = pendientes_vencidas(corte).aggregate(
+                vencidas=Count('id'), residentes=Count('residente', distinct=True), monto_vencido=Sum('monto_total')
+            )
+            self.stdout.write(
+                f"🔎 {resumen['vencidas']} facturas de {resumen['residentes']} residentes "
+                f"vencerían al {corte} (Bs{resumen['monto_vencido'] or 0})"
+            )
+            return
+
+        concepto = None
+        if options['concepto_mora']:
+            try:
+                concepto = ConceptoPago.objects.get(pk=options['concepto_mora'])
+            except ConceptoPago.DoesNotExist:
+                raise CommandError('Concepto de mora no encontrado')
+
+        resumen = marcar_vencidas(corte, concepto)
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resumen['vencidas']} facturas vencidas ({resumen['residentes']} residentes, "
+            f"Bs{resumen['monto_vencido']}) al {resumen['corte']}"
+        ))
+        if resumen['recargos']:
+            self.stdout.write(f"  Recargos: {resumen['recargos']} por Bs{resumen['monto_recargos']}")
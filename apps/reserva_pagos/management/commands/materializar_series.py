@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.reserva_pagos.models import SerieReserva
+from apps.reserva_pagos.series import materializar
+
+
+class Command(BaseCommand):
+    help = 'Crea las reservas de las series activas para los próximos días'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=14, help='Días hacia adelante a materializar')
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        hasta = hoy + timedelta(days=options['dias'])
+        activas = SerieReserva.objects.filter(
+            estado='activa', area__estado='disponible', fecha_inicio__lte=hasta
+        ).filter(
+            Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=hoy)
+        ).order_by('id')
+
+        total_creadas = total_omitidas = 0
+        for serie in activas.iterator():
+            creadas, omitidas = materializar(serie, hasta, desde=hoy)
+            total_creadas += creadas
+            total_omitidas += omitidas
+            if omitidas:
+                self.stdout.write(self.style.WARNING(
+                    f'⚠️ Serie #{serie.id}: {omitidas} ocurrencias omitidas por conflicto'
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {total_creadas} reservas materializadas hasta {hasta} ({total_omitidas} omitidas)'
+        ))
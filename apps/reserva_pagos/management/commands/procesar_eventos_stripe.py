@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.reserva_pagos import webhooks
+
+
+class Command(BaseCommand):
+    help = 'Procesa eventos de Stripe que quedaron sin procesar (p. ej. si el proceso se reinició)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--antiguedad', type=int, default=30, help='Solo eventos recibidos hace más de N segundos')
+        parser.add_argument('--limite', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        ids = list(webhooks.pendientes(options['antiguedad']).values_list('id', flat=True)[:options['limite']])
+        resultado = {}
+        for evento_pk in ids:
+            try:
+                estado = webhooks.procesar_evento(evento_pk)
+            except Exception as e:
+                estado = 'error'
+                self.stderr.write(f'  Evento {evento_pk}: {e}')
+            resultado[estado] = resultado.get(estado, 0) + 1
+        resumen = ', '.join(f'{estado or "en otro proceso"}: {n}' for estado, n in resultado.items())
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(ids)} eventos revisados' + (f' ({resumen})' if resumen else '')))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.reserva_pagos.idempotencia import purgar
+
+
+class Command(BaseCommand):
+    help = 'Borra las respuestas guardadas de Idempotency-Key más viejas que IDEMPOTENCIA_HORAS'
+
+    def handle(self, *args, **options):
+        borradas = purgar()
+        self.stdout.write(self.style.SUCCESS(f'✅ {borradas} respuestas idempotentes borradas'))
@@ -0,0 +1,158 @@
+from datetime import timedelta
+
+import stripe
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.reserva_pagos import libro
+from apps.reserva_pagos.models import Factura, Pago
+from apps.reserva_pagos.pasarela import cliente
+
+PENDIENTES = ['pendiente', 'procesando']
+# Margen entre la creación del intent en Stripe y la del Pago en la base
+MARGEN = timedelta(minutes=10)
+POR_PAGINA = 100
+
+
+def estado_desde_intent(intent):
+    """Estado de Pago que corresponde al PaymentIntent (None = sin cambio)"""
+    if intent['status'] == 'succeeded':
+        return 'completado'
+    if intent['status'] == 'canceled':
+        return 'cancelado'
+    if intent['status'] == 'processing':
+        return 'procesando'
+    if intent['status'] == 'requires_payment_method' and intent.get('last_payment_error'):
+        return 'fallido'
+    return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Reconcilia los pagos pendientes con Stripe: lista los PaymentIntents por rango de fechas '
+        '(no uno por pago) y aplica los cambios con bulk_update. Si un rango tiene muchos más intents '
+        'que pagos del lote, los pide uno por uno'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=1000, help='Pagos por lote')
+        parser.add_argument('--ventana', type=int, default=6, help='Horas que puede abarcar un lote como máximo')
+        parser.add_argument('--desde', type=int, default=90, help='Solo pagos creados en los últimos N días')
+        parser.add_argument('--simular', action='store_true', help='Muestra las diferencias sin guardar')
+
+    def handle(self, *args, **options):
+        pagos = (
+            Pago.objects
+            .filter(
+                estado__in=PENDIENTES,
+                stripe_payment_intent_id__isnull=False,
+                fecha_creacion__gte=timezone.now() - timedelta(days=options['desde']),
+            )
+            .order_by('fecha_creacion', 'id')
+            .values_list('id', 'fecha_creacion', 'stripe_payment_intent_id', 'estado', 'factura_id')
+        )
+
+        resumen = {
+            'revisados': 0, 'sin_intent': 0, 'sin_cambio': 0, 'cambios': {}, 'facturas_pagadas': 0, 'por_id': 0,
+        }
+        ventana = timedelta(hours=options['ventana'])
+        siguiente = pagos
+        while True:
+            lote = list(siguiente[:options['lote']])
+            if not lote:
+                break
+            # El lote se cierra a las --lote filas o al pasar --ventana horas desde su primer pago
+            fin = lote[0][1] + ventana
+            lote = [fila for fila in lote if fila[1] <= fin]
+            # Paginación por (fecha_creacion, id): cada lote cubre una ventana de tiempo acotada
+            pago_id, fecha = lote[-1][0], lote[-1][1]
+            siguiente = pagos.filter(Q(fecha_creacion__gt=fecha) | Q(fecha_creacion=fecha, id__gt=pago_id))
+            self._procesar_lote(lote, resumen, options['simular'])
+
+        cambios = ', '.join(f'{k}: {v}' for k, v in sorted(resumen['cambios'].items())) or 'ninguno'
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resumen['revisados']} pagos revisados — cambios: {cambios}; "
+            f"sin cambio: {resumen['sin_cambio']}; intent no encontrado: {resumen['sin_intent']}; "
+            f"facturas pagadas: {resumen['facturas_pagadas']}; intents pedidos por id: {resumen['por_id']}"
+            + (' (simulación, no se guardó nada)' if options['simular'] else '')
+        ))
+
+    def _intents(self, desde, hasta, intent_ids, resumen):
+        """{id: intent} de los PaymentIntents del lote.
+
+        Lista los creados en [desde, hasta) de a 100. Si la ventana tiene más
+        intents que páginas valdría pedirlos por id (100 por pago del lote),
+        corta el listado y pide por id los que faltan.
+        """
+        tope = POR_PAGINA * len(intent_ids)
+        intents = {}
+        try:
+            pagina = cliente().payment_intents.list(params={
+                'created': {'gte': int(desde.timestamp()), 'lt': int(hasta.timestamp()) + 1},
+                'limit': POR_PAGINA,
+            })
+            for intent in pagina.auto_paging_iter():
+                intents[intent['id']] = intent
+                if len(intents) >= tope:
+                    break
+            else:
+                return intents
+
+            faltan = [i for i in intent_ids if i not in intents]
+            for intent_id in faltan:
+                try:
+                    intents[intent_id] = cliente().payment_intents.retrieve(intent_id)
+                except stripe.InvalidRequestError:
+                    pass  # no existe en Stripe: queda como intent no encontrado
+            resumen['por_id'] += len(faltan)
+            return intents
+        except stripe.StripeError as e:
+            raise CommandError(f'Error consultando Stripe: {e}')
+
+    def _procesar_lote(self, lote, resumen, simular):
+        intents = self._intents(lote[0][1] - MARGEN, lote[-1][1] + MARGEN, [fila[2] for fila in lote], resumen)
+        nuevos = {}
+        for pago_id, _, intent_id, estado, factura_id in lote:
+            resumen['revisados'] += 1
+            intent = intents.get(intent_id)
+            if intent is None:
+                resumen['sin_intent'] += 1
+                continue
+            nuevo = estado_desde_intent(intent)
+            if nuevo is None or nuevo == estado:
+                resumen['sin_cambio'] += 1
+                continue
+            nuevos[pago_id] = (nuevo, intent)
+            self.stdout.write(f'  Pago #{pago_id} ({intent_id}): {estado} -> {nuevo}'
+                              + (f' · factura #{factura_id} -> pagada' if nuevo == 'completado' else ''))
+
+        if not nuevos or simular:
+            for nuevo, _ in nuevos.values():
+                resumen['cambios'][nuevo] = resumen['cambios'].get(nuevo, 0) + 1
+            return
+
+        ahora = timezone.now()
+        with transaction.atomic():
+            # Se vuelve a leer con bloqueo: un webhook pudo haberlos actualizado
+            actualizar = list(Pago.objects.select_for_update().filter(id__in=nuevos, estado__in=PENDIENTES))
+            for pago in actualizar:
+                pago.estado, intent = nuevos[pago.id]
+                pago.fecha_actualizacion = ahora
+                if pago.estado == 'fallido':
+                    pago.notas = intent['last_payment_error'].get('message') or pago.notas
+                resumen['cambios'][pago.estado] = resumen['cambios'].get(pago.estado, 0) + 1
+            Pago.objects.bulk_update(actualizar, ['estado', 'notas', 'fecha_actualizacion'])
+            libro.abonar([p.id for p in actualizar if p.estado == 'completado'])
+
+            facturas = list(
+                Factura.objects.select_for_update()
+                .filter(id__in={p.factura_id for p in actualizar if p.estado == 'completado'})
+                .exclude(estado='pagada')
+            )
+            for factura in facturas:
+                factura.estado = 'pagada'
+                factura.fecha_actualizacion = ahora
+            Factura.objects.bulk_update(facturas, ['estado', 'fecha_actualizacion'])
+            resumen['facturas_pagadas'] += len(facturas)
@@ -0,0 +1,53 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.reserva_pagos import libro
+from apps.reserva_pagos.models import DetalleFactura, Factura
+
+
+class Command(BaseCommand):
+    help = 'Compara monto_total de cada factura con la suma de sus detalles (una sola consulta agrupada)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corregir', action='store_true', help='Recalcula en la base los totales que no cuadren')
+        parser.add_argument('--limite', type=int, default=50, help='Máximo de diferencias a listar')
+
+    def handle(self, *args, **options):
+        cero = Value(Decimal('0'), output_field=DecimalField(max_digits=10, decimal_places=2))
+        descuadradas = list(
+            Factura.objects
+            .annotate(suma=Coalesce(Sum('detalles__monto'), cero))
+            .exclude(monto_total=F('suma'))
+            .order_by('id')
+            .values_list('id', 'monto_total', 'suma')
+        )
+        if not descuadradas:
+            self.stdout.write(self.style.SUCCESS('✅ Todos los totales cuadran'))
+            return
+
+        self.stdout.write(self.style.WARNING(f'⚠️  {len(descuadradas)} facturas con total distinto a sus detalles'))
+        for factura_id, total, suma in descuadradas[:options['limite']]:
+            self.stdout.write(f'  Factura {factura_id}: monto_total={total} detalles={suma} diferencia={total - suma}')
+
+        if options['corregir']:
+            # La suma se vuelve a calcular dentro del UPDATE para no perder
+            # cambios hechos después de la consulta anterior
+            suma_detalles = (
+                DetalleFactura.objects
+                .filter(factura=OuterRef('pk'))
+                .values('factura')
+                .annotate(total=Sum('monto'))
+                .values('total')
+            )
+            ids = [d[0] for d in descuadradas]
+            with transaction.atomic():
+                corregidas = Factura.objects.filter(id__in=ids).update(
+                    monto_total=Coalesce(Subquery(suma_detalles), cero), fecha_actualizacion=timezone.now()
+                )
+                libro.sincronizar_facturas(ids, 'Ajuste de total')
+            self.stdout.write(self.style.SUCCESS(f'✅ {corregidas} facturas corregidas'))
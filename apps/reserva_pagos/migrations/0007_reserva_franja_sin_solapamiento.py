@@ -0,0 +1,87 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:59
+
+import apps.reserva_pagos.models
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0002_areacomun_capacidad_maxima_areacomun_costo_reserva_and_more'),
+        ('reserva_pagos', '0006_alter_pago_options_and_more'),
+        ('residentes', '0002_residente_foto_perfil_visitante_foto_referencial'),
+    ]
+
+    operations = [
+        # btree_gist permite usar "area =" dentro de la restricción GiST
+        BtreeGistExtension(),
+        migrations.AddField(
+            model_name='reserva',
+            name='franja',
+            field=models.GeneratedField(db_persist=True, expression=apps.reserva_pagos.models.FranjaReserva('fecha_reserva', 'hora_inicio', 'hora_fin'), output_field=apps.reserva_pagos.models.RangoHorario()),
+        ),
+        # Las reservas solapadas que ya existan se cancelan: por área y en orden
+        # de inicio se conserva cada reserva que empieza después del fin de la
+        # última conservada. Las canceladas quedan en reserva_pagos_solapada_0007
+        # (con su estado anterior) para avisar a los residentes; revertir la
+        # migración les devuelve el estado. Las que no tienen fecha u horas
+        # quedan fuera de la restricción (su franja sería (,)). Las FK diferidas
+        # se comprueban al final para poder alterar la tabla a continuación.
+        migrations.RunSQL(
+            sql="""
+                CREATE TABLE reserva_pagos_solapada_0007 (
+                    reserva_id bigint PRIMARY KEY,
+                    area_id bigint,
+                    residente_id bigint,
+                    franja tsrange NOT NULL,
+                    estado_anterior varchar(20) NOT NULL,
+                    cancelada timestamptz NOT NULL DEFAULT now()
+                );
+                DO $$
+                DECLARE
+                    fila record;
+                    area_actual bigint;
+                    fin_conservada timestamp;
+                    canceladas integer := 0;
+                BEGIN
+                    FOR fila IN
+                        SELECT id, area_id, residente_id, franja, estado
+                        FROM reserva_pagos_reserva
+                        WHERE estado <> 'cancelada'
+                          AND fecha_reserva IS NOT NULL AND hora_inicio IS NOT NULL AND hora_fin IS NOT NULL
+                        ORDER BY area_id, lower(franja), id
+                    LOOP
+                        IF fila.area_id IS DISTINCT FROM area_actual THEN
+                            area_actual := fila.area_id;
+                            fin_conservada := NULL;
+                        END IF;
+                        IF lower(fila.franja) < fin_conservada THEN
+                            INSERT INTO reserva_pagos_solapada_0007 (reserva_id, area_id, residente_id, franja, estado_anterior)
+                            VALUES (fila.id, fila.area_id, fila.residente_id, fila.franja, fila.estado);
+                            canceladas := canceladas + 1;
+                        ELSE
+                            fin_conservada := upper(fila.franja);
+                        END IF;
+                    END LOOP;
+                    UPDATE reserva_pagos_reserva r SET estado = 'cancelada'
+                    FROM reserva_pagos_solapada_0007 s WHERE r.id = s.reserva_id;
+                    IF canceladas > 0 THEN
+                        RAISE NOTICE '% reservas solapadas canceladas (ver reserva_pagos_solapada_0007)', canceladas;
+                    END IF;
+                END $$;
+                SET CONSTRAINTS ALL IMMEDIATE;
+            """,
+            reverse_sql="""
+                UPDATE reserva_pagos_reserva r SET estado = s.estado_anterior
+                FROM reserva_pagos_solapada_0007 s WHERE r.id = s.reserva_id;
+                DROP TABLE reserva_pagos_solapada_0007;
+                SET CONSTRAINTS ALL IMMEDIATE;
+            """,
+        ),
+        migrations.AddConstraint(
+            model_name='reserva',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(models.Q(('estado', 'cancelada'), _negated=True), ('fecha_reserva__isnull', False), ('hora_fin__isnull', False), ('hora_inicio__isnull', False)), expressions=[('area', '='), ('franja', '&&')], name='reserva_sin_solapamiento'),
+        ),
+    ]
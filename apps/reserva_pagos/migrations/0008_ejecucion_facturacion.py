@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0007_reserva_franja_sin_solapamiento'),
+        ('residentes', '0002_residente_foto_perfil_visitante_foto_referencial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EjecucionFacturacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(help_text='Clave de idempotencia, p. ej. mantenimiento-2025-10', max_length=100, unique=True)),
+                ('descripcion', models.TextField(blank=True, max_length=200)),
+                ('fecha_limite', models.DateField(blank=True, null=True)),
+                ('parametros', models.JSONField(default=dict, help_text='Conceptos y filtros de residentes')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('total_residentes', models.PositiveIntegerField(default=0)),
+                ('facturas_creadas', models.PositiveIntegerField(default=0)),
+                ('monto_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('finalizado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Ejecución de Facturación',
+                'verbose_name_plural': 'Ejecuciones de Facturación',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='ejecucion',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='facturas', to='reserva_pagos.ejecucionfacturacion'),
+        ),
+        migrations.AddConstraint(
+            model_name='factura',
+            constraint=models.UniqueConstraint(fields=('ejecucion', 'residente'), name='factura_unica_por_ejecucion'),
+        ),
+    ]
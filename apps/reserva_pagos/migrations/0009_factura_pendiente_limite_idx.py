@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0008_ejecucion_facturacion'),
+        ('residentes', '0002_residente_foto_perfil_visitante_foto_referencial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(condition=models.Q(('estado', 'pendiente')), fields=['estado', 'fecha_limite'], name='factura_pendiente_limite_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0009_factura_pendiente_limite_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pago',
+            name='stripe_payment_intent_id',
+            field=models.CharField(blank=True, db_index=True, max_length=200, null=True),
+        ),
+        migrations.CreateModel(
+            name='EventoStripe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('evento_id', models.CharField(max_length=100, unique=True)),
+                ('tipo', models.CharField(max_length=100)),
+                ('payload', models.JSONField()),
+                ('estado', models.CharField(choices=[('recibido', 'Recibido'), ('procesado', 'Procesado'), ('ignorado', 'Ignorado'), ('error', 'Error')], default='recibido', max_length=20)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('recibido', models.DateTimeField(auto_now_add=True)),
+                ('procesado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Evento de Stripe',
+                'verbose_name_plural': 'Eventos de Stripe',
+                'ordering': ['-id'],
+                'indexes': [models.Index(condition=models.Q(('estado__in', ['recibido', 'error'])), fields=['recibido'], name='evento_stripe_pendiente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0010_evento_stripe'),
+        ('residentes', '0002_residente_foto_perfil_visitante_foto_referencial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoResidente',
+            fields=[
+                ('residente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='saldo', serialize=False, to='residentes.residente')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_cargos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('movimientos', models.PositiveIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Saldo de Residente',
+                'verbose_name_plural': 'Saldos de Residentes',
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoCuenta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('cargo', 'Cargo'), ('anulacion', 'Anulación'), ('abono', 'Abono'), ('reembolso', 'Reembolso')], max_length=20)),
+                ('monto', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('descripcion', models.CharField(blank=True, max_length=200)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('factura', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='reserva_pagos.factura')),
+                ('pago', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='movimientos', to='reserva_pagos.pago')),
+                ('residente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movimientos', to='residentes.residente')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Cuenta',
+                'verbose_name_plural': 'Movimientos de Cuenta',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['residente', '-id'], name='movimiento_residente_idx'), models.Index(fields=['factura', 'tipo'], name='movimiento_factura_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('pago__isnull', False)), fields=('pago', 'tipo'), name='movimiento_unico_por_pago')],
+            },
+        ),
+        # Libro inicial a partir de lo que ya existe: cargos de las facturas no
+        # canceladas, abonos de los pagos completados (o reembolsados) y
+        # reembolsos; después el saldo de cada residente.
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO reserva_pagos_movimientocuenta (residente_id, tipo, monto, factura_id, pago_id, descripcion, creado)
+                SELECT residente_id, 'cargo', monto_total, id, NULL, 'Factura #' || id, NOW()
+                FROM reserva_pagos_factura
+                WHERE estado <> 'cancelada' AND monto_total <> 0;
+
+                INSERT INTO reserva_pagos_movimientocuenta (residente_id, tipo, monto, factura_id, pago_id, descripcion, creado)
+                SELECT residente_id, 'abono', -monto, factura_id, id, 'Pago #' || id, NOW()
+                FROM reserva_pagos_pago
+                WHERE estado IN ('completado', 'reembolsado');
+
+                INSERT INTO reserva_pagos_movimientocuenta (residente_id, tipo, monto, factura_id, pago_id, descripcion, creado)
+                SELECT residente_id, 'reembolso', monto, factura_id, id, 'Reembolso pago #' || id, NOW()
+                FROM reserva_pagos_pago
+                WHERE estado = 'reembolsado';
+
+                INSERT INTO reserva_pagos_saldoresidente (residente_id, saldo, total_cargos, total_pagado, movimientos, actualizado)
+                SELECT residente_id,
+                       SUM(monto),
+                       COALESCE(SUM(monto) FILTER (WHERE tipo IN ('cargo', 'anulacion')), 0),
+                       COALESCE(-SUM(monto) FILTER (WHERE tipo IN ('abono', 'reembolso')), 0),
+                       COUNT(*),
+                       NOW()
+                FROM reserva_pagos_movimientocuenta
+                GROUP BY residente_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0003_horario_dia_numero'),
+        ('reserva_pagos', '0011_libro_cuenta'),
+        ('residentes', '0002_residente_foto_perfil_visitante_foto_referencial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaResumen',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('hasta', models.DateField()),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenConceptosDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('detalles', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario por concepto',
+                'verbose_name_plural': 'Resúmenes diarios por concepto',
+                'ordering': ['fecha', 'concepto'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenFacturasDia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('facturas', models.PositiveIntegerField(default=0)),
+                ('monto_facturado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('facturas_pagadas', models.PositiveIntegerField(default=0)),
+                ('monto_pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('facturas_vencidas', models.PositiveIntegerField(default=0)),
+                ('monto_vencido', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de facturas',
+                'verbose_name_plural': 'Resúmenes diarios de facturas',
+                'ordering': ['fecha'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha_emision'], name='factura_emision_idx'),
+        ),
+        migrations.AddField(
+            model_name='resumenconceptosdia',
+            name='area',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='areas.areacomun'),
+        ),
+        migrations.AddField(
+            model_name='resumenconceptosdia',
+            name='concepto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='reserva_pagos.conceptopago'),
+        ),
+        migrations.AddIndex(
+            model_name='resumenconceptosdia',
+            index=models.Index(fields=['fecha'], name='resumen_concepto_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0012_resumenes_reportes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RespuestaIdempotente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=255)),
+                ('huella', models.CharField(help_text='SHA-256 del método, ruta y cuerpo de la petición', max_length=64)),
+                ('codigo', models.PositiveSmallIntegerField()),
+                ('respuesta', models.JSONField()),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Respuesta idempotente',
+                'verbose_name_plural': 'Respuestas idempotentes',
+                'indexes': [models.Index(fields=['creado'], name='idempotencia_creado_idx')],
+                'constraints': [models.UniqueConstraint(fields=('usuario', 'clave'), name='respuesta_idempotente_unica')],
+            },
+        ),
+    ]
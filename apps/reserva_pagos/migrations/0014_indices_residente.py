@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0003_horario_dia_numero'),
+        ('reserva_pagos', '0013_respuesta_idempotente'),
+        ('residentes', '0003_indices_residente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['residente', 'id'], name='factura_residente_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pago',
+            index=models.Index(fields=['residente', '-fecha_creacion'], name='pago_residente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(fields=['residente', 'id'], name='reserva_residente_idx'),
+        ),
+    ]
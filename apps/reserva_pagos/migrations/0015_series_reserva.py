@@ -0,0 +1,76 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:18
+
+import django.contrib.postgres.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0003_horario_dia_numero'),
+        ('reserva_pagos', '0014_indices_residente'),
+        ('residentes', '0003_indices_residente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerieReserva',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descripcion', models.TextField(blank=True, max_length=200)),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('frecuencia', models.CharField(choices=[('diaria', 'Diaria'), ('semanal', 'Semanal')], default='semanal', max_length=10)),
+                ('intervalo', models.PositiveSmallIntegerField(default=1, help_text='Cada cuántos días o semanas')),
+                ('dias_semana', django.contrib.postgres.fields.ArrayField(base_field=models.PositiveSmallIntegerField(), blank=True, default=list, help_text='Solo semanal: 0 = Lunes ... 6 = Domingo', size=None)),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_fin', models.DateField(blank=True, help_text='Vacía = sin fecha de fin', null=True)),
+                ('monto_total', models.DecimalField(decimal_places=2, default=0, help_text='Por ocurrencia', max_digits=10)),
+                ('estado', models.CharField(choices=[('activa', 'Activa'), ('cancelada', 'Cancelada')], default='activa', max_length=20)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('area', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_reserva', to='areas.areacomun')),
+                ('residente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='series_reserva', to='residentes.residente')),
+            ],
+            options={
+                'verbose_name': 'Serie de Reservas',
+                'verbose_name_plural': 'Series de Reservas',
+                'ordering': ['id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ExcepcionSerie',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('motivo', models.CharField(blank=True, max_length=200)),
+                ('serie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='excepciones', to='reserva_pagos.seriereserva')),
+            ],
+            options={
+                'verbose_name': 'Excepción de Serie',
+                'verbose_name_plural': 'Excepciones de Serie',
+                'ordering': ['fecha'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reserva',
+            name='serie',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservas', to='reserva_pagos.seriereserva'),
+        ),
+        migrations.AddConstraint(
+            model_name='reserva',
+            constraint=models.UniqueConstraint(fields=('serie', 'fecha_reserva'), name='reserva_unica_por_serie_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='seriereserva',
+            index=models.Index(condition=models.Q(('estado', 'activa')), fields=['area', 'fecha_inicio'], name='serie_area_activa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seriereserva',
+            index=models.Index(fields=['residente', 'id'], name='serie_residente_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='excepcionserie',
+            constraint=models.UniqueConstraint(fields=('serie', 'fecha'), name='excepcion_serie_unica'),
+        ),
+    ]
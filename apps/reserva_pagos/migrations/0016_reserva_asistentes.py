@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0015_series_reserva'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reserva',
+            name='asistentes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
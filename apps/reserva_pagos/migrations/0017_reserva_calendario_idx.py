@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('areas', '0003_horario_dia_numero'),
+        ('reserva_pagos', '0016_reserva_asistentes'),
+        ('residentes', '0003_indices_residente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reserva',
+            index=models.Index(condition=models.Q(('estado', 'cancelada'), _negated=True), fields=['fecha_reserva', 'area'], include=('hora_inicio', 'hora_fin', 'estado'), name='reserva_calendario_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:40
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reserva_pagos', '0017_reserva_calendario_idx'),
+        ('residentes', '0003_indices_residente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now()),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha_actualizacion'], name='factura_actualizacion_idx'),
+        ),
+    ]
@@ -1,8 +1,100 @@
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import ArrayField, DateTimeRangeField, RangeOperators
+from django.conf import settings
 from django.db import models
+from django.db.models.functions import Now
+from django.utils import timezone
 from apps.residentes.models import Residente
 from apps.areas.models import AreaComun
 
 
+class RangoHorario(DateTimeRangeField):
+    """Rango de timestamps sin zona horaria (tsrange): fecha + hora locales"""
+
+    def db_type(self, connection):
+        return 'tsrange'
+
+
+class FranjaReserva(models.Func):
+    """tsrange [fecha + inicio, fecha + fin); si fin <= inicio termina al día siguiente"""
+    output_field = RangoHorario()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (fecha, p_fecha), (inicio, p_inicio), (fin, p_fin) = (
+            compiler.compile(e) for e in self.get_source_expressions()
+        )
+        sql = (
+            f"tsrange({fecha} + {inicio}, "
+            f"{fecha} + (CASE WHEN {fin} > {inicio} THEN 0 ELSE 1 END) + {fin}, '[)')"
+        )
+        return sql, (*p_fecha, *p_inicio, *p_fecha, *p_fin, *p_inicio, *p_fin)
+
+
+class SerieReserva(models.Model):
+    """Reserva recurrente (p. ej. el gimnasio todos los martes de 7 a 8).
+
+    Las ocurrencias no se guardan: se calculan dentro de la ventana que se
+    consulte (``apps.reserva_pagos.series``). Solo se materializan como
+    ``Reserva`` (con ``serie``) cuando se acercan o se modifican.
+    """
+    FRECUENCIA_CHOICES = [
+        ("diaria", "Diaria"),
+        ("semanal", "Semanal"),
+    ]
+    ESTADO_CHOICES = [
+        ("activa", "Activa"),
+        ("cancelada", "Cancelada"),
+    ]
+
+    residente = models.ForeignKey(Residente, on_delete=models.CASCADE, related_name="series_reserva")
+    area = models.ForeignKey(AreaComun, on_delete=models.CASCADE, related_name="series_reserva")
+    descripcion = models.TextField(max_length=200, blank=True)
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    frecuencia = models.CharField(max_length=10, choices=FRECUENCIA_CHOICES, default="semanal")
+    intervalo = models.PositiveSmallIntegerField(default=1, help_text="Cada cuántos días o semanas")
+    dias_semana = ArrayField(
+        models.PositiveSmallIntegerField(), default=list, blank=True,
+        help_text="Solo semanal: 0 = Lunes ... 6 = Domingo"
+    )
+    fecha_inicio = models.DateField()
+    fecha_fin = models.DateField(null=True, blank=True, help_text="Vacía = sin fecha de fin")
+    monto_total = models.DecimalField(max_digits=10, decimal_places=2, default=0, help_text="Por ocurrencia")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="activa")
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Serie de Reservas"
+        verbose_name_plural = "Series de Reservas"
+        indexes = [
+            models.Index(fields=["area", "fecha_inicio"], name="serie_area_activa_idx",
+                         condition=models.Q(estado="activa")),
+            models.Index(fields=["residente", "id"], name="serie_residente_idx"),
+        ]
+
+    def __str__(self):
+        return f"Serie {self.get_frecuencia_display().lower()} de {self.residente} en {self.area}"
+
+
+class ExcepcionSerie(models.Model):
+    """Fecha en la que una serie no ocurre (ocurrencia cancelada)"""
+    serie = models.ForeignKey(SerieReserva, on_delete=models.CASCADE, related_name="excepciones")
+    fecha = models.DateField()
+    motivo = models.CharField(max_length=200, blank=True)
+
+    class Meta:
+        ordering = ["fecha"]
+        verbose_name = "Excepción de Serie"
+        verbose_name_plural = "Excepciones de Serie"
+        constraints = [
+            models.UniqueConstraint(fields=["serie", "fecha"], name="excepcion_serie_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.serie_id} sin ocurrencia el {self.fecha}"
+
+
 class Reserva(models.Model):
     ESTADO_CHOICE = [
         ("pendiente", "Pendiente"),
@@ -19,11 +111,43 @@ class Reserva(models.Model):
     hora_inicio = models.TimeField(blank=True, null=True)
     hora_fin = models.TimeField(blank=True, null=True)
     estado = models.CharField(max_length=20, choices=ESTADO_CHOICE, default="pendiente")
+    asistentes = models.PositiveIntegerField(blank=True, null=True)
+    # Ocurrencia materializada de una serie (una por serie y fecha)
+    serie = models.ForeignKey(
+        SerieReserva, on_delete=models.SET_NULL, null=True, blank=True, related_name="reservas"
+    )
+    # Calculada por la base; la usa la restricción que impide reservas solapadas
+    franja = models.GeneratedField(
+        expression=FranjaReserva('fecha_reserva', 'hora_inicio', 'hora_fin'),
+        output_field=RangoHorario(),
+        db_persist=True,
+    )
 
     class Meta:
         ordering = ["id"]
         verbose_name = "Reserva"
         verbose_name_plural = "Reservas"
+        constraints = [
+            # Sin fecha u horas la franja sería (,) y se solaparía con todo: esas filas quedan fuera
+            ExclusionConstraint(
+                name="reserva_sin_solapamiento",
+                expressions=[("area", RangeOperators.EQUAL), ("franja", RangeOperators.OVERLAPS)],
+                condition=~models.Q(estado="cancelada") & models.Q(
+                    fecha_reserva__isnull=False, hora_inicio__isnull=False, hora_fin__isnull=False
+                ),
+            ),
+            models.UniqueConstraint(fields=["serie", "fecha_reserva"], name="reserva_unica_por_serie_fecha"),
+        ]
+        indexes = [
+            # "Mis reservas": filtro por residente en el orden del listado
+            models.Index(fields=["residente", "id"], name="reserva_residente_idx"),
+            # Calendario mensual: rango de fechas (y área) sin leer la tabla
+            models.Index(
+                fields=["fecha_reserva", "area"], name="reserva_calendario_idx",
+                include=["hora_inicio", "hora_fin", "estado"],
+                condition=~models.Q(estado="cancelada"),
+            ),
+        ]
 
     def __str__(self):
         return f"Reserva de {self.residente} en {self.area} el {self.fecha_reserva}"
@@ -42,6 +166,37 @@ class ConceptoPago(models.Model):
         return self.nombre
 
 
+class EjecucionFacturacion(models.Model):
+    """Facturación masiva (p. ej. mantenimiento mensual) identificada por una clave única"""
+    ESTADO_CHOICES = [
+        ("pendiente", "Pendiente"),
+        ("en_proceso", "En proceso"),
+        ("completada", "Completada"),
+        ("fallida", "Fallida"),
+    ]
+
+    clave = models.CharField(max_length=100, unique=True, help_text="Clave de idempotencia, p. ej. mantenimiento-2025-10")
+    descripcion = models.TextField(max_length=200, blank=True)
+    fecha_limite = models.DateField(null=True, blank=True)
+    parametros = models.JSONField(default=dict, help_text="Conceptos y filtros de residentes")
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default="pendiente")
+    total_residentes = models.PositiveIntegerField(default=0)
+    facturas_creadas = models.PositiveIntegerField(default=0)
+    monto_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    finalizado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        verbose_name = "Ejecución de Facturación"
+        verbose_name_plural = "Ejecuciones de Facturación"
+
+    def __str__(self):
+        return f"Facturación {self.clave} ({self.estado})"
+
+
 class Factura(models.Model):
     FACTURA_ESTADO_CHOICES = [
         ("pendiente", "Pendiente"),
@@ -57,17 +212,50 @@ class Factura(models.Model):
     )
     fecha_limite = models.DateField(null=True, blank=True)
     fecha_emision = models.DateField(auto_now_add=True)
+    # Los UPDATE en bloque la ponen a mano: los resúmenes de reportes recalculan los días tocados
+    fecha_actualizacion = models.DateTimeField(auto_now=True, db_default=Now())
     descripcion = models.TextField(max_length=200, blank=True)
+    ejecucion = models.ForeignKey(
+        EjecucionFacturacion, on_delete=models.SET_NULL, null=True, blank=True, related_name="facturas"
+    )
 
 
     class Meta:
         ordering = ["id"]
         verbose_name = "Factura"
         verbose_name_plural = "Facturas"
+        constraints = [
+            # Una ejecución no factura dos veces al mismo residente
+            models.UniqueConstraint(fields=["ejecucion", "residente"], name="factura_unica_por_ejecucion"),
+        ]
+        indexes = [
+            # Solo las pendientes: es lo que recorre el barrido de vencidas
+            models.Index(
+                fields=["estado", "fecha_limite"],
+                name="factura_pendiente_limite_idx",
+                condition=models.Q(estado="pendiente"),
+            ),
+            # Rango de días que recalculan los resúmenes de reportes
+            models.Index(fields=["fecha_emision"], name="factura_emision_idx"),
+            # Facturas cambiadas desde la última actualización de los resúmenes
+            models.Index(fields=["fecha_actualizacion"], name="factura_actualizacion_idx"),
+            models.Index(fields=["residente", "id"], name="factura_residente_idx"),
+        ]
 
     def __str__(self):
         return f"Factura {self.id} para {self.residente}"
 
+    @classmethod
+    def sumar_al_total(cls, factura_id, delta):
+        """Suma ``delta`` a monto_total en la base (UPDATE atómico, sin leer la fila).
+
+        Con ``delta`` 0 solo marca la factura como actualizada (cambió un detalle).
+        """
+        cambios = {'fecha_actualizacion': timezone.now()}
+        if delta:
+            cambios['monto_total'] = models.F('monto_total') + delta
+        cls.objects.filter(pk=factura_id).update(**cambios)
+
 
 class DetalleFactura(models.Model):
     factura = models.ForeignKey(
@@ -112,7 +300,7 @@ class Pago(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS_PAGO, default='pendiente')
     
     # Campos específicos de Stripe
-    stripe_payment_intent_id = models.CharField(max_length=200, null=True, blank=True)
+    stripe_payment_intent_id = models.CharField(max_length=200, null=True, blank=True, db_index=True)
     stripe_client_secret = models.CharField(max_length=300, null=True, blank=True)
     
     # Timestamps y datos adicionales
@@ -125,6 +313,168 @@ class Pago(models.Model):
         ordering = ['-fecha_creacion']
         verbose_name = 'Pago'
         verbose_name_plural = 'Pagos'
+        indexes = [
+            models.Index(fields=['residente', '-fecha_creacion'], name='pago_residente_fecha_idx'),
+        ]
     
     def __str__(self):
         return f'Pago #{self.id} - Factura #{self.factura.id} - Bs{self.monto}'
+
+
+class EventoStripe(models.Model):
+    """Evento recibido por el webhook de Stripe, guardado tal cual llegó"""
+    ESTADOS = [
+        ('recibido', 'Recibido'),
+        ('procesado', 'Procesado'),
+        ('ignorado', 'Ignorado'),
+        ('error', 'Error'),
+    ]
+
+    evento_id = models.CharField(max_length=100, unique=True)
+    tipo = models.CharField(max_length=100)
+    payload = models.JSONField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='recibido')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    recibido = models.DateTimeField(auto_now_add=True)
+    procesado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Evento de Stripe'
+        verbose_name_plural = 'Eventos de Stripe'
+        indexes = [
+            models.Index(fields=['recibido'], name='evento_stripe_pendiente_idx',
+                         condition=models.Q(estado__in=['recibido', 'error'])),
+        ]
+
+    def __str__(self):
+        return f'{self.tipo} {self.evento_id} ({self.estado})'
+
+
+class MovimientoCuenta(models.Model):
+    """Asiento del libro de cuenta de un residente. Solo se agregan, nunca se modifican.
+
+    ``monto`` positivo aumenta la deuda (cargos, reembolsos) y negativo la
+    disminuye (pagos, anulaciones).
+    """
+    TIPOS = [
+        ('cargo', 'Cargo'),
+        ('anulacion', 'Anulación'),
+        ('abono', 'Abono'),
+        ('reembolso', 'Reembolso'),
+    ]
+
+    residente = models.ForeignKey(Residente, on_delete=models.CASCADE, related_name='movimientos')
+    tipo = models.CharField(max_length=20, choices=TIPOS)
+    monto = models.DecimalField(max_digits=12, decimal_places=2)
+    factura = models.ForeignKey(Factura, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos')
+    pago = models.ForeignKey(Pago, on_delete=models.SET_NULL, null=True, blank=True, related_name='movimientos')
+    descripcion = models.CharField(max_length=200, blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Movimiento de Cuenta'
+        verbose_name_plural = 'Movimientos de Cuenta'
+        constraints = [
+            # Un pago se abona (y se reembolsa) una sola vez aunque lo avisen el webhook y la conciliación
+            models.UniqueConstraint(fields=['pago', 'tipo'], name='movimiento_unico_por_pago',
+                                    condition=models.Q(pago__isnull=False)),
+        ]
+        indexes = [
+            models.Index(fields=['residente', '-id'], name='movimiento_residente_idx'),
+            models.Index(fields=['factura', 'tipo'], name='movimiento_factura_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_tipo_display()} {self.monto} - {self.residente}'
+
+
+class SaldoResidente(models.Model):
+    """Saldo materializado del libro: se lee con una sola consulta por clave primaria"""
+    residente = models.OneToOneField(Residente, on_delete=models.CASCADE, primary_key=True, related_name='saldo')
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_cargos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    movimientos = models.PositiveIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Saldo de Residente'
+        verbose_name_plural = 'Saldos de Residentes'
+
+    def __str__(self):
+        return f'Saldo de {self.residente}: {self.saldo}'
+
+
+class ResumenFacturasDia(models.Model):
+    """Totales de las facturas emitidas cada día (no canceladas), para reportes"""
+    fecha = models.DateField(unique=True)
+    facturas = models.PositiveIntegerField(default=0)
+    monto_facturado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    facturas_pagadas = models.PositiveIntegerField(default=0)
+    monto_pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    facturas_vencidas = models.PositiveIntegerField(default=0)
+    monto_vencido = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['fecha']
+        verbose_name = 'Resumen diario de facturas'
+        verbose_name_plural = 'Resúmenes diarios de facturas'
+
+    def __str__(self):
+        return f'Facturas del {self.fecha}: {self.monto_facturado}'
+
+
+class ResumenConceptosDia(models.Model):
+    """Montos facturados por día, concepto y área (si el detalle es de una reserva)"""
+    fecha = models.DateField()
+    concepto = models.ForeignKey(ConceptoPago, on_delete=models.CASCADE, related_name='+')
+    area = models.ForeignKey(AreaComun, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    detalles = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['fecha', 'concepto']
+        verbose_name = 'Resumen diario por concepto'
+        verbose_name_plural = 'Resúmenes diarios por concepto'
+        indexes = [
+            models.Index(fields=['fecha'], name='resumen_concepto_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.concepto_id} el {self.fecha}: {self.monto}'
+
+
+class MarcaResumen(models.Model):
+    """Hasta qué fecha están calculados los resúmenes (marca de agua de la actualización incremental)"""
+    nombre = models.CharField(max_length=50, primary_key=True)
+    hasta = models.DateField()
+    actualizado = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.nombre} hasta {self.hasta}'
+
+
+class RespuestaIdempotente(models.Model):
+    """Respuesta guardada para un header Idempotency-Key: un reintento con la misma clave la recibe de nuevo"""
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    clave = models.CharField(max_length=255)
+    huella = models.CharField(max_length=64, help_text='SHA-256 del método, ruta y cuerpo de la petición')
+    codigo = models.PositiveSmallIntegerField()
+    respuesta = models.JSONField()
+    creado = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Respuesta idempotente'
+        verbose_name_plural = 'Respuestas idempotentes'
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'clave'], name='respuesta_idempotente_unica'),
+        ]
+        indexes = [
+            models.Index(fields=['creado'], name='idempotencia_creado_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.clave} ({self.codigo})'
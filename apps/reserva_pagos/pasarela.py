@@ -0,0 +1,107 @@
+"""
+Cliente de Stripe del backend.
+
+- Un único ``StripeClient`` por proceso con ``RequestsClient`` (una sesión
+  HTTP persistente por hilo, así se reutilizan las conexiones TLS), timeout
+  por llamada y reintentos automáticos ante errores de red, 409 y 5xx.
+- Claves de idempotencia ``factura-<id>-intento-<n>``: un reintento del
+  cliente o de la red devuelve el mismo PaymentIntent en vez de crear otro.
+- Montos en centavos exactos a partir de ``Decimal`` (sin pasar por float).
+- ``STRIPE_API_BASE`` permite apuntar a ``stripe_local.py`` en desarrollo.
+"""
+import threading
+from decimal import ROUND_HALF_UP, Decimal
+
+import stripe
+from django.conf import settings
+from django.db import transaction
+
+from .models import Factura, Pago
+
+_cliente = None
+_bloqueo = threading.Lock()
+
+
+def cliente():
+    global _cliente
+    with _bloqueo:
+        if _cliente is None:
+            _cliente = stripe.StripeClient(
+                settings.STRIPE_SECRET_KEY,
+                base_addresses={'api': settings.STRIPE_API_BASE},
+                http_client=stripe.RequestsClient(timeout=settings.STRIPE_TIMEOUT),
+                max_network_retries=settings.STRIPE_MAX_RETRIES,
+            )
+    return _cliente
+
+
+def a_centavos(monto):
+    """Decimal('10.005') -> 1001 (redondeo comercial, sin errores de float)"""
+    return int((Decimal(monto) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def crear_payment_intent(factura_id, residente):
+    """Devuelve ``(pago, reutilizado)`` con un Pago pendiente y su PaymentIntent.
+
+    Si la factura ya tiene un pago de Stripe pendiente por el mismo monto se
+    devuelve ese. La clave de idempotencia se calcula con la factura
+    bloqueada, pero las llamadas a Stripe se hacen fuera de la transacción
+    para no retener el bloqueo durante la red: dos peticiones simultáneas
+    usan la misma clave (Stripe devuelve el mismo intent) y la segunda
+    encuentra el Pago ya guardado.
+    Lanza ``Factura.DoesNotExist``, ``ValueError`` (factura pagada) o
+    ``stripe.StripeError``.
+    """
+    with transaction.atomic():
+        factura = Factura.objects.select_for_update().get(id=factura_id, residente=residente)
+        if factura.estado == 'pagada':
+            raise ValueError('La factura ya está pagada')
+
+        monto = factura.monto_total
+        centavos = a_centavos(monto)
+        intentos = Pago.objects.filter(factura=factura, metodo_pago='stripe').exclude(stripe_payment_intent_id=None)
+        pendiente = intentos.filter(estado='pendiente').order_by('-id').first()
+        anterior = None
+        if pendiente is not None:
+            if a_centavos(pendiente.monto) == centavos and pendiente.stripe_client_secret:
+                return pendiente, True
+            # El total de la factura cambió: el intent anterior ya no sirve
+            anterior = pendiente.stripe_payment_intent_id
+            pendiente.estado = 'cancelado'
+            pendiente.save(update_fields=['estado', 'fecha_actualizacion'])
+        clave = f'factura-{factura.id}-intento-{intentos.count() + 1}'
+        descripcion = factura.descripcion or f'Pago factura #{factura.id}'
+
+    if anterior is not None:
+        try:
+            cliente().payment_intents.cancel(anterior)
+        except stripe.StripeError:
+            pass  # ya cancelado o inexistente en Stripe
+    intent = cliente().payment_intents.create(
+        params={
+            'amount': centavos,
+            'currency': settings.STRIPE_CURRENCY,
+            'metadata': {
+                'factura_id': str(factura_id),
+                'residente_id': str(residente.id),
+                'descripcion': descripcion,
+            },
+        },
+        options={'idempotency_key': clave},
+    )
+
+    with transaction.atomic():
+        Factura.objects.select_for_update().filter(id=factura_id).values_list('id').first()
+        existente = Pago.objects.filter(stripe_payment_intent_id=intent.id).first()
+        if existente is not None:
+            return existente, True
+        pago = Pago.objects.create(
+            factura_id=factura_id,
+            residente=residente,
+            monto=monto,
+            metodo_pago='stripe',
+            estado='pendiente',
+            stripe_payment_intent_id=intent.id,
+            stripe_client_secret=intent.client_secret,
+        )
+        return pago, False
@@ -0,0 +1,169 @@
+"""
+Reportes financieros sobre tablas de resumen diarias.
+
+``actualizar()`` recalcula con agregados SQL (``Count``/``Sum`` agrupados por
+día) solo los días desde la última actualización y los días de emisión de
+las facturas anteriores que cambiaron después de ella (estado, total o
+detalles: ``Factura.fecha_actualizacion``), y reemplaza esas filas en
+``ResumenFacturasDia`` y ``ResumenConceptosDia``. Borrar una factura no deja
+fila que encontrar: ``factura_borrada`` retrocede la marca a su día. Los
+reportes agrupan esas filas por mes: leen a lo sumo una fila por día (y por
+concepto/área), no importa cuántos años de facturas haya.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import DetalleFactura, Factura, MarcaResumen, ResumenConceptosDia, ResumenFacturasDia
+
+MARCA = 'facturacion'
+# Transacciones que empezaron antes de la última actualización y confirmaron después
+MARGEN = timedelta(minutes=5)
+
+
+def _cero():
+    return Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def actualizar(desde=None):
+    """Recalcula los resúmenes desde ``desde`` (por defecto, desde la marca y los días con facturas cambiadas)"""
+    hoy = timezone.localdate()
+
+    with transaction.atomic():
+        # La fila de la marca serializa las actualizaciones simultáneas
+        marca, creada = MarcaResumen.objects.select_for_update().get_or_create(
+            nombre=MARCA, defaults={'hasta': hoy}
+        )
+        inicio = timezone.now()
+        tocados = set()
+        if desde is None:
+            if creada:
+                desde = Factura.objects.aggregate(primera=Min('fecha_emision'))['primera'] or hoy
+            else:
+                desde = marca.hasta
+                tocados = set(
+                    Factura.objects
+                    .filter(fecha_actualizacion__gte=marca.actualizado - MARGEN, fecha_emision__lt=desde)
+                    .values_list('fecha_emision', flat=True)
+                    .order_by()
+                    .distinct()
+                )
+        fechas = Q(fecha__gte=desde) | Q(fecha__in=tocados)
+        emision = Q(fecha_emision__gte=desde) | Q(fecha_emision__in=tocados)
+
+        ResumenFacturasDia.objects.filter(fechas).delete()
+        ResumenConceptosDia.objects.filter(fechas).delete()
+
+        pagadas, vencidas = Q(estado='pagada'), Q(estado='vencida')
+        dias = ResumenFacturasDia.objects.bulk_create([
+            ResumenFacturasDia(fecha=fila.pop('fecha_emision'), **fila)
+            for fila in (
+                Factura.objects
+                .filter(emision)
+                .exclude(estado='cancelada')
+                .values('fecha_emision')
+                .annotate(
+                    facturas=Count('id'),
+                    monto_facturado=Coalesce(Sum('monto_total'), _cero()),
+                    facturas_pagadas=Count('id', filter=pagadas),
+                    monto_pagado=Coalesce(Sum('monto_total', filter=pagadas), _cero()),
+                    facturas_vencidas=Count('id', filter=vencidas),
+                    monto_vencido=Coalesce(Sum('monto_total', filter=vencidas), _cero()),
+                )
+                .order_by()
+            )
+        ], batch_size=1000)
+
+        conceptos = ResumenConceptosDia.objects.bulk_create([
+            ResumenConceptosDia(
+                fecha=fila['factura__fecha_emision'],
+                concepto_id=fila['concepto_id'],
+                area_id=fila['reserva__area_id'],
+                detalles=fila['detalles'],
+                monto=fila['monto'],
+            )
+            for fila in (
+                DetalleFactura.objects
+                .filter(
+                    Q(factura__fecha_emision__gte=desde) | Q(factura__fecha_emision__in=tocados)
+                )
+                .exclude(factura__estado='cancelada')
+                .values('factura__fecha_emision', 'concepto_id', 'reserva__area_id')
+                .annotate(detalles=Count('id'), monto=Coalesce(Sum('monto'), _cero()))
+                .order_by()
+            )
+        ], batch_size=1000)
+
+        # La marca queda con la hora de inicio: lo que cambie mientras tanto entra en la próxima
+        MarcaResumen.objects.filter(pk=marca.pk).update(hasta=hoy, actualizado=inicio)
+
+    return {
+        'desde': desde,
+        'hasta': hoy,
+        'dias': len(dias),
+        'dias_anteriores': len(tocados),
+        'filas_conceptos': len(conceptos),
+    }
+
+
+def factura_borrada(fecha_emision):
+    """Retrocede la marca al día de una factura borrada: la próxima actualización lo recalcula"""
+    MarcaResumen.objects.filter(nombre=MARCA, hasta__gt=fecha_emision).update(hasta=fecha_emision)
+
+
+def marca():
+    return MarcaResumen.objects.filter(nombre=MARCA).first()
+
+
+def ingresos_mensuales(desde, hasta):
+    """Facturado, cobrado y tasa de cobro por mes de emisión"""
+    filas = (
+        ResumenFacturasDia.objects
+        .filter(fecha__range=(desde, hasta))
+        .annotate(mes=TruncMonth('fecha'))
+        .values('mes')
+        .annotate(
+            facturas=Sum('facturas'),
+            monto_facturado=Sum('monto_facturado'),
+            facturas_pagadas=Sum('facturas_pagadas'),
+            monto_pagado=Sum('monto_pagado'),
+            monto_vencido=Sum('monto_vencido'),
+        )
+        .order_by('mes')
+    )
+    return [
+        {
+            **fila,
+            'mes': fila['mes'].strftime('%Y-%m'),
+            'tasa_cobro': (
+                round(float(fila['monto_pagado'] / fila['monto_facturado']), 4)
+                if fila['monto_facturado'] else None
+            ),
+        }
+        for fila in filas
+    ]
+
+
+def por_concepto(desde, hasta):
+    return list(
+        ResumenConceptosDia.objects
+        .filter(fecha__range=(desde, hasta))
+        .values('concepto_id', 'concepto__nombre')
+        .annotate(detalles=Sum('detalles'), monto=Sum('monto'))
+        .order_by('-monto')
+    )
+
+
+def por_area(desde, hasta):
+    """Lo facturado por reservas, por área común"""
+    return list(
+        ResumenConceptosDia.objects
+        .filter(fecha__range=(desde, hasta), area__isnull=False)
+        .values('area_id', 'area__nombre')
+        .annotate(detalles=Sum('detalles'), monto=Sum('monto'))
+        .order_by('-monto')
+    )
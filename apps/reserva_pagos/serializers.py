@@ -1,7 +1,17 @@
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
 from rest_framework import serializers
-from .models import Reserva, Factura, DetalleFactura, ConceptoPago, Pago
-from apps.areas.models import AreaComun
-from apps.residentes.models import Residente
+from .models import (
+    Reserva, Factura, DetalleFactura, ConceptoPago, Pago, EjecucionFacturacion, MovimientoCuenta,
+    SerieReserva
+)
+from . import libro, series, tarifas
+from apps.areas.models import AreaComun, Horario
+from apps.areas import mapa_semanal
+from apps.residentes.models import Residente, Residencia
+from apps.cuentas.mixins import filtrar_por_residente
 
 class AreaComunMiniSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,10 +32,104 @@ class ReservaSerializer(serializers.ModelSerializer):
     residente_id = serializers.PrimaryKeyRelatedField(
         queryset=Residente.objects.all(), source='residente', write_only=True
     )
+    # Obligatorias: sin fecha u horas la reserva no entra en la restricción de solapamiento
+    fecha_reserva = serializers.DateField()
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
 
     class Meta:
         model = Reserva
-        fields = '__all__'
+        exclude = ['franja']
+        read_only_fields = ['serie', 'monto_total']
+
+    def validate(self, attrs):
+        # Reglas y precio solo se recalculan si cambia el cuándo, el dónde o cuántos
+        if self.instance is None or {'area', 'fecha_reserva', 'hora_inicio', 'hora_fin', 'asistentes'} & attrs.keys():
+            def valor(campo):
+                return attrs.get(campo, getattr(self.instance, campo, None))
+
+            if valor('fecha_reserva') is None:
+                raise serializers.ValidationError({'fecha_reserva': 'Debe indicar la fecha de la reserva.'})
+            evaluacion = tarifas.evaluar(
+                valor('area').pk, valor('fecha_reserva'), valor('hora_inicio'), valor('hora_fin'), valor('asistentes')
+            )
+            if evaluacion['errores']:
+                raise serializers.ValidationError(evaluacion['errores'])
+            attrs['monto_total'] = evaluacion['monto']
+        return attrs
+
+class EvaluacionReservaSerializer(serializers.Serializer):
+    area_id = serializers.IntegerField()
+    fecha_reserva = serializers.DateField()
+    hora_inicio = serializers.TimeField()
+    hora_fin = serializers.TimeField()
+    asistentes = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+
+class EvaluacionLoteSerializer(serializers.Serializer):
+    reservas = EvaluacionReservaSerializer(many=True, allow_empty=False, max_length=tarifas.MAX_LOTE)
+
+class SerieReservaSerializer(serializers.ModelSerializer):
+    area = AreaComunMiniSerializer(read_only=True)
+    area_id = serializers.PrimaryKeyRelatedField(
+        queryset=AreaComun.objects.all(), source='area', write_only=True
+    )
+    residente = ResidenteMiniSerializer(read_only=True)
+    residente_id = serializers.PrimaryKeyRelatedField(
+        queryset=Residente.objects.all(), source='residente', write_only=True
+    )
+    dias_semana = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), required=False
+    )
+
+    class Meta:
+        model = SerieReserva
+        fields = [
+            'id', 'area', 'area_id', 'residente', 'residente_id', 'descripcion',
+            'hora_inicio', 'hora_fin', 'frecuencia', 'intervalo', 'dias_semana',
+            'fecha_inicio', 'fecha_fin', 'monto_total', 'estado', 'creado',
+        ]
+        read_only_fields = ['monto_total', 'creado']
+
+    def validate_intervalo(self, value):
+        if value < 1:
+            raise serializers.ValidationError('El intervalo debe ser al menos 1.')
+        return value
+
+    def validate(self, attrs):
+        def valor(campo, defecto=None):
+            return attrs.get(campo, getattr(self.instance, campo, defecto))
+
+        if valor('hora_inicio') == valor('hora_fin'):
+            raise serializers.ValidationError({'hora_fin': 'La hora de fin debe ser distinta de la de inicio.'})
+        if valor('fecha_fin') and valor('fecha_fin') < valor('fecha_inicio'):
+            raise serializers.ValidationError({'fecha_fin': 'La fecha de fin no puede ser anterior a la de inicio.'})
+        if valor('frecuencia', 'semanal') == 'semanal' and not valor('dias_semana'):
+            raise serializers.ValidationError({'dias_semana': 'Indique al menos un día de la semana.'})
+
+        if valor('estado') == 'cancelada':
+            return attrs
+        area = valor('area')
+        evaluacion = tarifas.evaluar(area.pk, None, valor('hora_inicio'), valor('hora_fin'))
+        if evaluacion['errores']:
+            raise serializers.ValidationError(evaluacion['errores'])
+        attrs['monto_total'] = evaluacion['monto']
+        # Las primeras ocurrencias cubren todos los días de la semana en que cae la serie
+        previa = SerieReserva(**{
+            campo: valor(campo) for campo in
+            ['fecha_inicio', 'fecha_fin', 'frecuencia', 'intervalo', 'dias_semana']
+        })
+        previa.intervalo = previa.intervalo or 1
+        hasta = previa.fecha_fin or previa.fecha_inicio + timedelta(days=7 * previa.intervalo * 7)
+        for fecha in islice(series.ocurrencias(previa, previa.fecha_inicio, hasta), 7):
+            if not mapa_semanal.rango_en_horario(area.pk, fecha, valor('hora_inicio'), valor('hora_fin')):
+                raise serializers.ValidationError(
+                    {'hora_inicio': f'El horario está fuera del horario de atención del área ({Horario.DIAS[fecha.weekday()]}).'}
+                )
+        return attrs
+
+class OcurrenciaSerieSerializer(serializers.Serializer):
+    fecha = serializers.DateField()
+    motivo = serializers.CharField(max_length=200, required=False, allow_blank=True)
 
 class ConceptoPagoSerializer(serializers.ModelSerializer):
     class Meta:
@@ -43,20 +147,31 @@ class FacturaSerializer(serializers.ModelSerializer):
         fields = ['id', 'residente', 'residente_id', 'monto_total', 'estado', 'fecha_limite', 'fecha_emision', 'descripcion']
         read_only_fields = ['fecha_emision']
 
+    @transaction.atomic
     def create(self, validated_data):
         if 'monto_total' not in validated_data:
             validated_data['monto_total'] = 0
-        return super().create(validated_data)
+        factura = super().create(validated_data)
+        libro.sincronizar_facturas([factura.id])
+        return factura
 
+    @transaction.atomic
     def update(self, instance, validated_data):
+        # monto_total lo mantienen los detalles (Factura.sumar_al_total); se
+        # guardan solo los campos enviados para no pisar un total concurrente.
+        validated_data.pop('monto_total', None)
+        cambia_residente = (
+            'residente' in validated_data and validated_data['residente'].pk != instance.residente_id
+        )
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        
-        # Recalcula el monto_total basado en los detalles actuales
-        total = sum(d.monto for d in instance.detalles.all())
-        instance.monto_total = total
-        
-        instance.save()
+        if validated_data:
+            instance.save(update_fields=[*validated_data, 'fecha_actualizacion'])
+        if cambia_residente:
+            # Lo cargado pasa del residente anterior al nuevo
+            libro.revertir_factura(instance.id)
+        if cambia_residente or 'estado' in validated_data:
+            libro.sincronizar_facturas([instance.id])
         return instance
 
 class DetalleFacturaSerializer(serializers.ModelSerializer):
@@ -66,6 +181,7 @@ class DetalleFacturaSerializer(serializers.ModelSerializer):
         model = DetalleFactura
         fields = ['id', 'factura', 'concepto', 'monto', 'reserva', 'concepto_nombre']
 
+    @transaction.atomic
     def create(self, validated_data):
         concepto = validated_data['concepto']
         detalle = DetalleFactura.objects.create(
@@ -74,13 +190,104 @@ class DetalleFacturaSerializer(serializers.ModelSerializer):
             monto=concepto.monto,
             reserva=validated_data.get('reserva')
         )
-        self.actualizar_monto_factura(detalle.factura)
+        Factura.sumar_al_total(detalle.factura_id, detalle.monto)
+        libro.sincronizar_facturas([detalle.factura_id])
+        return detalle
+
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        factura_anterior, monto_anterior = instance.factura_id, instance.monto
+        detalle = super().update(instance, validated_data)
+        if detalle.factura_id == factura_anterior:
+            Factura.sumar_al_total(detalle.factura_id, detalle.monto - monto_anterior)
+        else:
+            Factura.sumar_al_total(factura_anterior, -monto_anterior)
+            Factura.sumar_al_total(detalle.factura_id, detalle.monto)
+        libro.sincronizar_facturas([factura_anterior, detalle.factura_id])
         return detalle
 
-    def actualizar_monto_factura(self, factura):
-        total = sum(d.monto for d in factura.detalles.all())
-        factura.monto_total = total
-        factura.save()
+class DetalleLoteItemSerializer(serializers.Serializer):
+    factura = serializers.IntegerField()
+    concepto = serializers.IntegerField()
+    reserva = serializers.IntegerField(required=False, allow_null=True)
+
+class DetalleLoteSerializer(serializers.Serializer):
+    """Varios detalles (de una o varias facturas) en una sola operación"""
+    detalles = DetalleLoteItemSerializer(many=True, allow_empty=False, max_length=5000)
+
+    def validate_detalles(self, value):
+        # Una consulta por tabla para todos los ítems; las facturas fuera del alcance del usuario no existen
+        facturas = filtrar_por_residente(Factura.objects.all(), self.context['request'].user).in_bulk(
+            {d['factura'] for d in value}
+        )
+        conceptos = ConceptoPago.objects.in_bulk({d['concepto'] for d in value})
+        reservas = Reserva.objects.in_bulk({d['reserva'] for d in value if d.get('reserva')})
+        errores = []
+        for d in value:
+            error = {}
+            if d['factura'] not in facturas:
+                error['factura'] = 'Factura no encontrada.'
+            if d['concepto'] not in conceptos:
+                error['concepto'] = 'Concepto no encontrado.'
+            if d.get('reserva') and d['reserva'] not in reservas:
+                error['reserva'] = 'Reserva no encontrada.'
+            errores.append(error)
+        if any(errores):
+            raise serializers.ValidationError(errores)
+        self._conceptos = conceptos
+        return value
+
+    @transaction.atomic
+    def create(self, validated_data):
+        detalles = DetalleFactura.objects.bulk_create([
+            DetalleFactura(
+                factura_id=d['factura'],
+                concepto=self._conceptos[d['concepto']],
+                monto=self._conceptos[d['concepto']].monto,
+                reserva_id=d.get('reserva'),
+            )
+            for d in validated_data['detalles']
+        ])
+        # Un solo UPDATE de total por factura
+        deltas = {}
+        for detalle in detalles:
+            deltas[detalle.factura_id] = deltas.get(detalle.factura_id, 0) + detalle.monto
+        for factura_id, delta in sorted(deltas.items()):
+            Factura.sumar_al_total(factura_id, delta)
+        libro.sincronizar_facturas(deltas)
+        return detalles
+
+class EjecucionFacturacionSerializer(serializers.ModelSerializer):
+    conceptos = serializers.ListField(child=serializers.IntegerField(), write_only=True, allow_empty=False)
+    residencias = serializers.ListField(child=serializers.IntegerField(), write_only=True, required=False)
+    tipos_residencia = serializers.ListField(
+        child=serializers.ChoiceField(choices=Residencia.TIPO_CHOICES), write_only=True, required=False
+    )
+    tipos_residente = serializers.ListField(
+        child=serializers.ChoiceField(choices=Residente.TIPO_CHOICES), write_only=True, required=False
+    )
+
+    class Meta:
+        model = EjecucionFacturacion
+        fields = [
+            'id', 'clave', 'descripcion', 'fecha_limite', 'parametros', 'estado',
+            'total_residentes', 'facturas_creadas', 'monto_facturado', 'error',
+            'creado', 'iniciado', 'finalizado',
+            'conceptos', 'residencias', 'tipos_residencia', 'tipos_residente',
+        ]
+        read_only_fields = [
+            'parametros', 'estado', 'total_residentes', 'facturas_creadas',
+            'monto_facturado', 'error', 'creado', 'iniciado', 'finalizado',
+        ]
+        # La unicidad de la clave la resuelve la vista (devuelve la ejecución existente)
+        extra_kwargs = {'clave': {'validators': []}}
+
+    def validate_conceptos(self, value):
+        encontrados = set(ConceptoPago.objects.filter(id__in=value).values_list('id', flat=True))
+        faltantes = sorted(set(value) - encontrados)
+        if faltantes:
+            raise serializers.ValidationError(f"Conceptos no encontrados: {faltantes}")
+        return value
 
 class PagoSerializer(serializers.ModelSerializer):
     residente_nombre = serializers.CharField(source='residente.nombre', read_only=True)
@@ -96,6 +303,11 @@ class PagoSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['stripe_payment_intent_id', 'stripe_client_secret']
 
+class MovimientoCuentaSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MovimientoCuenta
+        fields = ['id', 'tipo', 'monto', 'factura', 'pago', 'descripcion', 'creado']
+
 class PagoCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Pago
@@ -0,0 +1,295 @@
+"""
+Series de reservas: expansión perezosa de ocurrencias y detección de conflictos.
+
+Cada serie se descompone en progresiones aritméticas de días (ordinal de la
+fecha): una diaria cada k días es ``inicio + k·n`` y una semanal cada k
+semanas da una progresión de paso 7k por cada día de la semana elegido.
+
+- Las ocurrencias de una ventana se generan saltando directo a la primera
+  fecha dentro de ella, sin recorrer la serie desde su inicio.
+- Dos series chocan si sus progresiones tienen días en común (el teorema
+  chino del resto da el primero, y los siguientes van cada mcm de los pasos)
+  y sus horarios se solapan. Una reserva suelta choca si su fecha cae en una
+  progresión. Nada de eso materializa ocurrencias.
+- Las fechas con excepción o ya materializadas como ``Reserva`` no generan
+  ocurrencia virtual (la reserva guardada manda, aunque esté cancelada).
+- Los listados combinan reservas guardadas y ocurrencias virtuales, ambas ya
+  ordenadas por fecha y hora, con ``heapq.merge``.
+"""
+import heapq
+from datetime import date, time, timedelta
+from itertools import islice
+from math import gcd
+
+from django.db import connection, transaction
+from django.db.models import Q
+
+from apps.areas.models import AreaComun
+from .models import ExcepcionSerie, Reserva, SerieReserva
+
+MINUTOS_DIA = 24 * 60
+SIN_FIN = date.max.toordinal()
+MAX_DIAS_AGENDA = 366
+MAX_FECHAS_CONFLICTO = 10
+
+
+class Conflicto(Exception):
+    def __init__(self, mensaje, fechas=()):
+        super().__init__(mensaje)
+        self.fechas = sorted(set(fechas))[:MAX_FECHAS_CONFLICTO]
+
+
+def _minutos(hora):
+    return hora.hour * 60 + hora.minute
+
+
+def _intervalo(hora_inicio, hora_fin):
+    """Minutos [inicio, fin) desde la medianoche del día; si cruza medianoche fin > 1440"""
+    inicio, fin = _minutos(hora_inicio), _minutos(hora_fin)
+    return inicio, fin if fin > inicio else fin + MINUTOS_DIA
+
+
+def _solapan(a, b, dias):
+    """¿Se solapa el intervalo ``a`` con el ``b`` de ``dias`` días después?"""
+    desplazamiento = dias * MINUTOS_DIA
+    return a[0] < b[1] + desplazamiento and b[0] + desplazamiento < a[1]
+
+
+def progresiones(serie):
+    """[(primero, paso, ultimo)] en ordinales de fecha"""
+    inicio = serie.fecha_inicio.toordinal()
+    fin = serie.fecha_fin.toordinal() if serie.fecha_fin else SIN_FIN
+    if serie.frecuencia == 'diaria':
+        candidatas = [(inicio, serie.intervalo, fin)]
+    else:
+        paso = 7 * serie.intervalo
+        lunes = inicio - serie.fecha_inicio.weekday()
+        candidatas = []
+        for dia in sorted(set(serie.dias_semana)):
+            primero = lunes + dia
+            candidatas.append((primero + paso if primero < inicio else primero, paso, fin))
+    return [p for p in candidatas if p[0] <= p[2]]
+
+
+def _primero_desde(primero, paso, desde):
+    if desde <= primero:
+        return primero
+    return primero + -(-(desde - primero) // paso) * paso
+
+
+def _comunes(p1, p2):
+    """Días comunes a dos progresiones, como otra progresión, o None"""
+    a1, k1, f1 = p1
+    a2, k2, f2 = p2
+    g = gcd(k1, k2)
+    if (a2 - a1) % g:
+        return None
+    modulo = k2 // g
+    t = (a2 - a1) // g * pow(k1 // g, -1, modulo) % modulo
+    paso = k1 // g * k2
+    primero = _primero_desde(a1 + k1 * t, paso, max(a1, a2))
+    ultimo = min(f1, f2)
+    return (primero, paso, ultimo) if primero <= ultimo else None
+
+
+def _ocurre(progs, ordinal, excluidas=()):
+    return ordinal not in excluidas and any(
+        a <= ordinal <= f and (ordinal - a) % k == 0 for a, k, f in progs
+    )
+
+
+def excluidas(serie_ids, desde=None, hasta=None):
+    """{serie_id: {ordinales}} con excepciones y ocurrencias ya materializadas"""
+    resultado = {serie_id: set() for serie_id in serie_ids}
+    if not resultado:
+        return resultado
+    excepciones = ExcepcionSerie.objects.filter(serie_id__in=resultado)
+    materializadas = Reserva.objects.filter(serie_id__in=resultado)
+    if desde is not None:
+        excepciones = excepciones.filter(fecha__range=(desde, hasta))
+        materializadas = materializadas.filter(fecha_reserva__range=(desde, hasta))
+    for serie_id, fecha in excepciones.values_list('serie_id', 'fecha'):
+        resultado[serie_id].add(fecha.toordinal())
+    for serie_id, fecha in materializadas.values_list('serie_id', 'fecha_reserva'):
+        resultado[serie_id].add(fecha.toordinal())
+    return resultado
+
+
+def ocurrencias(serie, desde, hasta, excluir=frozenset()):
+    """Fechas en que ocurre la serie dentro de [desde, hasta], en orden"""
+    inicio, fin = desde.toordinal(), hasta.toordinal()
+    rangos = [range(_primero_desde(a, k, inicio), min(f, fin) + 1, k) for a, k, f in progresiones(serie)]
+    for ordinal in heapq.merge(*rangos):
+        if ordinal not in excluir:
+            yield date.fromordinal(ordinal)
+
+
+def _bloquear_area(area_id, compartido=False):
+    """Serializa series y reservas del área: las reservas toman el bloqueo compartido"""
+    tabla = connection.ops.quote_name(AreaComun._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT 1 FROM {tabla} WHERE id = %s FOR {'SHARE' if compartido else 'UPDATE'}", [area_id]
+        )
+
+
+def activas_del_area(area_id, desde, hasta):
+    """Series activas del área que pueden ocurrir entre ``desde`` y ``hasta`` (None = sin fin)"""
+    series = SerieReserva.objects.filter(area_id=area_id, estado='activa').filter(
+        Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=desde)
+    )
+    if hasta is not None:
+        series = series.filter(fecha_inicio__lte=hasta)
+    return series
+
+
+def verificar_serie(serie):
+    """Lanza ``Conflicto`` si la serie choca con otra serie o con reservas del área.
+
+    Llamar dentro de una transacción, con la serie ya guardada.
+    """
+    _bloquear_area(serie.area_id)
+    propia = _intervalo(serie.hora_inicio, serie.hora_fin)
+    progs = progresiones(serie)
+    propias = excluidas([serie.pk])[serie.pk]
+    desde = serie.fecha_inicio - timedelta(days=1)
+    hasta = serie.fecha_fin + timedelta(days=1) if serie.fecha_fin else None
+    fechas = []
+
+    otras = list(activas_del_area(serie.area_id, desde, hasta).exclude(pk=serie.pk))
+    de_otras = excluidas([o.pk for o in otras])
+    for otra in otras:
+        intervalo = _intervalo(otra.hora_inicio, otra.hora_fin)
+        for dias in (-1, 0, 1):
+            if not _solapan(propia, intervalo, dias):
+                continue
+            for p1 in progs:
+                for a2, k2, f2 in progresiones(otra):
+                    # La otra serie ocurre ``dias`` días después de la propia
+                    comunes = _comunes(p1, (a2 - dias, k2, f2 - dias))
+                    if comunes is None:
+                        continue
+                    primero, paso, ultimo = comunes
+                    # Con excepciones finitas basta revisar tantos días comunes como excepciones haya
+                    revisar = len(propias) + len(de_otras[otra.pk]) + 1
+                    for ordinal in islice(range(primero, ultimo + 1, paso), revisar):
+                        if ordinal not in propias and ordinal + dias not in de_otras[otra.pk]:
+                            fechas.append(date.fromordinal(ordinal))
+                            break
+
+    reservas = (
+        Reserva.objects
+        .filter(area_id=serie.area_id, fecha_reserva__gte=desde, hora_inicio__isnull=False, hora_fin__isnull=False)
+        .exclude(estado='cancelada')
+        .exclude(serie=serie)
+    )
+    if hasta is not None:
+        reservas = reservas.filter(fecha_reserva__lte=hasta)
+    for fecha, hora_inicio, hora_fin in reservas.values_list('fecha_reserva', 'hora_inicio', 'hora_fin'):
+        intervalo = _intervalo(hora_inicio, hora_fin)
+        for dias in (-1, 0, 1):
+            ordinal = fecha.toordinal() - dias
+            if _solapan(propia, intervalo, dias) and _ocurre(progs, ordinal, propias):
+                fechas.append(date.fromordinal(ordinal))
+
+    if fechas:
+        raise Conflicto('La serie choca con otras reservas del área.', fechas)
+
+
+def verificar_reserva(area_id, fecha, hora_inicio, hora_fin, serie_id=None):
+    """Lanza ``Conflicto`` si una reserva suelta cae sobre una ocurrencia de alguna serie"""
+    _bloquear_area(area_id, compartido=True)
+    if fecha is None or hora_inicio is None or hora_fin is None:
+        return
+    reserva = _intervalo(hora_inicio, hora_fin)
+    series = list(
+        activas_del_area(area_id, fecha - timedelta(days=1), fecha + timedelta(days=1)).exclude(pk=serie_id)
+    )
+    excluir = excluidas([s.pk for s in series], fecha - timedelta(days=1), fecha + timedelta(days=1))
+    for serie in series:
+        intervalo = _intervalo(serie.hora_inicio, serie.hora_fin)
+        progs = progresiones(serie)
+        for dias in (-1, 0, 1):
+            # Ocurrencia de la serie ``dias`` días antes de la reserva
+            if _solapan(intervalo, reserva, dias) and _ocurre(progs, fecha.toordinal() - dias, excluir[serie.pk]):
+                raise Conflicto('El área tiene una reserva recurrente en ese horario.', [fecha])
+
+
+def _flujo(serie, fechas):
+    for fecha in fechas:
+        yield fecha, serie.hora_inicio, serie
+
+
+def virtuales(series, desde, hasta):
+    """(fecha, hora_inicio, serie) de las ocurrencias no materializadas, en orden"""
+    series = list(series)
+    excluir = excluidas([s.pk for s in series], desde, hasta)
+    return heapq.merge(
+        *(_flujo(s, ocurrencias(s, desde, hasta, excluir[s.pk])) for s in series),
+        key=lambda o: (o[0], o[1]),
+    )
+
+
+def ocurrencia(serie, fecha):
+    """Representación de una ocurrencia virtual con la forma de ``ReservaSerializer``"""
+    return {
+        'id': None,
+        'area': {'id': serie.area_id, 'nombre': serie.area.nombre},
+        'residente': {'id': serie.residente_id, 'nombre': serie.residente.nombre},
+        'monto_total': str(serie.monto_total),
+        'descripcion': serie.descripcion,
+        'fecha_reserva': fecha.isoformat(),
+        'hora_inicio': serie.hora_inicio.isoformat(),
+        'hora_fin': serie.hora_fin.isoformat(),
+        'estado': 'confirmada',
+        'serie': serie.pk,
+        'virtual': True,
+    }
+
+
+def agenda(reservas, series, desde, hasta, serializar):
+    """Reservas guardadas y ocurrencias virtuales de [desde, hasta] en una sola lista ordenada.
+
+    ``reservas`` debe venir ordenado por (fecha_reserva, hora_inicio);
+    ``serializar`` convierte una ``Reserva`` en dict.
+    """
+    guardadas = ((r.fecha_reserva, r.hora_inicio or time.min, r) for r in reservas.iterator(chunk_size=500))
+    filas = []
+    for fecha, _, objeto in heapq.merge(guardadas, virtuales(series, desde, hasta), key=lambda o: (o[0], o[1])):
+        if isinstance(objeto, SerieReserva):
+            filas.append(ocurrencia(objeto, fecha))
+        else:
+            filas.append({**serializar(objeto), 'virtual': False})
+    return filas
+
+
+def materializar(serie, hasta, desde=None):
+    """Crea las ``Reserva`` de las ocurrencias hasta ``hasta``; devuelve (creadas, omitidas).
+
+    Las que chocan con otra reserva o ya existían se omiten (ON CONFLICT DO NOTHING
+    sobre la restricción de exclusión y la única por serie y fecha).
+    """
+    desde = max(desde or serie.fecha_inicio, serie.fecha_inicio)
+    fechas = list(ocurrencias(serie, desde, hasta, excluidas([serie.pk], desde, hasta)[serie.pk]))
+    if not fechas:
+        return 0, 0
+    with transaction.atomic():
+        Reserva.objects.bulk_create([
+            Reserva(
+                serie=serie,
+                residente_id=serie.residente_id,
+                area_id=serie.area_id,
+                fecha_reserva=fecha,
+                hora_inicio=serie.hora_inicio,
+                hora_fin=serie.hora_fin,
+                monto_total=serie.monto_total,
+                descripcion=serie.descripcion,
+                estado='confirmada',
+            )
+            for fecha in fechas
+        ], ignore_conflicts=True)
+        creadas = Reserva.objects.filter(serie=serie, fecha_reserva__in=fechas).count()
+    # bulk_create no dispara las señales de Reserva
+    from .calendario import invalidar_meses
+    invalidar_meses(fechas)
+    return creadas, len(fechas) - creadas
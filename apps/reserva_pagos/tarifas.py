@@ -0,0 +1,151 @@
+"""
+Validación y precio de reservas contra las reglas del área.
+
+Las reglas (estado, ``requiere_reserva``, capacidad, duración mínima y
+máxima, horario) y el costo por hora salen de la foto en memoria de
+``mapa_semanal.areas()``: evaluar una reserva no consulta la base. El precio
+es ``costo_reserva`` por hora, proporcional a los minutos reservados.
+
+``evaluar_lote`` evalúa cientos de candidatas en una llamada y además busca
+choques entre ellas y con lo ya reservado: una consulta para las reservas
+guardadas de todas las áreas del lote y una por área para sus series.
+"""
+from bisect import bisect_left, insort
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+
+from apps.areas import mapa_semanal
+from . import series
+from .models import Reserva
+
+MINUTOS_DIA = 24 * 60
+CENTAVO = Decimal('0.01')
+MAX_LOTE = 500
+
+
+def duracion(hora_inicio, hora_fin):
+    """Minutos de la reserva; si ``hora_fin`` no es posterior sigue al día siguiente"""
+    inicio = hora_inicio.hour * 60 + hora_inicio.minute
+    fin = hora_fin.hour * 60 + hora_fin.minute
+    return (fin - inicio) % MINUTOS_DIA or MINUTOS_DIA
+
+
+def precio(area, minutos):
+    """``costo_reserva`` por hora aplicado a ``minutos`` (áreas sin costo: 0)"""
+    costo = area['costo_reserva'] or Decimal('0')
+    return (costo * minutos / 60).quantize(CENTAVO, rounding=ROUND_HALF_UP)
+
+
+def evaluar(area_id, fecha, hora_inicio, hora_fin, asistentes=None):
+    """{'errores': {campo: mensaje}, 'minutos', 'monto'} de una reserva candidata"""
+    area = mapa_semanal.areas().get(area_id)
+    if area is None:
+        return {'errores': {'area_id': 'El área no existe.'}, 'minutos': None, 'monto': None}
+
+    errores = {}
+    if not area['activo'] or area['estado'] != 'disponible':
+        errores['area_id'] = f"El área no está disponible para reservas ({area['estado']})."
+    elif not area['requiere_reserva']:
+        errores['area_id'] = 'El área es de uso libre y no admite reservas.'
+    if asistentes is not None and area['capacidad_maxima'] and asistentes > area['capacidad_maxima']:
+        errores['asistentes'] = f"El área admite como máximo {area['capacidad_maxima']} personas."
+
+    if hora_inicio is None or hora_fin is None:
+        errores['hora_inicio'] = 'Debe indicar la hora de inicio y la de fin.'
+        return {'errores': errores, 'minutos': None, 'monto': None}
+    if hora_inicio == hora_fin:
+        errores['hora_fin'] = 'La hora de fin debe ser distinta de la de inicio.'
+        return {'errores': errores, 'minutos': None, 'monto': None}
+
+    minutos = duracion(hora_inicio, hora_fin)
+    if area['tiempo_reserva_minima'] and minutos < area['tiempo_reserva_minima']:
+        errores['hora_fin'] = f"La reserva debe durar al menos {area['tiempo_reserva_minima']} minutos."
+    elif area['tiempo_reserva_maxima'] and minutos > area['tiempo_reserva_maxima']:
+        errores['hora_fin'] = f"La reserva no puede durar más de {area['tiempo_reserva_maxima']} minutos."
+    if fecha is not None and not mapa_semanal.rango_en_horario(area_id, fecha, hora_inicio, hora_fin):
+        errores['hora_inicio'] = 'El horario solicitado está fuera del horario de atención del área.'
+
+    return {'errores': errores, 'minutos': minutos, 'monto': precio(area, minutos)}
+
+
+def _tramo(fecha, hora_inicio, hora_fin):
+    """[inicio, fin) en minutos absolutos (ordinal de la fecha * 1440 + minuto)"""
+    inicio = fecha.toordinal() * MINUTOS_DIA + hora_inicio.hour * 60 + hora_inicio.minute
+    return inicio, inicio + duracion(hora_inicio, hora_fin)
+
+
+def _ocupados(area_ids, desde, hasta):
+    """{area_id: [(inicio, fin, -1)]} ordenado, con reservas guardadas y ocurrencias de series"""
+    ocupados = {area_id: [] for area_id in area_ids}
+    guardadas = (
+        Reserva.objects
+        .filter(
+            area_id__in=area_ids,
+            fecha_reserva__range=(desde - timedelta(days=1), hasta),
+            hora_inicio__isnull=False,
+            hora_fin__isnull=False,
+        )
+        .exclude(estado='cancelada')
+        .values_list('area_id', 'fecha_reserva', 'hora_inicio', 'hora_fin')
+    )
+    for area_id, fecha, hora_inicio, hora_fin in guardadas:
+        ocupados[area_id].append((*_tramo(fecha, hora_inicio, hora_fin), -1))
+    for area_id in area_ids:
+        recurrentes = series.activas_del_area(area_id, desde - timedelta(days=1), hasta)
+        for fecha, _, serie in series.virtuales(recurrentes, desde - timedelta(days=1), hasta):
+            ocupados[area_id].append((*_tramo(fecha, serie.hora_inicio, serie.hora_fin), -1))
+    for tramos in ocupados.values():
+        tramos.sort()
+    return ocupados
+
+
+def _choque(tramos, inicio, fin):
+    """Primer tramo de ``tramos`` que se solapa con [inicio, fin), o None"""
+    # Ningún tramo dura más de un día: los que se solapan empiezan después de inicio - 1440
+    for i in range(bisect_left(tramos, (inicio - MINUTOS_DIA,)), len(tramos)):
+        tramo = tramos[i]
+        if tramo[0] >= fin:
+            break
+        if tramo[1] > inicio:
+            return tramo
+    return None
+
+
+def evaluar_lote(candidatas):
+    """Evalúa y cotiza ``candidatas`` (dicts con area_id, fecha_reserva, hora_inicio, hora_fin, asistentes).
+
+    Una candidata válida que choca con lo ya reservado o con una candidata
+    válida anterior del mismo lote se marca como conflicto.
+    """
+    resultados = [
+        {
+            'indice': i,
+            **evaluar(c['area_id'], c['fecha_reserva'], c['hora_inicio'], c['hora_fin'], c.get('asistentes')),
+        }
+        for i, c in enumerate(candidatas)
+    ]
+
+    por_revisar = [(r, candidatas[r['indice']]) for r in resultados if not r['errores']]
+    if por_revisar:
+        fechas = [c['fecha_reserva'] for _, c in por_revisar]
+        ocupados = _ocupados({c['area_id'] for _, c in por_revisar}, min(fechas), max(fechas))
+        for resultado, c in por_revisar:
+            inicio, fin = _tramo(c['fecha_reserva'], c['hora_inicio'], c['hora_fin'])
+            tramos = ocupados[c['area_id']]
+            choque = _choque(tramos, inicio, fin)
+            if choque is None:
+                insort(tramos, (inicio, fin, resultado['indice']))
+            elif choque[2] < 0:
+                resultado['errores']['hora_inicio'] = 'El área ya está reservada en ese horario.'
+            else:
+                resultado['errores']['hora_inicio'] = f'Choca con la candidata #{choque[2]} del lote.'
+
+    validas = [r for r in resultados if not r['errores']]
+    for r in resultados:
+        r['valida'] = not r['errores']
+    return {
+        'candidatas': len(resultados),
+        'validas': len(validas),
+        'monto_total': sum((r['monto'] for r in validas), Decimal('0.00')),
+        'resultados': resultados,
+    }
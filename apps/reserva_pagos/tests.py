@@ -1,3 +1,958 @@
-from django.test import TestCase
+import json
+import threading
+import time as reloj
+from datetime import date, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+import stripe_local
+
+from apps.areas import mapa_semanal
+from apps.areas.models import AreaComun, Horario
+from apps.cuentas.models import Notificacion, Rol, Usuario
+from apps.residentes.models import Residente
+from . import calendario, cierres, idempotencia, libro, pasarela, reportes, series, tarifas, vencimientos, webhooks
+from .management.commands import reconciliar_pagos
+from .models import (
+    ConceptoPago, DetalleFactura, EventoStripe, Factura, MovimientoCuenta, Pago, Reserva, RespuestaIdempotente,
+    ResumenFacturasDia, SaldoResidente, SerieReserva,
+)
+from .serializers import DetalleLoteSerializer
+
+
+class ReservasConcurrentesTests(TransactionTestCase):
+    """La restricción de exclusión deja pasar una sola de dos reservas solapadas simultáneas"""
+
+    def setUp(self):
+        self.area = AreaComun.objects.create(nombre='Quincho', requiere_reserva=True)
+        self.residentes = [
+            Residente.objects.create(nombre=f'Residente {i}', apellidos='Prueba', dni=f'9000{i}', sexo='F', tipo='PROPIETARIO')
+            for i in range(2)
+        ]
+        self.fecha = date.today() + timedelta(days=30)
+
+    def _reservar(self, residente, hora_inicio, hora_fin, barrera, resultados):
+        try:
+            barrera.wait()
+            with transaction.atomic():
+                Reserva.objects.create(
+                    residente=residente,
+                    area=self.area,
+                    fecha_reserva=self.fecha,
+                    hora_inicio=hora_inicio,
+                    hora_fin=hora_fin,
+                    estado='confirmada',
+                )
+            resultados.append('ok')
+        except IntegrityError:
+            resultados.append('rechazada')
+        finally:
+            connection.close()
+
+    def test_solo_una_de_dos_reservas_solapadas(self):
+        barrera = threading.Barrier(2)
+        resultados = []
+        hilos = [
+            threading.Thread(target=self._reservar, args=(self.residentes[0], time(10), time(12), barrera, resultados)),
+            threading.Thread(target=self._reservar, args=(self.residentes[1], time(11), time(13), barrera, resultados)),
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertCountEqual(resultados, ['ok', 'rechazada'])
+        self.assertEqual(Reserva.objects.filter(area=self.area).exclude(estado='cancelada').count(), 1)
+
+    def test_reservas_contiguas_no_chocan(self):
+        barrera = threading.Barrier(2)
+        resultados = []
+        hilos = [
+            threading.Thread(target=self._reservar, args=(self.residentes[0], time(10), time(12), barrera, resultados)),
+            threading.Thread(target=self._reservar, args=(self.residentes[1], time(12), time(14), barrera, resultados)),
+        ]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(resultados, ['ok', 'ok'])
+
+
+class PermisosAdministracionTests(TestCase):
+    """Las operaciones de la administración no están abiertas a cualquier usuario autenticado"""
+
+    def setUp(self):
+        residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='91001', sexo='F', tipo='PROPIETARIO')
+        self.residente = Usuario.objects.create_user('residente@example.com', 'clave', residente=residente)
+        self.admin = Usuario.objects.create_user('admin@example.com', 'clave', is_staff=True)
+        self.client = APIClient()
+
+    def _get(self, usuario, url):
+        self.client.force_authenticate(usuario)
+        return self.client.get(url)
+
+    def test_ejecuciones_facturacion(self):
+        url = '/api/ejecuciones-facturacion/'
+        self.assertEqual(self._get(self.residente, url).status_code, 403)
+        self.assertEqual(self._get(self.admin, url).status_code, 200)
+        self.client.force_authenticate(self.residente)
+        respuesta = self.client.post(url, {'clave': 'x', 'conceptos': []}, format='json')
+        self.assertEqual(respuesta.status_code, 403)
+
+    def test_reportes(self):
+        url = '/api/reportes/ingresos-mensuales/'
+        self.assertEqual(self._get(self.residente, url).status_code, 403)
+        self.assertEqual(self._get(self.admin, url).status_code, 200)
+
+    def test_detalles_en_lote(self):
+        otro = Residente.objects.create(nombre='Luis', apellidos='Prueba', dni='91002', sexo='M', tipo='INQUILINO')
+        factura = Factura.objects.create(residente=otro)
+        concepto = ConceptoPago.objects.create(nombre='Multa', monto=Decimal('15.00'))
+        datos = {'detalles': [{'factura': factura.id, 'concepto': concepto.id}]}
+
+        self.client.force_authenticate(self.residente)
+        self.assertEqual(self.client.post('/api/detalles-factura/lote/', datos, format='json').status_code, 403)
+        factura.refresh_from_db()
+        self.assertEqual(factura.monto_total, Decimal('0.00'))
+
+        # El serializer tampoco ve facturas de otros residentes
+        serializer = DetalleLoteSerializer(data=datos, context={'request': mock.Mock(user=self.residente)})
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['detalles'][0]['factura'], 'Factura no encontrada.')
+
+        self.client.force_authenticate(self.admin)
+        respuesta = self.client.post('/api/detalles-factura/lote/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['totales'], {str(factura.id): '15.00'})
+
+
+class ResumenesIncrementalesTests(TestCase):
+    """La actualización incremental recalcula los días de las facturas viejas que cambiaron"""
+
+    def setUp(self):
+        residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='92001', sexo='F', tipo='PROPIETARIO')
+        self.dia = timezone.localdate() - timedelta(days=400)
+        self.factura = Factura.objects.create(residente=residente, monto_total=Decimal('100.00'))
+        Factura.objects.filter(pk=self.factura.pk).update(fecha_emision=self.dia)
+        reportes.actualizar()
+
+    def _resumen(self):
+        return ResumenFacturasDia.objects.filter(fecha=self.dia).first()
+
+    def test_factura_vieja_cambiada(self):
+        self.assertEqual(self._resumen().monto_facturado, Decimal('100.00'))
+        Factura.sumar_al_total(self.factura.pk, Decimal('25.00'))
+
+        resumen = reportes.actualizar()
+        self.assertEqual(resumen['dias_anteriores'], 1)
+        self.assertEqual(self._resumen().monto_facturado, Decimal('125.00'))
+
+    def test_factura_vieja_borrada(self):
+        self.factura.delete()
+        reportes.factura_borrada(self.dia)
+
+        reportes.actualizar()
+        self.assertIsNone(self._resumen())
+
+
+class InvalidacionTrasCommitTests(TestCase):
+    """Las cachés se invalidan después del COMMIT, no a mitad de la transacción"""
+
+    def test_reserva_invalida_el_mes_al_confirmar(self):
+        area = AreaComun.objects.create(nombre='Piscina', requiere_reserva=True)
+        residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='93001', sexo='F', tipo='PROPIETARIO')
+        fecha = date.today() + timedelta(days=10)
+        clave = calendario._clave_mes(fecha)
+        (antes,) = calendario._versiones([clave])
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Reserva.objects.create(
+                residente=residente, area=area, fecha_reserva=fecha,
+                hora_inicio=time(9), hora_fin=time(10), estado='confirmada',
+            )
+            self.assertEqual(calendario._versiones([clave]), [antes])
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(calendario._versiones([clave]), [antes])
+
+
+SECRETO_WEBHOOK = 'whsec_pruebas'
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=SECRETO_WEBHOOK)
+class WebhookStripeTests(TestCase):
+    """Eventos firmados como los de ``stripe_local``: deduplicación y orden de llegada"""
+
+    def setUp(self):
+        residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='94001', sexo='F', tipo='PROPIETARIO')
+        self.factura = Factura.objects.create(residente=residente, monto_total=Decimal('50.00'))
+        self.pago = Pago.objects.create(
+            factura=self.factura, residente=residente, monto=Decimal('50.00'), stripe_payment_intent_id='pi_prueba',
+        )
+
+    def _enviar(self, datos):
+        payload = json.dumps(datos).encode()
+        return self.client.post(
+            '/api/stripe/webhook/', data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=stripe_local.firmar(payload, SECRETO_WEBHOOK),
+        )
+
+    def _evento(self, tipo, evento_id):
+        intent = {'id': 'pi_prueba', 'object': 'payment_intent', 'last_payment_error': None}
+        if tipo == 'payment_intent.payment_failed':
+            intent['last_payment_error'] = {'message': 'Tarjeta rechazada'}
+        return stripe_local.evento(tipo, intent, evento_id=evento_id)
+
+    def test_firma_invalida(self):
+        payload = json.dumps(self._evento('payment_intent.succeeded', 'evt_1')).encode()
+        respuesta = self.client.post(
+            '/api/stripe/webhook/', data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=stripe_local.firmar(payload, 'whsec_otro'),
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(EventoStripe.objects.exists())
+
+    def test_reenvio_no_se_procesa_dos_veces(self):
+        datos = self._evento('payment_intent.succeeded', 'evt_1')
+        with self.captureOnCommitCallbacks() as callbacks:
+            primera = self._enviar(datos)
+            segunda = self._enviar(datos)
+
+        self.assertEqual(primera.json(), {'recibido': True, 'duplicado': False})
+        self.assertEqual(segunda.json(), {'recibido': True, 'duplicado': True})
+        self.assertEqual(EventoStripe.objects.filter(evento_id='evt_1').count(), 1)
+        self.assertEqual(len(callbacks), 1)
+
+        evento = EventoStripe.objects.get(evento_id='evt_1')
+        self.assertEqual(webhooks.procesar_evento(evento.pk), 'procesado')
+        # Ya procesado: otro intento no lo vuelve a aplicar
+        self.assertIsNone(webhooks.procesar_evento(evento.pk))
+
+    def test_fallo_atrasado_no_deshace_el_pago(self):
+        with self.captureOnCommitCallbacks():
+            self._enviar(self._evento('payment_intent.succeeded', 'evt_exito'))
+            self._enviar(self._evento('payment_intent.payment_failed', 'evt_fallo'))
+
+        for evento_id in ('evt_exito', 'evt_fallo'):
+            webhooks.procesar_evento(EventoStripe.objects.get(evento_id=evento_id).pk)
+
+        self.pago.refresh_from_db()
+        self.factura.refresh_from_db()
+        self.assertEqual(self.pago.estado, 'completado')
+        self.assertEqual(self.factura.estado, 'pagada')
+
+    def test_fallo_y_luego_exito(self):
+        with self.captureOnCommitCallbacks():
+            self._enviar(self._evento('payment_intent.payment_failed', 'evt_fallo'))
+            self._enviar(self._evento('payment_intent.succeeded', 'evt_exito'))
+
+        for evento_id in ('evt_fallo', 'evt_exito'):
+            webhooks.procesar_evento(EventoStripe.objects.get(evento_id=evento_id).pk)
+
+        self.pago.refresh_from_db()
+        self.assertEqual(self.pago.estado, 'completado')
+
+
+class EncolarTrasCommitTests(TransactionTestCase):
+    """El evento pasa al pool de hilos solo cuando se confirma la transacción que lo guardó"""
+
+    def test_rollback_no_encola(self):
+        ejecutor = mock.Mock()
+        with mock.patch.object(webhooks, '_ejecutor', return_value=ejecutor):
+            try:
+                with transaction.atomic():
+                    webhooks.encolar(1)
+                    raise IntegrityError('rollback')
+            except IntegrityError:
+                pass
+            self.assertFalse(ejecutor.submit.called)
+
+            with transaction.atomic():
+                webhooks.encolar(2)
+                self.assertFalse(ejecutor.submit.called)
+            ejecutor.submit.assert_called_once_with(webhooks._procesar_en_hilo, 2)
+
+    @override_settings(STRIPE_WEBHOOK_SECRET=SECRETO_WEBHOOK)
+    def test_webhook_procesado_en_segundo_plano(self):
+        residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='94002', sexo='F', tipo='PROPIETARIO')
+        factura = Factura.objects.create(residente=residente, monto_total=Decimal('50.00'))
+        pago = Pago.objects.create(
+            factura=factura, residente=residente, monto=Decimal('50.00'), stripe_payment_intent_id='pi_fondo',
+        )
+        datos = stripe_local.evento('payment_intent.succeeded', {'id': 'pi_fondo', 'object': 'payment_intent'})
+        payload = json.dumps(datos).encode()
+        respuesta = self.client.post(
+            '/api/stripe/webhook/', data=payload, content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=stripe_local.firmar(payload, SECRETO_WEBHOOK),
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+        limite = reloj.monotonic() + 10
+        while EventoStripe.objects.get(evento_id=datos['id']).estado == 'recibido' and reloj.monotonic() < limite:
+            reloj.sleep(0.05)
+        self.assertEqual(EventoStripe.objects.get(evento_id=datos['id']).estado, 'procesado')
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'completado')
+
+
+class PasarelaStripeLocalTests(TestCase):
+    """PaymentIntents contra ``stripe_local``: claves de idempotencia por factura e intento"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = stripe_local.servidor(0)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.ajustes = override_settings(
+            STRIPE_SECRET_KEY='sk_test_local',
+            STRIPE_API_BASE=f'http://127.0.0.1:{cls.servidor.server_address[1]}',
+        )
+        cls.ajustes.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.ajustes.disable()
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        # El cliente se arma con STRIPE_API_BASE la primera vez que se usa
+        pasarela._cliente = None
+        self.addCleanup(setattr, pasarela, '_cliente', None)
+        self.estado = self.servidor.RequestHandlerClass.estado
+        self.residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='95001', sexo='F', tipo='PROPIETARIO')
+        self.factura = Factura.objects.create(residente=self.residente, monto_total=Decimal('10.005'))
+
+    def test_reutiliza_el_intent_pendiente(self):
+        pago, reutilizado = pasarela.crear_payment_intent(self.factura.id, self.residente)
+        self.assertFalse(reutilizado)
+        self.assertEqual(self.estado.intents[pago.stripe_payment_intent_id]['amount'], 1001)
+
+        otra_vez, reutilizado = pasarela.crear_payment_intent(self.factura.id, self.residente)
+        self.assertTrue(reutilizado)
+        self.assertEqual(otra_vez.pk, pago.pk)
+
+    def test_reintento_con_la_misma_clave_no_crea_otro_intent(self):
+        pago, _ = pasarela.crear_payment_intent(self.factura.id, self.residente)
+        intents = len(self.estado.intents)
+        # Como si la respuesta de Stripe llegara pero el Pago no se hubiera guardado
+        Pago.objects.filter(pk=pago.pk).delete()
+
+        repetido, reutilizado = pasarela.crear_payment_intent(self.factura.id, self.residente)
+        self.assertFalse(reutilizado)
+        self.assertEqual(repetido.stripe_payment_intent_id, pago.stripe_payment_intent_id)
+        self.assertEqual(len(self.estado.intents), intents)
+
+    def test_monto_cambiado_cancela_y_crea_otro(self):
+        pago, _ = pasarela.crear_payment_intent(self.factura.id, self.residente)
+        Factura.sumar_al_total(self.factura.id, Decimal('5.00'))
+
+        nuevo, reutilizado = pasarela.crear_payment_intent(self.factura.id, self.residente)
+        self.assertFalse(reutilizado)
+        self.assertNotEqual(nuevo.stripe_payment_intent_id, pago.stripe_payment_intent_id)
+        self.assertEqual(self.estado.intents[pago.stripe_payment_intent_id]['status'], 'canceled')
+        pago.refresh_from_db()
+        self.assertEqual(pago.estado, 'cancelado')
+
+    def test_stripe_fuera_de_la_transaccion(self):
+        # La prueba ya corre dentro de transacciones: se compara con ese nivel
+        nivel = len(connection.atomic_blocks)
+        crear = pasarela.cliente().payment_intents.create
+        niveles = []
+
+        def crear_concurrente(*args, **kwargs):
+            niveles.append(len(connection.atomic_blocks))
+            intent = crear(*args, **kwargs)
+            # Otra petición con la misma clave guardó el Pago mientras tanto
+            Pago.objects.create(
+                factura=self.factura, residente=self.residente, monto=self.factura.monto_total,
+                metodo_pago='stripe', estado='pendiente', stripe_payment_intent_id=intent.id,
+                stripe_client_secret=intent.client_secret,
+            )
+            return intent
+
+        with mock.patch.object(pasarela.cliente().payment_intents, 'create', side_effect=crear_concurrente):
+            pago, reutilizado = pasarela.crear_payment_intent(self.factura.id, self.residente)
+
+        self.assertEqual(niveles, [nivel])
+        self.assertTrue(reutilizado)
+        self.assertEqual(Pago.objects.filter(factura=self.factura).count(), 1)
+
+    def _pago_con_intent(self, exito=None):
+        intent = self.estado.crear_intent({'amount': 1001})
+        if exito is not None:
+            self.estado.confirmar(intent, exito=exito)
+        return Pago.objects.create(
+            factura=self.factura, residente=self.residente, monto=self.factura.monto_total,
+            metodo_pago='stripe', estado='pendiente', stripe_payment_intent_id=intent['id'],
+        )
+
+    def test_reconciliar_ventana_densa_pide_por_id(self):
+        pagado, rechazado = self._pago_con_intent(exito=True), self._pago_con_intent(exito=False)
+        # Intents ajenos más recientes: el listado (del más nuevo al más viejo) los trae primero
+        for _ in range(2 * 100):
+            self.estado.crear_intent({'amount': 500})['created'] += 60
+
+        salida = StringIO()
+        call_command('reconciliar_pagos', '--lote', '1', stdout=salida)
+
+        self.assertIn('intents pedidos por id: 2', salida.getvalue())
+        pagado.refresh_from_db()
+        rechazado.refresh_from_db()
+        self.assertEqual((pagado.estado, rechazado.estado), ('completado', 'fallido'))
+        self.factura.refresh_from_db()
+        self.assertEqual(self.factura.estado, 'pagada')
+
+    def test_reconciliar_lote_acotado_por_ventana(self):
+        viejo, nuevo = self._pago_con_intent(exito=True), self._pago_con_intent(exito=True)
+        Pago.objects.filter(pk=viejo.pk).update(fecha_creacion=timezone.now() - timedelta(hours=8))
+        ventanas = []
+        intents = reconciliar_pagos.Command._intents
+
+        def registrar(comando, desde, hasta, intent_ids, resumen):
+            ventanas.append(intent_ids)
+            return intents(comando, desde, hasta, intent_ids, resumen)
+
+        with mock.patch.object(reconciliar_pagos.Command, '_intents', registrar):
+            call_command('reconciliar_pagos', '--ventana', '6', stdout=StringIO())
+
+        self.assertEqual(ventanas, [[viejo.stripe_payment_intent_id], [nuevo.stripe_payment_intent_id]])
+        nuevo.refresh_from_db()
+        self.assertEqual(nuevo.estado, 'completado')
+
+
+class ConfirmarPagoIdempotenteTests(TestCase):
+    """Header Idempotency-Key en confirmar_pago: repetición, clave reutilizada y vencimiento"""
+
+    url = '/api/pagos/confirmar_pago/'
+
+    def setUp(self):
+        residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='96001', sexo='F', tipo='PROPIETARIO')
+        self.usuario = Usuario.objects.create_user('ana@example.com', 'clave', residente=residente)
+        self.factura = Factura.objects.create(residente=residente, monto_total=Decimal('30.00'))
+        self.otra = Factura.objects.create(residente=residente, monto_total=Decimal('40.00'))
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def _confirmar(self, factura, clave='clave-1'):
+        return self.client.post(self.url, {'factura_id': factura.id}, format='json', HTTP_IDEMPOTENCY_KEY=clave)
+
+    def test_reintento_recibe_la_respuesta_original(self):
+        primera = self._confirmar(self.factura)
+        segunda = self._confirmar(self.factura)
+
+        self.assertEqual(primera.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', primera)
+        self.assertEqual(segunda.status_code, 200)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(Pago.objects.filter(factura=self.factura).count(), 1)
+
+    def test_misma_clave_con_otra_peticion(self):
+        self._confirmar(self.factura)
+        respuesta = self._confirmar(self.otra)
+
+        self.assertEqual(respuesta.status_code, 422)
+        self.otra.refresh_from_db()
+        self.assertEqual(self.otra.estado, 'pendiente')
+
+    def test_error_tambien_se_repite(self):
+        Factura.objects.filter(pk=self.factura.pk).update(estado='cancelada')
+        primera = self._confirmar(self.factura)
+        Factura.objects.filter(pk=self.factura.pk).update(estado='pendiente')
+        segunda = self._confirmar(self.factura)
+
+        self.assertEqual(primera.status_code, 400)
+        self.assertEqual(segunda.status_code, 400)
+        self.assertEqual(segunda['Idempotent-Replayed'], 'true')
+
+    @override_settings(IDEMPOTENCIA_HORAS=1)
+    def test_clave_vencida(self):
+        self._confirmar(self.factura)
+        RespuestaIdempotente.objects.update(creado=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(idempotencia.purgar(), 1)
+        # Vencida, la clave se puede usar para otra petición
+        respuesta = self._confirmar(self.otra)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotIn('Idempotent-Replayed', respuesta)
+        self.assertEqual(respuesta.json()['factura_id'], self.otra.id)
+
+
+class ProgresionesSeriesTests(SimpleTestCase):
+    """Días comunes de dos progresiones (teorema chino del resto) contra la fuerza bruta"""
+
+    @staticmethod
+    def _dias(progresion, hasta):
+        primero, paso, ultimo = progresion
+        return set(range(primero, min(ultimo, hasta) + 1, paso))
+
+    def test_comunes_contra_fuerza_bruta(self):
+        hasta = 400
+        for k1 in (1, 2, 3, 4, 6, 7, 14, 21):
+            for k2 in (1, 2, 5, 7, 9, 14, 28):
+                for a1 in range(0, 15, 2):
+                    for a2 in range(0, 30, 3):
+                        p1, p2 = (a1, k1, 300), (a2, k2, 350)
+                        esperados = self._dias(p1, hasta) & self._dias(p2, hasta)
+                        comunes = series._comunes(p1, p2)
+                        with self.subTest(p1=p1, p2=p2):
+                            if not esperados:
+                                self.assertIsNone(comunes)
+                            else:
+                                self.assertIsNotNone(comunes)
+                                self.assertEqual(self._dias(comunes, hasta), esperados)
+
+    def test_comunes_sin_fin(self):
+        inicio = date(2025, 1, 6).toordinal()
+        # Cada 2 semanas desde un lunes y cada 3 semanas desde el lunes siguiente: coinciden cada 6
+        comunes = series._comunes((inicio, 14, series.SIN_FIN), (inicio + 7, 21, series.SIN_FIN))
+        self.assertEqual(comunes, (inicio + 28, 42, series.SIN_FIN))
+
+    def test_comunes_que_nunca_coinciden(self):
+        # Semanas alternas: pares contra impares
+        self.assertIsNone(series._comunes((0, 14, series.SIN_FIN), (7, 14, series.SIN_FIN)))
+
+    def test_ocurrencias_semanales(self):
+        serie = SerieReserva(
+            frecuencia='semanal', intervalo=2, dias_semana=[0, 3],
+            fecha_inicio=date(2025, 1, 8), fecha_fin=date(2025, 2, 28),
+        )
+        # Empieza un miércoles: el lunes de esa semana queda antes del inicio
+        self.assertEqual(
+            list(series.ocurrencias(serie, date(2025, 1, 1), date(2025, 3, 31))),
+            [date(2025, 1, 9), date(2025, 1, 20), date(2025, 1, 23), date(2025, 2, 3),
+             date(2025, 2, 6), date(2025, 2, 17), date(2025, 2, 20)],
+        )
+
+
+class ConflictosSeriesTests(TestCase):
+    """``verificar_serie`` usa los días comunes para encontrar choques entre series"""
+
+    def setUp(self):
+        self.area = AreaComun.objects.create(nombre='Gimnasio', requiere_reserva=True)
+        self.residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='97001', sexo='F', tipo='PROPIETARIO')
+
+    def _serie(self, fecha_inicio, hora_inicio=time(7), hora_fin=time(8)):
+        return SerieReserva.objects.create(
+            residente=self.residente, area=self.area, hora_inicio=hora_inicio, hora_fin=hora_fin,
+            frecuencia='semanal', intervalo=2, dias_semana=[1], fecha_inicio=fecha_inicio,
+        )
+
+    def test_semanas_alternas_no_chocan(self):
+        self._serie(date(2025, 1, 7))
+        series.verificar_serie(self._serie(date(2025, 1, 14)))
+
+    def test_mismas_semanas_chocan(self):
+        self._serie(date(2025, 1, 7))
+        with self.assertRaises(series.Conflicto) as error:
+            series.verificar_serie(self._serie(date(2025, 3, 4)))
+        self.assertEqual(error.exception.fechas, [date(2025, 3, 4)])
+
+    def test_cruce_de_medianoche(self):
+        # Lunes de 23 a 01 contra martes de 0:30 a 1:30 de las mismas semanas
+        self._serie(date(2025, 1, 7), time(0, 30), time(1, 30))
+        lunes = SerieReserva.objects.create(
+            residente=self.residente, area=self.area, hora_inicio=time(23), hora_fin=time(1),
+            frecuencia='semanal', intervalo=2, dias_semana=[0], fecha_inicio=date(2025, 1, 6),
+        )
+        with self.assertRaises(series.Conflicto):
+            series.verificar_serie(lunes)
+
+
+class CierreAreaTests(TestCase):
+    """``cerrar_area`` también cancela las series activas y avisa a sus residentes"""
+
+    def setUp(self):
+        self.area = AreaComun.objects.create(nombre='Piscina', requiere_reserva=True)
+        self.ana = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='96001', sexo='F', tipo='PROPIETARIO')
+        self.luis = Residente.objects.create(nombre='Luis', apellidos='Prueba', dni='96002', sexo='M', tipo='PROPIETARIO')
+
+    def _serie(self, residente, fecha_inicio, fecha_fin=None):
+        return SerieReserva.objects.create(
+            residente=residente, area=self.area, hora_inicio=time(7), hora_fin=time(8),
+            frecuencia='semanal', dias_semana=[1], fecha_inicio=fecha_inicio, fecha_fin=fecha_fin,
+        )
+
+    def test_cancela_series_y_reservas(self):
+        hoy = timezone.localdate()
+        activa = self._serie(self.ana, hoy - timedelta(days=30))
+        terminada = self._serie(self.luis, hoy - timedelta(days=60), hoy - timedelta(days=1))
+        Reserva.objects.create(
+            area=self.area, residente=self.luis, fecha_reserva=hoy + timedelta(days=3),
+            hora_inicio=time(18), hora_fin=time(19), estado='confirmada',
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resumen = cierres.cerrar_area(self.area.pk)
+
+        self.assertEqual(resumen['reservas_canceladas'], 1)
+        self.assertEqual(resumen['series_canceladas'], 1)
+        self.assertEqual(resumen['residentes'], 2)
+        self.assertEqual(resumen['notificaciones'], 2)
+        activa.refresh_from_db()
+        terminada.refresh_from_db()
+        self.assertEqual(activa.estado, 'cancelada')
+        self.assertEqual(terminada.estado, 'activa')
+        self.assertFalse(series.activas_del_area(self.area.pk, hoy, None).exists())
+        self.assertTrue(Notificacion.objects.filter(residente=self.ana, asunto__startswith='Reserva recurrente').exists())
+
+
+class LibroCuentaTests(TestCase):
+    """Movimientos y saldo materializado después de cargos, pagos, reembolsos y reasignaciones"""
+
+    def setUp(self):
+        self.ana = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='95001', sexo='F', tipo='PROPIETARIO')
+        self.luis = Residente.objects.create(nombre='Luis', apellidos='Prueba', dni='95002', sexo='M', tipo='PROPIETARIO')
+        self.factura = Factura.objects.create(
+            residente=self.ana, monto_total=Decimal('120.00'), estado='pendiente',
+            fecha_limite=timezone.localdate() + timedelta(days=30),
+        )
+
+    def _saldo(self, residente):
+        saldo = SaldoResidente.objects.filter(residente=residente).first()
+        return (saldo.saldo, saldo.total_cargos, saldo.total_pagado, saldo.movimientos) if saldo else None
+
+    def _pago(self, estado='completado'):
+        return Pago.objects.create(
+            factura=self.factura, residente=self.ana, monto=Decimal('120.00'), metodo_pago='efectivo', estado=estado,
+        )
+
+    def test_asentar_suma_al_saldo(self):
+        libro._asentar(
+            "SELECT %s::bigint, 'cargo', 10.50::numeric, NULL::bigint, NULL::bigint, 'Ajuste'"
+            " UNION ALL SELECT %s::bigint, 'abono', -4.00::numeric, NULL::bigint, NULL::bigint, 'Ajuste'",
+            [self.ana.pk, self.ana.pk],
+        )
+        libro._asentar("SELECT %s::bigint, 'cargo', 1.00::numeric, NULL::bigint, NULL::bigint, ''", [self.ana.pk])
+        self.assertEqual(self._saldo(self.ana), (Decimal('7.50'), Decimal('11.50'), Decimal('4.00'), 3))
+
+    def test_cargo_pago_y_reembolso(self):
+        libro.sincronizar_facturas([self.factura.pk])
+        libro.sincronizar_facturas([self.factura.pk])
+        self.assertEqual(self._saldo(self.ana), (Decimal('120.00'), Decimal('120.00'), Decimal('0.00'), 1))
+
+        pago = self._pago()
+        libro.abonar([pago.pk])
+        libro.abonar([pago.pk])
+        self.assertEqual(self._saldo(self.ana), (Decimal('0.00'), Decimal('120.00'), Decimal('120.00'), 2))
+
+        Pago.objects.filter(pk=pago.pk).update(estado='reembolsado')
+        libro.reembolsar([pago.pk])
+        libro.reembolsar([pago.pk])
+        self.assertEqual(self._saldo(self.ana), (Decimal('120.00'), Decimal('120.00'), Decimal('0.00'), 3))
+
+    def test_reembolso_sin_abono_no_asienta(self):
+        pago = self._pago(estado='reembolsado')
+        self.assertEqual(libro.reembolsar([pago.pk]), 0)
+        self.assertIsNone(self._saldo(self.ana))
+
+    def test_reasignar_factura(self):
+        libro.sincronizar_facturas([self.factura.pk])
+        Factura.objects.filter(pk=self.factura.pk).update(residente=self.luis)
+        libro.revertir_factura(self.factura.pk)
+        libro.sincronizar_facturas([self.factura.pk])
+
+        self.assertEqual(self._saldo(self.ana)[:2], (Decimal('0.00'), Decimal('0.00')))
+        self.assertEqual(self._saldo(self.luis)[:2], (Decimal('120.00'), Decimal('120.00')))
+        self.assertEqual(
+            list(MovimientoCuenta.objects.filter(factura=self.factura).order_by('id').values_list('residente_id', 'tipo', 'monto')),
+            [(self.ana.pk, 'cargo', Decimal('120.00')), (self.ana.pk, 'anulacion', Decimal('-120.00')),
+             (self.luis.pk, 'cargo', Decimal('120.00'))],
+        )
+
+    def test_revertir_con_pagos_y_cancelar(self):
+        libro.sincronizar_facturas([self.factura.pk])
+        libro.abonar([self._pago().pk])
+        libro.revertir_factura(self.factura.pk, incluir_pagos=True)
+        self.assertEqual(self._saldo(self.ana)[0], Decimal('0.00'))
+
+        otra = Factura.objects.create(
+            residente=self.ana, monto_total=Decimal('30.00'), estado='pendiente', fecha_limite=timezone.localdate(),
+        )
+        libro.sincronizar_facturas([otra.pk])
+        Factura.objects.filter(pk=otra.pk).update(estado='cancelada')
+        libro.sincronizar_facturas([otra.pk])
+        self.assertEqual(self._saldo(self.ana)[0], Decimal('0.00'))
+        self.assertEqual(
+            MovimientoCuenta.objects.get(factura=otra, tipo='anulacion').monto, Decimal('-30.00'),
+        )
+
+
+class TotalesFacturaTests(TestCase):
+    """``Factura.sumar_al_total`` y ``reconciliar_totales --corregir``"""
+
+    def setUp(self):
+        self.residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='94001', sexo='F', tipo='PROPIETARIO')
+        self.concepto = ConceptoPago.objects.create(nombre='Expensas', monto=Decimal('50.00'))
+        self.factura = Factura.objects.create(
+            residente=self.residente, monto_total=Decimal('0.00'), estado='pendiente', fecha_limite=timezone.localdate(),
+        )
+
+    def _total(self):
+        self.factura.refresh_from_db()
+        return self.factura.monto_total
+
+    def test_sumar_al_total(self):
+        Factura.sumar_al_total(self.factura.pk, Decimal('50.00'))
+        Factura.sumar_al_total(self.factura.pk, Decimal('-20.00'))
+        self.assertEqual(self._total(), Decimal('30.00'))
+
+    def test_delta_cero_solo_marca_actualizada(self):
+        antes = Factura.objects.values_list('fecha_actualizacion', flat=True).get(pk=self.factura.pk)
+        Factura.sumar_al_total(self.factura.pk, Decimal('0'))
+        self.assertEqual(self._total(), Decimal('0.00'))
+        self.assertGreater(self.factura.fecha_actualizacion, antes)
+
+    def test_reconciliar_corrige_y_asienta(self):
+        DetalleFactura.objects.create(factura=self.factura, concepto=self.concepto, monto=Decimal('50.00'))
+        DetalleFactura.objects.create(factura=self.factura, concepto=self.concepto, monto=Decimal('25.00'))
+        vacia = Factura.objects.create(
+            residente=self.residente, monto_total=Decimal('10.00'), estado='pendiente', fecha_limite=timezone.localdate(),
+        )
+        libro.sincronizar_facturas([self.factura.pk, vacia.pk])
+
+        salida = StringIO()
+        call_command('reconciliar_totales', stdout=salida)
+        self.assertIn('2 facturas con total distinto', salida.getvalue())
+        self.assertEqual(self._total(), Decimal('0.00'))
+
+        call_command('reconciliar_totales', '--corregir', stdout=salida)
+        self.assertIn('2 facturas corregidas', salida.getvalue())
+        self.assertEqual(self._total(), Decimal('75.00'))
+        vacia.refresh_from_db()
+        self.assertEqual(vacia.monto_total, Decimal('0.00'))
+        self.assertEqual(SaldoResidente.objects.get(residente=self.residente).saldo, Decimal('75.00'))
+
+        salida = StringIO()
+        call_command('reconciliar_totales', stdout=salida)
+        self.assertIn('Todos los totales cuadran', salida.getvalue())
+
+
+class VencimientosTests(TestCase):
+    """``marcar_vencidas``: resumen del barrido y recargos por mora"""
+
+    def setUp(self):
+        self.ana = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='93001', sexo='F', tipo='PROPIETARIO')
+        self.luis = Residente.objects.create(nombre='Luis', apellidos='Prueba', dni='93002', sexo='M', tipo='PROPIETARIO')
+        self.mora = ConceptoPago.objects.create(nombre='Recargo por mora', monto=Decimal('15.00'))
+        self.corte = date(2025, 3, 1)
+
+    def _factura(self, residente, monto, fecha_limite, estado='pendiente'):
+        factura = Factura.objects.create(residente=residente, monto_total=monto, estado=estado, fecha_limite=fecha_limite)
+        libro.sincronizar_facturas([factura.pk])
+        return factura
+
+    def test_resumen_y_recargos(self):
+        a = self._factura(self.ana, Decimal('100.00'), date(2025, 2, 1))
+        b = self._factura(self.ana, Decimal('40.00'), date(2025, 2, 28))
+        c = self._factura(self.luis, Decimal('60.00'), date(2025, 1, 10))
+        al_dia = self._factura(self.luis, Decimal('80.00'), self.corte)
+        pagada = self._factura(self.ana, Decimal('30.00'), date(2025, 1, 1), estado='pagada')
+
+        resumen = vencimientos.marcar_vencidas(self.corte, self.mora)
+
+        self.assertEqual(resumen, {
+            'corte': '2025-03-01',
+            'vencidas': 3,
+            'residentes': 2,
+            'monto_vencido': Decimal('200.00'),
+            'recargos': 3,
+            'monto_recargos': Decimal('45.00'),
+        })
+        totales = dict(Factura.objects.values_list('id', 'monto_total'))
+        self.assertEqual(totales[a.pk], Decimal('115.00'))
+        self.assertEqual(totales[b.pk], Decimal('55.00'))
+        self.assertEqual(totales[c.pk], Decimal('75.00'))
+        self.assertEqual(totales[al_dia.pk], Decimal('80.00'))
+        self.assertEqual(totales[pagada.pk], Decimal('30.00'))
+        self.assertEqual(
+            set(Factura.objects.filter(estado='vencida').values_list('id', flat=True)), {a.pk, b.pk, c.pk},
+        )
+        self.assertEqual(DetalleFactura.objects.filter(concepto=self.mora).count(), 3)
+        self.assertEqual(SaldoResidente.objects.get(residente=self.ana).saldo, Decimal('200.00'))
+        self.assertEqual(SaldoResidente.objects.get(residente=self.luis).saldo, Decimal('155.00'))
+
+        # Un segundo barrido no vuelve a recargar
+        self.assertEqual(vencimientos.marcar_vencidas(self.corte, self.mora)['recargos'], 0)
+        self.assertEqual(DetalleFactura.objects.filter(concepto=self.mora).count(), 3)
+
+    def test_sin_concepto_no_recarga(self):
+        factura = self._factura(self.ana, Decimal('100.00'), date(2025, 2, 1))
+        resumen = vencimientos.marcar_vencidas(self.corte)
+        self.assertEqual((resumen['vencidas'], resumen['recargos'], resumen['monto_recargos']), (1, 0, Decimal('0')))
+        factura.refresh_from_db()
+        self.assertEqual((factura.estado, factura.monto_total), ('vencida', Decimal('100.00')))
+
+
+class AlcancePorRolTests(TestCase):
+    """Cada ViewSet con ``AlcanceResidenteMixin``: residente, personal y administración"""
+
+    URLS = {
+        'reservas': '/api/reservas/',
+        'series': '/api/series-reserva/',
+        'facturas': '/api/facturas/',
+        'detalles': '/api/detalles-factura/',
+        'pagos': '/api/pagos/',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        area = AreaComun.objects.create(nombre='Quincho', requiere_reserva=True)
+        concepto = ConceptoPago.objects.create(nombre='Expensas', monto=Decimal('50.00'))
+        cls.ids = {nombre: {} for nombre in cls.URLS}
+        for i, dni in enumerate(('90001', '90002')):
+            residente = Residente.objects.create(nombre='R', apellidos=dni, dni=dni, sexo='F', tipo='PROPIETARIO')
+            factura = Factura.objects.create(
+                residente=residente, monto_total=Decimal('50.00'), estado='pendiente', fecha_limite=date(2025, 1, 31),
+            )
+            cls.ids['reservas'][dni] = Reserva.objects.create(
+                area=area, residente=residente, fecha_reserva=date(2025, 1, 10 + i),
+                hora_inicio=time(18), hora_fin=time(20), estado='confirmada',
+            ).pk
+            cls.ids['series'][dni] = SerieReserva.objects.create(
+                residente=residente, area=area, hora_inicio=time(7 + i), hora_fin=time(8 + i),
+                frecuencia='semanal', dias_semana=[1], fecha_inicio=date(2025, 1, 7),
+            ).pk
+            cls.ids['facturas'][dni] = factura.pk
+            cls.ids['detalles'][dni] = DetalleFactura.objects.create(
+                factura=factura, concepto=concepto, monto=Decimal('50.00'),
+            ).pk
+            cls.ids['pagos'][dni] = Pago.objects.create(
+                factura=factura, residente=residente, monto=Decimal('50.00'), metodo_pago='efectivo',
+            ).pk
+            if i == 0:
+                cls.residente = Usuario.objects.create_user('residente@example.com', 'clave', residente=residente)
+        cls.admin = Usuario.objects.create_user('admin@example.com', 'clave', is_staff=True)
+        cls.guardia = Usuario.objects.create_user(
+            'guardia@example.com', 'clave', rol=Rol.objects.create(nombre='Seguridad')
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _ids(self, usuario, url):
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return {fila['id'] for fila in respuesta.json()}
+
+    def test_visibilidad_por_rol(self):
+        for nombre, url in self.URLS.items():
+            ids = self.ids[nombre]
+            with self.subTest(nombre):
+                self.assertEqual(self._ids(self.residente, url), {ids['90001']})
+                self.assertEqual(self._ids(self.admin, url), set(ids.values()))
+                self.assertEqual(self._ids(self.guardia, url), set())
+
+    def test_detalle_ajeno_no_existe(self):
+        self.client.force_authenticate(self.residente)
+        for nombre, url in self.URLS.items():
+            with self.subTest(nombre):
+                self.assertEqual(self.client.get(f"{url}{self.ids[nombre]['90002']}/").status_code, 404)
+
+
+class TarifasTests(TestCase):
+    """``tarifas.evaluar`` (reglas y precio) y ``evaluar_lote`` (choques dentro del lote)"""
+
+    MARTES = date(2025, 1, 7)
+
+    def setUp(self):
+        self.area = AreaComun.objects.create(
+            nombre='Salón', requiere_reserva=True, costo_reserva=Decimal('30.00'), capacidad_maxima=10,
+            tiempo_reserva_minima=60, tiempo_reserva_maxima=240,
+        )
+        Horario.objects.create(area=self.area, dia_semana='Martes', hora_apertura=time(8), hora_cierre=time(23))
+        self.residente = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='89001', sexo='F', tipo='PROPIETARIO')
+
+    def _evaluar(self, hora_inicio, hora_fin, area=None, fecha=MARTES, asistentes=None):
+        return tarifas.evaluar((area or self.area).pk, fecha, hora_inicio, hora_fin, asistentes)
+
+    def test_precio_proporcional(self):
+        self.assertEqual(self._evaluar(time(10), time(11, 30)), {'errores': {}, 'minutos': 90, 'monto': Decimal('45.00')})
+        self.assertEqual(self._evaluar(time(10), time(11, 10))['monto'], Decimal('35.00'))
+        sin_costo = AreaComun.objects.create(nombre='Terraza', requiere_reserva=True)
+        self.assertEqual(self._evaluar(time(10), time(11), area=sin_costo)['monto'], Decimal('0.00'))
+
+    def test_duracion_cruza_medianoche(self):
+        self.assertEqual(tarifas.duracion(time(22), time(1)), 180)
+        self.assertEqual(tarifas.duracion(time(9), time(9)), 24 * 60)
+
+    def test_reglas(self):
+        casos = [
+            (dict(hora_inicio=time(10), hora_fin=time(10, 30)), 'hora_fin'),
+            (dict(hora_inicio=time(9), hora_fin=time(14)), 'hora_fin'),
+            (dict(hora_inicio=time(7), hora_fin=time(9)), 'hora_inicio'),
+            (dict(hora_inicio=time(10), hora_fin=time(11), fecha=date(2025, 1, 8)), 'hora_inicio'),
+            (dict(hora_inicio=time(10), hora_fin=time(11), asistentes=11), 'asistentes'),
+            (dict(hora_inicio=time(10), hora_fin=time(10)), 'hora_fin'),
+        ]
+        for argumentos, campo in casos:
+            with self.subTest(**argumentos):
+                self.assertEqual(list(self._evaluar(**argumentos)['errores']), [campo])
+
+    def test_area_no_disponible(self):
+        AreaComun.objects.filter(pk=self.area.pk).update(estado='mantenimiento')
+        mapa_semanal.invalidar_mapa()
+        self.assertIn('area_id', self._evaluar(time(10), time(11))['errores'])
+        self.assertEqual(tarifas.evaluar(0, self.MARTES, time(10), time(11))['errores'], {'area_id': 'El área no existe.'})
+
+    def test_lote_con_choques(self):
+        Reserva.objects.create(
+            area=self.area, residente=self.residente, fecha_reserva=self.MARTES,
+            hora_inicio=time(14), hora_fin=time(15), estado='confirmada',
+        )
+        SerieReserva.objects.create(
+            residente=self.residente, area=self.area, hora_inicio=time(20), hora_fin=time(21),
+            frecuencia='semanal', dias_semana=[1], fecha_inicio=date(2025, 1, 1),
+        )
+
+        def candidata(hora_inicio, hora_fin, **extra):
+            return {'area_id': self.area.pk, 'fecha_reserva': self.MARTES,
+                    'hora_inicio': hora_inicio, 'hora_fin': hora_fin, **extra}
+
+        resumen = tarifas.evaluar_lote([
+            candidata(time(10), time(12)),
+            candidata(time(11), time(13)),
+            candidata(time(14, 30), time(16)),
+            candidata(time(19), time(20, 30)),
+            candidata(time(16), time(18), asistentes=50),
+            candidata(time(16), time(17)),
+        ])
+
+        errores = [r['errores'].get('hora_inicio') or r['errores'].get('asistentes') for r in resumen['resultados']]
+        self.assertEqual(errores[0], None)
+        self.assertEqual(errores[1], 'Choca con la candidata #0 del lote.')
+        self.assertEqual(errores[2], 'El área ya está reservada en ese horario.')
+        self.assertEqual(errores[3], 'El área ya está reservada en ese horario.')
+        self.assertIn('máximo', errores[4])
+        # Una candidata inválida no ocupa el horario
+        self.assertEqual(errores[5], None)
+        self.assertEqual([r['valida'] for r in resumen['resultados']], [True, False, False, False, False, True])
+        self.assertEqual((resumen['candidatas'], resumen['validas']), (6, 2))
+        self.assertEqual(resumen['monto_total'], Decimal('90.00'))
+
+    def test_evaluar_lote_solo_administracion(self):
+        residente = Usuario.objects.create_user('residente@example.com', 'clave', residente=self.residente)
+        admin = Usuario.objects.create_user('admin@example.com', 'clave', is_staff=True)
+        datos = {'reservas': [{
+            'area_id': self.area.pk, 'fecha_reserva': '2025-01-07', 'hora_inicio': '10:00', 'hora_fin': '11:00',
+        }]}
+        cliente = APIClient()
+
+        cliente.force_authenticate(residente)
+        self.assertEqual(cliente.post('/api/reservas/evaluar-lote/', datos, format='json').status_code, 403)
+
+        cliente.force_authenticate(admin)
+        respuesta = cliente.post('/api/reservas/evaluar-lote/', datos, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['validas'], 1)
@@ -2,16 +2,20 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     ReservaViewSet, ConceptoPagoViewSet, FacturaViewSet,
-    DetalleFacturaViewSet, PagoViewSet
+    DetalleFacturaViewSet, PagoViewSet, EjecucionFacturacionViewSet, ReporteViewSet, SerieReservaViewSet, StripeWebhookView
 )
 
 router = DefaultRouter()
 router.register('reservas', ReservaViewSet, basename='reservas') 
+router.register('series-reserva', SerieReservaViewSet, basename='series-reserva')
 router.register('conceptos-pago', ConceptoPagoViewSet, basename='conceptos-pago')
 router.register('facturas', FacturaViewSet, basename='facturas')
 router.register('detalles-factura', DetalleFacturaViewSet, basename='detalles-factura')
 router.register(r'pagos', PagoViewSet, basename='pagos') 
+router.register('ejecuciones-facturacion', EjecucionFacturacionViewSet, basename='ejecuciones-facturacion')
+router.register('reportes', ReporteViewSet, basename='reportes')
 
 urlpatterns = [
+    path('stripe/webhook/', StripeWebhookView.as_view(), name='stripe-webhook'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -0,0 +1,63 @@
+"""
+Barrido de facturas vencidas.
+
+Un solo ``UPDATE ... RETURNING`` (apoyado en el índice parcial de facturas
+pendientes) pasa a "vencida" todas las pendientes con ``fecha_limite``
+anterior a la fecha de corte. Opcionalmente agrega un recargo por mora a
+cada una, con un ``bulk_create`` de detalles y otro ``UPDATE`` de totales,
+todo en la misma transacción.
+"""
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import libro
+from .models import DetalleFactura, Factura
+
+
+def pendientes_vencidas(corte):
+    return Factura.objects.filter(estado='pendiente', fecha_limite__lt=corte)
+
+
+def marcar_vencidas(corte=None, concepto_mora=None):
+    """Marca como vencidas las facturas pendientes con fecha_limite < ``corte`` (hoy por defecto).
+
+    ``concepto_mora`` (un ``ConceptoPago``) agrega su monto como recargo a
+    cada factura vencida. Devuelve un resumen de lo cambiado.
+    """
+    corte = corte or timezone.localdate()
+    tabla = connection.ops.quote_name(Factura._meta.db_table)
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {tabla} SET estado = 'vencida', fecha_actualizacion = now() "
+                f"WHERE estado = 'pendiente' AND fecha_limite < %s "
+                f"RETURNING id, residente_id, monto_total",
+                [corte],
+            )
+            vencidas = cursor.fetchall()
+
+        recargos = 0
+        if concepto_mora is not None and vencidas and concepto_mora.monto:
+            ids = [fila[0] for fila in vencidas]
+            DetalleFactura.objects.bulk_create(
+                [DetalleFactura(factura_id=i, concepto=concepto_mora, monto=concepto_mora.monto) for i in ids],
+                batch_size=5000,
+            )
+            Factura.objects.filter(id__in=ids).update(
+                monto_total=F('monto_total') + concepto_mora.monto, fecha_actualizacion=timezone.now()
+            )
+            libro.sincronizar_facturas(ids, concepto_mora.nombre)
+            recargos = len(ids)
+
+    monto_vencido = sum((fila[2] for fila in vencidas), Decimal('0'))
+    return {
+        'corte': corte.isoformat(),
+        'vencidas': len(vencidas),
+        'residentes': len({fila[1] for fila in vencidas}),
+        'monto_vencido': monto_vencido,
+        'recargos': recargos,
+        'monto_recargos': (concepto_mora.monto * recargos) if recargos else Decimal('0'),
+    }
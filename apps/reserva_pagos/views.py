@@ -1,58 +1,382 @@
+import json
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.shortcuts import render, get_object_or_404
-from rest_framework import viewsets
-from rest_framework.permissions import IsAuthenticated
+from rest_framework import mixins, viewsets
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action  # ✅ Asegúrate de importar esto
-from .models import Reserva, ConceptoPago, Factura, DetalleFactura, Pago
+from .models import (
+    Reserva, ConceptoPago, Factura, DetalleFactura, Pago, EjecucionFacturacion, EventoStripe,
+    SerieReserva, ExcepcionSerie
+)
 from .serializers import (
     ReservaSerializer, ConceptoPagoSerializer, FacturaSerializer,
-    DetalleFacturaSerializer, PagoSerializer, PagoCreateSerializer
+    DetalleFacturaSerializer, DetalleLoteSerializer, PagoSerializer, PagoCreateSerializer,
+    EjecucionFacturacionSerializer, SerieReservaSerializer, OcurrenciaSerieSerializer,
+    EvaluacionLoteSerializer
 )
+from . import calendario, facturacion, idempotencia, libro, pasarela, reportes, series, tarifas, webhooks
 import stripe
 from django.conf import settings
+from config.exportacion import ExportacionMixin
+from apps.cuentas.mixins import AlcanceResidenteMixin, EsAdministracion, filtrar_por_residente
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 # Configurar Stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
 
-class ReservaViewSet(viewsets.ModelViewSet):
+# Pagos que una confirmación manual puede completar
+PAGOS_ABIERTOS = ['pendiente', 'procesando', 'fallido']
+
+def _es_solapamiento(error):
+    causa = getattr(error, '__cause__', None)
+    diag = getattr(causa, 'diag', None)
+    return getattr(diag, 'constraint_name', None) == 'reserva_sin_solapamiento'
+
+def _respuesta_conflicto(conflicto):
+    return Response(
+        {'detail': str(conflicto), 'fechas': [f.isoformat() for f in conflicto.fechas]},
+        status=status.HTTP_409_CONFLICT
+    )
+
+class ReservaViewSet(AlcanceResidenteMixin, viewsets.ModelViewSet):
     queryset = Reserva.objects.all().order_by('id')
     serializer_class = ReservaSerializer
     permission_classes = [IsAuthenticated]
 
+    # La restricción de exclusión de la base es la que impide reservas
+    # solapadas; aquí solo se traduce el error a un 409. Las ocurrencias de
+    # series no materializadas se comprueban en perform_create/perform_update.
+    def create(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        except series.Conflicto as e:
+            return _respuesta_conflicto(e)
+        except IntegrityError as e:
+            if not _es_solapamiento(e):
+                raise
+            return Response(
+                {'detail': 'El área ya está reservada en ese horario.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+    def update(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except series.Conflicto as e:
+            return _respuesta_conflicto(e)
+        except IntegrityError as e:
+            if not _es_solapamiento(e):
+                raise
+            return Response(
+                {'detail': 'El área ya está reservada en ese horario.'},
+                status=status.HTTP_409_CONFLICT
+            )
+
+    def _verificar_series(self, serializer):
+        datos, actual = serializer.validated_data, serializer.instance
+        def valor(campo):
+            return datos.get(campo, getattr(actual, campo, None))
+        if valor('estado') != 'cancelada' and valor('area') is not None:
+            series.verificar_reserva(
+                valor('area').pk, valor('fecha_reserva'), valor('hora_inicio'), valor('hora_fin'),
+                serie_id=getattr(actual, 'serie_id', None),
+            )
+
+    def perform_create(self, serializer):
+        self._verificar_series(serializer)
+        serializer.save()
+
+    def perform_update(self, serializer):
+        self._verificar_series(serializer)
+        serializer.save()
+
+    def list(self, request, *args, **kwargs):
+        """Con ?desde=&hasta= devuelve la agenda: reservas guardadas y ocurrencias de series, por fecha"""
+        if 'desde' not in request.query_params and 'hasta' not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        desde = parse_date(request.query_params.get('desde') or '')
+        hasta = parse_date(request.query_params.get('hasta') or '')
+        if desde is None or hasta is None or desde > hasta:
+            return Response(
+                {'error': 'desde y hasta deben ser fechas YYYY-MM-DD y desde <= hasta'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (hasta - desde).days >= series.MAX_DIAS_AGENDA:
+            return Response(
+                {'error': f'El rango no puede superar {series.MAX_DIAS_AGENDA} días'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        reservas = (
+            self.filter_queryset(self.get_queryset())
+            .filter(fecha_reserva__range=(desde, hasta))
+            .select_related('area', 'residente')
+            .order_by('fecha_reserva', 'hora_inicio', 'id')
+        )
+        recurrentes = filtrar_por_residente(
+            SerieReserva.objects.filter(estado='activa', fecha_inicio__lte=hasta)
+            .filter(Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=desde))
+            .select_related('area', 'residente'),
+            request.user,
+        )
+        if request.query_params.get('area'):
+            reservas = reservas.filter(area_id=request.query_params['area'])
+            recurrentes = recurrentes.filter(area_id=request.query_params['area'])
+        serializer = self.get_serializer()
+        return Response(series.agenda(reservas, recurrentes, desde, hasta, serializer.to_representation))
+
+    @action(detail=False, methods=['get'])
+    def calendario(self, request):
+        """Reservas y minutos reservados por área y día del mes: ?mes=AAAA-MM[&area=]"""
+        mes = request.query_params.get('mes')
+        area = request.query_params.get('area')
+        try:
+            mes = parse_date(f'{mes}-01') if mes else timezone.localdate()
+            area = int(area) if area else None
+        except ValueError:
+            mes = None
+        if mes is None:
+            return Response({'error': 'Parámetros inválidos. Use mes=AAAA-MM y un id de área.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response(calendario.calendario(mes, area))
+
+    @action(detail=False, methods=['post'], url_path='evaluar-lote', permission_classes=[IsAuthenticated, EsAdministracion])
+    def evaluar_lote(self, request):
+        """Valida y cotiza hasta MAX_LOTE reservas candidatas sin guardarlas: {"reservas": [...]}"""
+        datos = EvaluacionLoteSerializer(data=request.data)
+        datos.is_valid(raise_exception=True)
+        return Response(tarifas.evaluar_lote(datos.validated_data['reservas']))
+
+class SerieReservaViewSet(AlcanceResidenteMixin, viewsets.ModelViewSet):
+    queryset = SerieReserva.objects.select_related('area', 'residente').order_by('id')
+    serializer_class = SerieReservaSerializer
+    permission_classes = [IsAuthenticated]
+
+    def _guardar(self, guardar):
+        try:
+            with transaction.atomic():
+                return guardar()
+        except series.Conflicto as e:
+            return _respuesta_conflicto(e)
+
+    def create(self, request, *args, **kwargs):
+        return self._guardar(lambda: super(SerieReservaViewSet, self).create(request, *args, **kwargs))
+
+    def update(self, request, *args, **kwargs):
+        return self._guardar(lambda: super(SerieReservaViewSet, self).update(request, *args, **kwargs))
+
+    def perform_create(self, serializer):
+        series.verificar_serie(serializer.save())
+
+    def perform_update(self, serializer):
+        serie = serializer.save()
+        if serie.estado == 'activa':
+            series.verificar_serie(serie)
+
+    @action(detail=True, methods=['get'])
+    def ocurrencias(self, request, pk=None):
+        """Fechas de la serie en ?desde=&hasta= (sin las canceladas)"""
+        serie = self.get_object()
+        desde = parse_date(request.query_params.get('desde') or '') or max(serie.fecha_inicio, timezone.localdate())
+        hasta = parse_date(request.query_params.get('hasta') or '') or desde + timedelta(days=90)
+        if desde > hasta or (hasta - desde).days >= series.MAX_DIAS_AGENDA:
+            return Response(
+                {'error': f'Rango inválido (máximo {series.MAX_DIAS_AGENDA} días)'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        excepciones = set(serie.excepciones.filter(fecha__range=(desde, hasta)).values_list('fecha', flat=True))
+        reservas = {
+            r.fecha_reserva: r for r in serie.reservas.filter(fecha_reserva__range=(desde, hasta))
+        }
+        fechas = []
+        for fecha in series.ocurrencias(serie, desde, hasta, {f.toordinal() for f in excepciones}):
+            reserva = reservas.get(fecha)
+            fechas.append({
+                'fecha': fecha.isoformat(),
+                'reserva': reserva.id if reserva else None,
+                'estado': reserva.estado if reserva else 'confirmada',
+            })
+        return Response({'serie': serie.id, 'desde': desde, 'hasta': hasta, 'ocurrencias': fechas})
+
+    @action(detail=True, methods=['post'], url_path='cancelar-ocurrencia')
+    def cancelar_ocurrencia(self, request, pk=None):
+        """Cancela la ocurrencia de una fecha: {"fecha": "YYYY-MM-DD", "motivo": "..."}"""
+        serie = self.get_object()
+        datos = OcurrenciaSerieSerializer(data=request.data)
+        datos.is_valid(raise_exception=True)
+        fecha = datos.validated_data['fecha']
+        if next(series.ocurrencias(serie, fecha, fecha), None) is None:
+            return Response(
+                {'error': 'La serie no tiene ocurrencia en esa fecha'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        with transaction.atomic():
+            # Si ya se materializó se cancela la reserva; si no, basta la excepción
+            reserva = serie.reservas.select_for_update().filter(fecha_reserva=fecha).first()
+            if reserva is not None:
+                reserva.estado = 'cancelada'
+                reserva.save(update_fields=['estado'])
+            else:
+                ExcepcionSerie.objects.get_or_create(
+                    serie=serie, fecha=fecha, defaults={'motivo': datos.validated_data.get('motivo', '')}
+                )
+        return Response({'serie': serie.id, 'fecha': fecha, 'cancelada': True, 'reserva': reserva.id if reserva else None})
+
+    @action(detail=True, methods=['post'])
+    def materializar(self, request, pk=None):
+        """Crea las reservas de las ocurrencias hasta "hasta" (por defecto 14 días)"""
+        serie = self.get_object()
+        if serie.estado != 'activa':
+            return Response({'error': 'La serie está cancelada'}, status=status.HTTP_400_BAD_REQUEST)
+        hasta = parse_date(request.data.get('hasta') or '') or timezone.localdate() + timedelta(days=14)
+        creadas, omitidas = series.materializar(serie, hasta, desde=timezone.localdate())
+        return Response({'serie': serie.id, 'hasta': hasta, 'creadas': creadas, 'omitidas': omitidas})
+
 class ConceptoPagoViewSet(viewsets.ModelViewSet):
     queryset = ConceptoPago.objects.all().order_by('id')
     serializer_class = ConceptoPagoSerializer
     permission_classes = [IsAuthenticated]
 
-class FacturaViewSet(viewsets.ModelViewSet):
-    queryset = Factura.objects.all().order_by('id')
+class FacturaViewSet(AlcanceResidenteMixin, ExportacionMixin, viewsets.ModelViewSet):
+    queryset = Factura.objects.select_related('residente').order_by('id')
     serializer_class = FacturaSerializer
     permission_classes = [IsAuthenticated]
 
-class DetalleFacturaViewSet(viewsets.ModelViewSet):
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Sus pagos se borran en cascada: se anula todo lo que la factura movió en el libro
+        libro.revertir_factura(instance.id, incluir_pagos=True)
+        instance.delete()
+        reportes.factura_borrada(instance.fecha_emision)
+
+class DetalleFacturaViewSet(AlcanceResidenteMixin, viewsets.ModelViewSet):
+    queryset = DetalleFactura.objects.all().order_by('id')
     serializer_class = DetalleFacturaSerializer
     permission_classes = [IsAuthenticated]
+    campo_residente = 'factura__residente'
 
     def get_queryset(self):
-        queryset = DetalleFactura.objects.all().order_by('id')
+        queryset = super().get_queryset()
         factura_id = self.request.query_params.get('factura')
         if factura_id:
             queryset = queryset.filter(factura_id=factura_id)
         return queryset
 
-    def destroy(self, request, *args, **kwargs):
-        detalle = self.get_object()
-        factura = detalle.factura
-        response = super().destroy(request, *args, **kwargs)
-        # Actualiza el monto_total de la factura después de eliminar el detalle
-        total = sum(d.monto for d in factura.detalles.all())
-        factura.monto_total = total
-        factura.save()
-        return response
-
-class PagoViewSet(viewsets.ModelViewSet):
-    queryset = Pago.objects.all()
+    @action(detail=False, methods=['post'], url_path='lote', permission_classes=[IsAuthenticated, EsAdministracion])
+    def lote(self, request):
+        """Crea varios detalles a la vez: {"detalles": [{"factura", "concepto", "reserva"}, ...]}"""
+        serializer = DetalleLoteSerializer(data=request.data, context={'request': request})
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        detalles = serializer.save()
+        totales = dict(
+            Factura.objects.filter(id__in={d.factura_id for d in detalles}).values_list('id', 'monto_total')
+        )
+        return Response({
+            'creados': len(detalles),
+            'detalles': DetalleFacturaSerializer(detalles, many=True).data,
+            'totales': totales,
+        }, status=status.HTTP_201_CREATED)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        instance.delete()
+        # Descuenta el monto del detalle del total de la factura
+        Factura.sumar_al_total(instance.factura_id, -instance.monto)
+        libro.sincronizar_facturas([instance.factura_id])
+
+class EjecucionFacturacionViewSet(mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = EjecucionFacturacion.objects.all()
+    serializer_class = EjecucionFacturacionSerializer
+    permission_classes = [IsAuthenticated, EsAdministracion]
+
+    def create(self, request, *args, **kwargs):
+        """Crea y ejecuta la facturación; con una clave ya usada devuelve (o retoma) esa ejecución"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        ejecucion, creada = facturacion.crear_ejecucion(
+            clave=datos['clave'],
+            conceptos=datos['conceptos'],
+            residencias=datos.get('residencias'),
+            tipos_residencia=datos.get('tipos_residencia'),
+            tipos_residente=datos.get('tipos_residente'),
+            fecha_limite=datos.get('fecha_limite'),
+            descripcion=datos.get('descripcion', ''),
+        )
+        try:
+            ejecucion = facturacion.ejecutar(ejecucion.id)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(
+            self.get_serializer(ejecucion).data,
+            status=status.HTTP_201_CREATED if creada else status.HTTP_200_OK
+        )
+
+    @action(detail=True, methods=['post'])
+    def reanudar(self, request, pk=None):
+        """Retoma una ejecución fallida o interrumpida"""
+        ejecucion = self.get_object()
+        try:
+            ejecucion = facturacion.ejecutar(ejecucion.id, reanudar=True)
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        return Response(self.get_serializer(ejecucion).data)
+
+class ReporteViewSet(viewsets.ViewSet):
+    """Reportes financieros leídos de las tablas de resumen (``manage.py actualizar_resumenes``)"""
+    permission_classes = [IsAuthenticated, EsAdministracion]
+    usar_replica = True
+
+    def _rango(self, request):
+        hasta = timezone.localdate()
+        desde = hasta.replace(day=1) - timedelta(days=365)
+        if request.query_params.get('desde'):
+            desde = parse_date(request.query_params['desde'])
+        if request.query_params.get('hasta'):
+            hasta = parse_date(request.query_params['hasta'])
+        if desde is None or hasta is None or desde > hasta:
+            return None
+        return desde.replace(day=1), hasta
+
+    def _responder(self, request, calcular):
+        rango = self._rango(request)
+        if rango is None:
+            return Response(
+                {'error': 'desde y hasta deben ser fechas YYYY-MM-DD y desde <= hasta'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        marca = reportes.marca()
+        return Response({
+            'desde': rango[0],
+            'hasta': rango[1],
+            'actualizado_hasta': marca.hasta if marca else None,
+            'resultados': calcular(*rango),
+        })
+
+    @action(detail=False, methods=['get'], url_path='ingresos-mensuales')
+    def ingresos_mensuales(self, request):
+        """Facturado, pagado y tasa de cobro por mes"""
+        return self._responder(request, reportes.ingresos_mensuales)
+
+    @action(detail=False, methods=['get'], url_path='por-concepto')
+    def por_concepto(self, request):
+        return self._responder(request, reportes.por_concepto)
+
+    @action(detail=False, methods=['get'], url_path='por-area')
+    def por_area(self, request):
+        return self._responder(request, reportes.por_area)
+
+class PagoViewSet(AlcanceResidenteMixin, ExportacionMixin, viewsets.ModelViewSet):
+    queryset = Pago.objects.select_related('residente', 'factura')
     serializer_class = PagoSerializer
     permission_classes = [IsAuthenticated]
     
@@ -64,122 +388,145 @@ class PagoViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(residente=self.request.user.residente)
 
+    @transaction.atomic
+    def perform_update(self, serializer):
+        pago = serializer.save()
+        libro.registrar_pagos([pago])
+
     @action(detail=False, methods=['post'])  # ✅ Verifica que tenga este decorador
     def crear_payment_intent(self, request):
-        """Crear un PaymentIntent de Stripe"""
+        """Crear (o reutilizar) el PaymentIntent de Stripe de una factura"""
+        factura_id = request.data.get('factura_id')
+        if not factura_id:
+            return Response(
+                {'error': 'factura_id es requerido'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
-            factura_id = request.data.get('factura_id')
-            if not factura_id:
-                return Response(
-                    {'error': 'factura_id es requerido'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Verificar que la factura existe y pertenece al usuario
-            try:
-                factura = Factura.objects.get(id=factura_id, residente=request.user.residente)
-            except Factura.DoesNotExist:
-                return Response(
-                    {'error': 'Factura no encontrada'}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
-            
-            # Verificar que la factura no esté ya pagada
-            if factura.estado == 'pagada':
-                return Response(
-                    {'error': 'La factura ya está pagada'}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Convertir monto a centavos (Stripe usa centavos)
-            monto_centavos = int(float(factura.monto_total) * 100)
-            
-            # Crear PaymentIntent en Stripe
-            intent = stripe.PaymentIntent.create(
-                amount=monto_centavos,
-                currency='usd',  # o 'bob' si soporta bolivianos
-                metadata={
-                    'factura_id': factura.id,
-                    'residente_id': request.user.residente.id,
-                    'descripcion': factura.descripcion or f'Pago factura #{factura.id}'
-                }
+            pago, reutilizado = pasarela.crear_payment_intent(factura_id, request.user.residente)
+        except Factura.DoesNotExist:
+            return Response(
+                {'error': 'Factura no encontrada'}, 
+                status=status.HTTP_404_NOT_FOUND
             )
-            
-            # Crear registro de pago en la BD
-            pago = Pago.objects.create(
-                factura=factura,
-                residente=request.user.residente,
-                monto=factura.monto_total,
-                metodo_pago='stripe',
-                estado='pendiente',
-                stripe_payment_intent_id=intent.id,
-                stripe_client_secret=intent.client_secret
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except stripe.StripeError as e:
+            return Response(
+                {'error': e.user_message or 'Error al comunicarse con Stripe'},
+                status=status.HTTP_502_BAD_GATEWAY
             )
-            
-            return Response({
-                'payment_intent_id': intent.id,
-                'client_secret': intent.client_secret,
-                'pago_id': pago.id,
-                'monto': float(factura.monto_total),
-                'factura_id': factura.id
-            })
-            
         except Exception as e:
             return Response(
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+        return Response({
+            'payment_intent_id': pago.stripe_payment_intent_id,
+            'client_secret': pago.stripe_client_secret,
+            'pago_id': pago.id,
+            'monto': float(pago.monto),
+            'factura_id': pago.factura_id,
+            'reutilizado': reutilizado
+        })
     
     @action(detail=False, methods=['post'])  # ✅ Verifica que tenga este decorador
     def confirmar_pago(self, request):
-        """Confirmar el pago desde el backend (sin Stripe)"""
+        """Confirmar el pago desde el backend (sin Stripe).
+
+        La factura queda bloqueada (select_for_update) durante toda la
+        confirmación y los cambios de estado son UPDATE condicionales: una
+        segunda confirmación no crea otro pago ni escribe nada. Con el header
+        Idempotency-Key un reintento recibe la respuesta original.
+        """
+        factura_id = request.data.get('factura_id')
+        if not factura_id:
+            return Response(
+                {'error': 'factura_id es requerido'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
         try:
-            factura_id = request.data.get('factura_id')
-            if not factura_id:
-                return Response(
-                    {'error': 'factura_id es requerido'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            with transaction.atomic():
+                try:
+                    factura = Factura.objects.select_for_update().get(
+                        id=factura_id, residente=request.user.residente
+                    )
+                except Factura.DoesNotExist:
+                    return Response(
+                        {'error': 'Factura no encontrada'},
+                        status=status.HTTP_404_NOT_FOUND
+                    )
 
-            # Buscar la factura y el pago pendiente
-            try:
-                factura = Factura.objects.get(id=factura_id, residente=request.user.residente)
-            except Factura.DoesNotExist:
-                return Response(
-                    {'error': 'Factura no encontrada'},
-                    status=status.HTTP_404_NOT_FOUND
-                )
+                repetida = idempotencia.repetida(request)
+                if repetida is not None:
+                    return repetida
+
+                if factura.estado == 'cancelada':
+                    return idempotencia.guardar(request, Response(
+                        {'error': 'La factura está cancelada'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    ))
 
-            # Buscar el último pago pendiente o crear uno nuevo
+                pago = self._completar_pago(factura, request.user.residente)
+                return idempotencia.guardar(request, Response({
+                    'message': 'Pago confirmado exitosamente',
+                    'pago_id': pago.id,
+                    'factura_id': factura.id,
+                    'estado': 'pagada'
+                }))
+        except Exception as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    def _completar_pago(self, factura, residente):
+        """Deja la factura pagada con un pago completado; si ya lo está no escribe nada"""
+        pago = Pago.objects.filter(factura=factura, estado='completado').order_by('-id').first()
+        if pago is None:
+            # El último pago abierto pasa a completado solo si sigue abierto
             pago = Pago.objects.filter(
-                factura=factura,
-                residente=request.user.residente
+                factura=factura, residente=residente, estado__in=PAGOS_ABIERTOS
             ).order_by('-id').first()
-
-            if pago:
-                pago.estado = 'completado'
-                pago.metodo_pago = 'efectivo'
-                pago.save()
-            else:
+            if pago is None or not Pago.objects.filter(pk=pago.pk, estado__in=PAGOS_ABIERTOS).update(
+                estado='completado', metodo_pago='efectivo', fecha_actualizacion=timezone.now()
+            ):
                 pago = Pago.objects.create(
                     factura=factura,
-                    residente=request.user.residente,
+                    residente=residente,
                     monto=factura.monto_total,
                     metodo_pago='efectivo',
                     estado='completado'
                 )
 
-            factura.estado = 'pagada'
-            factura.save()
+        Factura.objects.filter(pk=factura.pk).exclude(estado__in=['pagada', 'cancelada']).update(
+            estado='pagada', fecha_actualizacion=timezone.now()
+        )
+        libro.abonar([pago.id])
+        return pago
 
-            return Response({
-                'message': 'Pago confirmado exitosamente',
-                'pago_id': pago.id,
-                'factura_id': factura.id,
-                'estado': 'pagada'
-            })
-        except Exception as e:
-            return Response(
-                {'error': str(e)},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+
+class StripeWebhookView(APIView):
+    """Recibe eventos de Stripe: verifica la firma, guarda el evento y responde enseguida"""
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        payload = request.body
+        firma = request.META.get('HTTP_STRIPE_SIGNATURE', '')
+        try:
+            evento = stripe.Webhook.construct_event(payload, firma, settings.STRIPE_WEBHOOK_SECRET)
+        except (ValueError, stripe.SignatureVerificationError):
+            return Response({'error': 'Firma o payload inválido'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            registro, creado = EventoStripe.objects.get_or_create(
+                evento_id=evento['id'],
+                defaults={'tipo': evento['type'], 'payload': json.loads(payload)},
             )
+            if creado:
+                webhooks.encolar(registro.pk)
+        return Response({'recibido': True, 'duplicado': not creado})
@@ -0,0 +1,124 @@
+"""
+Procesamiento de eventos del webhook de Stripe.
+
+La vista solo verifica la firma, guarda el evento (``evento_id`` es único, así
+que un reenvío de Stripe no se procesa dos veces) y responde. El trabajo real
+se hace después del COMMIT en un pool de hilos del proceso; si el proceso se
+cae antes, ``manage.py procesar_eventos_stripe`` recoge lo que haya quedado.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import libro
+from .models import EventoStripe, Factura, Pago
+
+logger = logging.getLogger(__name__)
+
+MAX_INTENTOS = 5
+
+_pool = None
+_bloqueo = threading.Lock()
+
+
+def _ejecutor():
+    global _pool
+    with _bloqueo:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.STRIPE_WEBHOOK_WORKERS, thread_name_prefix='stripe-webhook'
+            )
+    return _pool
+
+
+def encolar(evento_pk):
+    """Procesa el evento en segundo plano cuando se confirme la transacción actual"""
+    transaction.on_commit(lambda: _ejecutor().submit(_procesar_en_hilo, evento_pk))
+
+
+def _procesar_en_hilo(evento_pk):
+    close_old_connections()
+    try:
+        procesar_evento(evento_pk)
+    except Exception:
+        logger.exception('Error procesando el evento de Stripe %s', evento_pk)
+    finally:
+        connection.close()
+
+
+def _pago_exitoso(intent):
+    pago = Pago.objects.select_for_update().filter(stripe_payment_intent_id=intent['id']).first()
+    if pago is None:
+        return False
+    if pago.estado != 'completado':
+        pago.estado = 'completado'
+        pago.save(update_fields=['estado', 'fecha_actualizacion'])
+    Factura.objects.filter(pk=pago.factura_id).exclude(estado='pagada').update(
+        estado='pagada', fecha_actualizacion=timezone.now()
+    )
+    libro.abonar([pago.id])
+    return True
+
+
+def _pago_fallido(intent):
+    pago = Pago.objects.select_for_update().filter(stripe_payment_intent_id=intent['id']).first()
+    if pago is None:
+        return False
+    # Un evento de fallo atrasado no deshace un pago ya completado
+    if pago.estado not in ('completado', 'reembolsado'):
+        error = (intent.get('last_payment_error') or {}).get('message', '')
+        pago.estado = 'fallido'
+        pago.notas = error or pago.notas
+        pago.save(update_fields=['estado', 'notas', 'fecha_actualizacion'])
+    return True
+
+
+MANEJADORES = {
+    'payment_intent.succeeded': _pago_exitoso,
+    'payment_intent.payment_failed': _pago_fallido,
+}
+
+
+def procesar_evento(evento_pk):
+    """Aplica un evento guardado. Devuelve el estado final o None si otro hilo lo tiene"""
+    try:
+        with transaction.atomic():
+            evento = (
+                EventoStripe.objects
+                .select_for_update(skip_locked=True)
+                .filter(pk=evento_pk, estado__in=['recibido', 'error'])
+                .first()
+            )
+            if evento is None:
+                return None
+            manejador = MANEJADORES.get(evento.tipo)
+            if manejador is None:
+                estado = 'ignorado'
+            else:
+                intent = evento.payload['data']['object']
+                estado = 'procesado' if manejador(intent) else 'ignorado'
+            EventoStripe.objects.filter(pk=evento.pk).update(
+                estado=estado, intentos=F('intentos') + 1, error='', procesado=timezone.now()
+            )
+            return estado
+    except Exception as e:
+        EventoStripe.objects.filter(pk=evento_pk).update(
+            estado='error', intentos=F('intentos') + 1, error=str(e)
+        )
+        raise
+
+
+def pendientes(antiguedad_segundos=30):
+    """Eventos sin procesar (o con error y reintentos disponibles) más viejos que ``antiguedad_segundos``"""
+    limite = timezone.now() - timedelta(seconds=antiguedad_segundos)
+    return (
+        EventoStripe.objects
+        .filter(estado__in=['recibido', 'error'], recibido__lte=limite, intentos__lt=MAX_INTENTOS)
+        .order_by('recibido')
+    )
@@ -72,6 +72,9 @@ class Vehiculo(models.Model):
 
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(fields=["residente", "id"], name="vehiculo_residente_idx"),
+        ]
 
     def __str__(self):
         return f"{self.marca} {self.modelo} - {self.matricula}"
@@ -110,6 +113,9 @@ class Visitante(models.Model):
     hora_salida = models.DateTimeField(null=True, blank=True)
     class Meta:
         ordering = ["id"]
+        indexes = [
+            models.Index(fields=["residente", "id"], name="visitante_residente_idx"),
+        ]
 
     def __str__(self):
         return f"{self.nombre} {self.apellidos}"
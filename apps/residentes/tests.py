@@ -1,3 +1,51 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from apps.cuentas.models import Rol, Usuario
+from .models import Residente, Vehiculo, Visitante
+
+
+class AlcanceControlAccesoTests(TestCase):
+    """Vehículos y visitantes: el residente ve los suyos, el personal de seguridad todos"""
+
+    @classmethod
+    def setUpTestData(cls):
+        ana = Residente.objects.create(nombre='Ana', apellidos='Prueba', dni='91001', sexo='F', tipo='PROPIETARIO')
+        luis = Residente.objects.create(nombre='Luis', apellidos='Prueba', dni='91002', sexo='M', tipo='PROPIETARIO')
+        cls.vehiculos = {
+            r.pk: Vehiculo.objects.create(marca='Toyota', matricula=f'{r.dni}ABC', tipo='COCHE', residente=r).pk
+            for r in (ana, luis)
+        }
+        cls.visitantes = {
+            r.pk: Visitante.objects.create(nombre='Eva', apellidos='Visita', residente=r).pk for r in (ana, luis)
+        }
+        cls.ana, cls.luis = ana, luis
+        cls.residente = Usuario.objects.create_user('ana@example.com', 'clave', residente=ana)
+        cls.admin = Usuario.objects.create_user('admin@example.com', 'clave', is_staff=True)
+        cls.guardia = Usuario.objects.create_user(
+            'guardia@example.com', 'clave', rol=Rol.objects.create(nombre='Seguridad')
+        )
+        cls.sin_rol = Usuario.objects.create_user('nadie@example.com', 'clave')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _ids(self, usuario, url):
+        self.client.force_authenticate(usuario)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        return {fila['id'] for fila in respuesta.json()}
+
+    def test_visibilidad_por_rol(self):
+        for url, filas in (('/api/vehiculos/', self.vehiculos), ('/api/visitantes/', self.visitantes)):
+            todas = set(filas.values())
+            with self.subTest(url):
+                self.assertEqual(self._ids(self.residente, url), {filas[self.ana.pk]})
+                self.assertEqual(self._ids(self.admin, url), todas)
+                self.assertEqual(self._ids(self.guardia, url), todas)
+                self.assertEqual(self._ids(self.sin_rol, url), set())
+
+    def test_residente_no_accede_a_lo_ajeno(self):
+        self.client.force_authenticate(self.residente)
+        respuesta = self.client.get(f'/api/vehiculos/{self.vehiculos[self.luis.pk]}/')
+        self.assertEqual(respuesta.status_code, 404)
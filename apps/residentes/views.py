@@ -1,32 +1,78 @@
 from django.shortcuts import render
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from config.exportacion import ExportacionMixin
+from apps.cuentas.mixins import AlcanceResidenteMixin, es_administracion
+from apps.reserva_pagos.models import MovimientoCuenta, SaldoResidente
+from apps.reserva_pagos.serializers import MovimientoCuentaSerializer
 from .models import Residente
 from .serializers import *
 
-class ResidenteViewSet(viewsets.ModelViewSet):
+
+class MovimientosPagination(CursorPagination):
+    """Paginación por cursor sobre el id: cada página es un rango del índice (residente, -id)"""
+    ordering = '-id'
+    page_size = 50
+    page_size_query_param = 'tamano'
+    max_page_size = 500
+
+
+class ResidenteViewSet(ExportacionMixin, viewsets.ModelViewSet):
     queryset = Residente.objects.all().order_by('id')
     serializer_class = ResidenteSerializer
     permission_classes = [IsAuthenticated]
 
+    @action(detail=True, methods=['get'], url_path='estado-cuenta')
+    def estado_cuenta(self, request, pk=None):
+        """Saldo materializado del residente y su libro de movimientos paginado"""
+        if not es_administracion(request.user) and str(request.user.residente_id) != str(pk):
+            return Response(
+                {'detail': 'No puede consultar el estado de cuenta de otro residente.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        saldo = SaldoResidente.objects.filter(pk=pk).first()
+        if saldo is None:
+            # Sin movimientos todavía: solo se comprueba que el residente exista
+            saldo = SaldoResidente(residente=self.get_object())
+
+        paginador = MovimientosPagination()
+        pagina = paginador.paginate_queryset(MovimientoCuenta.objects.filter(residente_id=saldo.pk), request, view=self)
+        return Response({
+            'residente': saldo.pk,
+            'saldo': saldo.saldo,
+            'total_cargos': saldo.total_cargos,
+            'total_pagado': saldo.total_pagado,
+            'cantidad_movimientos': saldo.movimientos,
+            'actualizado': saldo.actualizado,
+            'next': paginador.get_next_link(),
+            'previous': paginador.get_previous_link(),
+            'movimientos': MovimientoCuentaSerializer(pagina, many=True).data,
+        })
+
 class ResidenciaViewSet(viewsets.ModelViewSet):
     queryset = Residencia.objects.all().order_by('numero')
     serializer_class = ResidenciaSerializer
     permission_classes = [IsAuthenticated]
 
 
-class VehiculoViewSet(viewsets.ModelViewSet):
+class VehiculoViewSet(AlcanceResidenteMixin, viewsets.ModelViewSet):
     queryset = Vehiculo.objects.all().order_by('id')
     serializer_class = VehiculoSerializer
     permission_classes = [IsAuthenticated]
+    acceso_personal = True  # control de acceso en portería
 
 class MascotaViewSet(viewsets.ModelViewSet):
     queryset = Mascota.objects.select_related('residente').all().order_by('id')
     serializer_class = MascotaSerializer
     permission_classes = [IsAuthenticated]
 
-class VisitanteViewSet(viewsets.ModelViewSet):
+class VisitanteViewSet(AlcanceResidenteMixin, viewsets.ModelViewSet):
     queryset = Visitante.objects.all().order_by('id')
     serializer_class = VisitanteSerializer
     permission_classes = [IsAuthenticated]
+    acceso_personal = True  # control de acceso en portería
     
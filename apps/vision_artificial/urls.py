@@ -1,9 +1,14 @@
 from django.urls import path
-from .views import ReconocimientoFacialView, LogReconocimientoListView, ReconocimientoPlacaView, LogReconocimientoPlacaListView
+from .views import (
+    ReconocimientoFacialView, LogReconocimientoListView, ReconocimientoPlacaView,
+    LogReconocimientoPlacaListView, LogReconocimientoExportView, LogReconocimientoPlacaExportView
+)
 
 urlpatterns = [
     path('vision/reconocer/', ReconocimientoFacialView.as_view(), name='reconocer-facial'),
     path('vision/logs/', LogReconocimientoListView.as_view(), name='logs-reconocimiento'),
     path('vision/reconocer-placa/', ReconocimientoPlacaView.as_view(), name='reconocer-placa'),
     path('vision/logs-placa/', LogReconocimientoPlacaListView.as_view(), name='logs-reconocimiento-placa'),
+    path('vision/logs/exportar/', LogReconocimientoExportView.as_view(), name='logs-reconocimiento-exportar'),
+    path('vision/logs-placa/exportar/', LogReconocimientoPlacaExportView.as_view(), name='logs-reconocimiento-placa-exportar'),
 ]
\ No newline at end of file
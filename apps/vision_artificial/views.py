@@ -6,6 +6,7 @@ from apps.residentes.models import Residente, Vehiculo
 from .models import logReconocimiento, logReconocimientoPlaca
 from .serializers import LogReconocimientoSerializer, LogReconocimientoPlacaSerializer
 from decouple import config
+from config.exportacion import exportar_queryset
 import requests
 import io
 
@@ -221,7 +222,7 @@ class LogReconocimientoListView(generics.ListAPIView):
     
     def get_queryset(self):
         try:
-            return logReconocimiento.objects.all().order_by('-fecha_hora')
+            return logReconocimiento.objects.select_related('residente').order_by('-fecha_hora')
         except Exception as e:
             return logReconocimiento.objects.none()
     
@@ -236,7 +237,7 @@ class LogReconocimientoPlacaListView(generics.ListAPIView):
     
     def get_queryset(self):
         try:
-            return logReconocimientoPlaca.objects.all().order_by('-fecha_hora')
+            return logReconocimientoPlaca.objects.select_related('vehiculo__residente').order_by('-fecha_hora')
         except Exception as e:
             return logReconocimientoPlaca.objects.none()
     
@@ -245,3 +246,19 @@ class LogReconocimientoPlacaListView(generics.ListAPIView):
             return super().list(request, *args, **kwargs)
         except Exception as e:
             return Response([], status=status.HTTP_200_OK)
+
+
+class LogReconocimientoExportView(LogReconocimientoListView):
+    def get(self, request, *args, **kwargs):
+        return exportar_queryset(
+            request, self.get_queryset(), self.get_serializer_class(),
+            'logs-reconocimiento', context=self.get_serializer_context()
+        )
+
+
+class LogReconocimientoPlacaExportView(LogReconocimientoPlacaListView):
+    def get(self, request, *args, **kwargs):
+        return exportar_queryset(
+            request, self.get_queryset(), self.get_serializer_class(),
+            'logs-reconocimiento-placa', context=self.get_serializer_context()
+        )
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark de serialización JSON: JSONRenderer de DRF vs ORJSONRenderer.
+
+Genera en memoria (sin tocar la base de datos) 10k filas ya serializadas de
+residentes, facturas, pagos y bitácora, y mide el tiempo de render/parse.
+
+Uso: python benchmark_json.py [filas] [repeticiones]
+"""
+import io
+import os
+import sys
+import time
+import django
+from datetime import date, timedelta
+from decimal import Decimal
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from config.renderers import ORJSONParser, ORJSONRenderer
+from apps.cuentas.models import Usuario, Bitacora
+from apps.cuentas.serializers import BitacoraSerializer
+from apps.residentes.models import Residente
+from apps.residentes.serializers import ResidenteSerializer
+from apps.reserva_pagos.models import Factura, Pago
+from apps.reserva_pagos.serializers import FacturaSerializer, PagoSerializer
+
+
+def generar_payloads(filas):
+    """Listas de dicts tal como las entrega el serializer de cada endpoint"""
+    ahora = timezone.now()
+    residentes, facturas, pagos, bitacora = [], [], [], []
+    usuario = Usuario(id=1, correo='admin@condominium.com')
+    for i in range(1, filas + 1):
+        residente = Residente(
+            id=i, nombre=f'Nombre {i}', apellidos='Pérez Gómez', dni=str(10000000 + i),
+            fecha_nacimiento=date(1980, 1, 1) + timedelta(days=i % 9000), telefono='70012345',
+            correo=f'residente{i}@correo.com', sexo='M', tipo='PROPIETARIO',
+            foto_perfil=f'https://picsum.photos/200/200?random={i}',
+            fecha_creacion=ahora, actualizado=ahora,
+        )
+        factura = Factura(
+            id=i, residente=residente, monto_total=Decimal('1234.50') + i,
+            estado='pendiente', fecha_limite=date(2026, 1, 1) + timedelta(days=i % 365),
+            fecha_emision=date(2025, 12, 1), descripcion=f'Factura mensual {i}',
+        )
+        pago = Pago(
+            id=i, factura=factura, residente=residente, monto=factura.monto_total,
+            metodo_pago='stripe', estado='completado', stripe_payment_intent_id=f'pi_{i:024d}',
+            fecha_creacion=ahora, fecha_actualizacion=ahora, referencia_pago=f'REF-{i}',
+        )
+        registro = Bitacora(
+            id=i, usuario=usuario, accion='LOGIN', descripcion='Login exitoso desde 10.0.0.1',
+            ip='10.0.0.1', fecha=ahora,
+        )
+        residentes.append(ResidenteSerializer(residente).data)
+        facturas.append(FacturaSerializer(factura).data)
+        pagos.append(PagoSerializer(pago).data)
+        bitacora.append(BitacoraSerializer(registro).data)
+    return {
+        'residentes': residentes,
+        'facturas': facturas,
+        'pagos': pagos,
+        'bitacora': bitacora,
+        # Valores crudos (Decimal, datetime) como los de un Response armado a mano
+        'crudo': [
+            {'id': i, 'monto': Decimal('99.90') + i, 'fecha': ahora, 'dia': date.today()}
+            for i in range(filas)
+        ],
+    }
+
+
+def medir(funcion, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main():
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"⏱️  Benchmark JSON con {filas} filas por payload ({repeticiones} repeticiones, mejor tiempo)")
+    print("=" * 78)
+    print(f"{'payload':<12}{'DRF render':>12}{'orjson':>12}{'x':>7}{'DRF parse':>12}{'orjson':>12}{'x':>7}")
+
+    drf_r, rapido_r = JSONRenderer(), ORJSONRenderer()
+    drf_p, rapido_p = JSONParser(), ORJSONParser()
+
+    for nombre, data in generar_payloads(filas).items():
+        t_drf, cuerpo = medir(lambda: drf_r.render(data), repeticiones)
+        t_rapido, _ = medir(lambda: rapido_r.render(data), repeticiones)
+        tp_drf, _ = medir(lambda: drf_p.parse(io.BytesIO(cuerpo)), repeticiones)
+        tp_rapido, _ = medir(lambda: rapido_p.parse(io.BytesIO(cuerpo)), repeticiones)
+        print(
+            f"{nombre:<12}{t_drf * 1000:>10.1f}ms{t_rapido * 1000:>10.1f}ms{t_drf / t_rapido:>6.1f}x"
+            f"{tp_drf * 1000:>10.1f}ms{tp_rapido * 1000:>10.1f}ms{tp_drf / tp_rapido:>6.1f}x"
+        )
+        print(f"{'':<12}{filas / t_rapido:>,.0f} filas/s con orjson ({len(cuerpo) / 1024:,.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark del webhook de Stripe contra la base configurada.
+
+Crea N pagos pendientes con su PaymentIntent, envía N eventos
+payment_intent.succeeded firmados con stripe_local.firmar() (más un porcentaje
+de reenvíos duplicados, como hace Stripe) y mide:
+  - la latencia de respuesta del webhook (lo que ve Stripe),
+  - el tiempo hasta que todos los pagos quedan completados y sus facturas pagadas.
+Al terminar borra los datos que creó.
+
+Uso: python benchmark_webhook.py [eventos] [hilos_cliente] [porcentaje_duplicados]
+"""
+import json
+import os
+import statistics
+import sys
+import time
+import django
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+
+import stripe_local
+from apps.residentes.models import Residente
+from apps.reserva_pagos.models import EventoStripe, Factura, Pago
+
+PREFIJO = 'pi_bench_'
+
+
+def preparar(cantidad):
+    residente = Residente.objects.order_by('id').first()
+    if residente is None:
+        print("❌ Se necesita al menos un residente (ejecuta populate_database.py)")
+        sys.exit(1)
+    limpiar()
+    facturas = Factura.objects.bulk_create([
+        Factura(residente=residente, monto_total=100, descripcion='benchmark webhook')
+        for _ in range(cantidad)
+    ])
+    Pago.objects.bulk_create([
+        Pago(factura=f, residente=residente, monto=100, stripe_payment_intent_id=f'{PREFIJO}{i}')
+        for i, f in enumerate(facturas)
+    ])
+    return [f.id for f in facturas]
+
+
+def limpiar():
+    Factura.objects.filter(descripcion='benchmark webhook').delete()
+    EventoStripe.objects.filter(evento_id__startswith='evt_bench_').delete()
+
+
+def enviar(datos):
+    payload = json.dumps(datos).encode()
+    inicio = time.perf_counter()
+    respuesta = Client().post(
+        '/api/stripe/webhook/', data=payload, content_type='application/json',
+        HTTP_STRIPE_SIGNATURE=stripe_local.firmar(payload, settings.STRIPE_WEBHOOK_SECRET),
+    )
+    connection.close()
+    return time.perf_counter() - inicio, respuesta.status_code
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    hilos = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    duplicados = float(sys.argv[3]) if len(sys.argv) > 3 else 10
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        settings.STRIPE_WEBHOOK_SECRET = 'whsec_local'
+
+    print(f"⏱️  Webhook: {cantidad} eventos, {hilos} hilos cliente, {duplicados:.0f}% reenvíos")
+    facturas = preparar(cantidad)
+    eventos = [
+        stripe_local.evento('payment_intent.succeeded', {'id': f'{PREFIJO}{i}', 'object': 'payment_intent'},
+                            evento_id=f'evt_bench_{i}')
+        for i in range(cantidad)
+    ]
+    eventos += eventos[:int(cantidad * duplicados / 100)]
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(enviar, eventos))
+    t_envio = time.perf_counter() - inicio
+
+    # Espera a que el pool del webhook termine de aplicar los eventos
+    while Factura.objects.filter(id__in=facturas).exclude(estado='pagada').exists():
+        if time.perf_counter() - inicio > 300:
+            print("❌ Tiempo de espera agotado")
+            break
+        time.sleep(0.05)
+    t_total = time.perf_counter() - inicio
+
+    latencias = sorted(r[0] * 1000 for r in resultados)
+    errores = sum(1 for r in resultados if r[1] != 200)
+    procesados = EventoStripe.objects.filter(evento_id__startswith='evt_bench_', estado='procesado').count()
+    print(f"  Respuesta: p50 {statistics.median(latencias):.1f}ms  "
+          f"p99 {latencias[int(len(latencias) * 0.99) - 1]:.1f}ms  errores HTTP: {errores}")
+    print(f"  Envío: {len(eventos) / t_envio:,.0f} eventos/s   "
+          f"Procesado completo: {cantidad / t_total:,.0f} pagos/s ({t_total:.2f}s)")
+    print(f"  Eventos procesados: {procesados} (esperados {cantidad}, duplicados ignorados)")
+    limpiar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Enrutamiento de lecturas hacia réplicas de PostgreSQL.
+
+Las lecturas seguras (listados, ``ReadOnlyModelViewSet`` y endpoints de
+reportes) se envían a una réplica sana. Todo lo demás va a ``default``.
+Cuando una petición escribe, ella y el usuario/cliente que la hizo quedan
+fijados a la primaria durante ``DB_REPLICA_PIN_SECONDS`` para que siempre
+lean sus propias escrituras.
+"""
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.utils.functional import LazyObject
+from rest_framework import generics, viewsets
+
+METODOS_SEGUROS = ('GET', 'HEAD', 'OPTIONS')
+COOKIE_PRIMARIA = 'db_primaria'
+
+_peticion_actual = ContextVar('db_peticion_actual', default=None)
+
+
+def solo_lectura(vista):
+    """Marca una vista o acción (@action) como apta para leer desde réplica"""
+    vista.usar_replica = True
+    return vista
+
+
+def _clave_usuario(usuario_id):
+    return f'db_primaria:{usuario_id}'
+
+
+def _vista_de_lectura(view_func, metodo):
+    """Decide si la vista resuelta solo lee y puede usar una réplica"""
+    if metodo not in METODOS_SEGUROS:
+        return False
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, 'usar_replica', False)
+    if getattr(cls, 'usar_replica', False):
+        return True
+    acciones = getattr(view_func, 'actions', None)
+    if acciones is None:
+        # APIView / generics sin ViewSet
+        return issubclass(cls, generics.ListAPIView)
+    accion = acciones.get(metodo.lower()) or acciones.get('get')
+    if accion is None:
+        return False
+    if accion == 'list' or issubclass(cls, viewsets.ReadOnlyModelViewSet):
+        return True
+    return getattr(getattr(cls, accion, None), 'usar_replica', False)
+
+
+def _fijada_a_primaria(request):
+    """La petición (cookie) o su usuario escribieron hace poco"""
+    if request.COOKIES.get(COOKIE_PRIMARIA):
+        return True
+    # Solo consideramos el usuario ya autenticado por DRF; evaluar el
+    # SimpleLazyObject de la sesión dispararía una consulta desde el router.
+    usuario = request.__dict__.get('user')
+    if usuario is None or isinstance(usuario, LazyObject) or not usuario.is_authenticated:
+        return False
+    fijado = getattr(request, '_db_fijado_usuario', None)
+    if fijado is None:
+        fijado = bool(cache.get(_clave_usuario(usuario.pk)))
+        request._db_fijado_usuario = fijado
+    return fijado
+
+
+class _EstadoReplicas:
+    """Salud y retraso de cada réplica, comprobados como máximo cada N segundos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._estado = {}  # alias -> (sana, comprobado_en)
+
+    def sana(self, alias):
+        ahora = time.monotonic()
+        sana, comprobado = self._estado.get(alias, (False, None))
+        if comprobado is not None and ahora - comprobado < settings.DB_REPLICA_CHECK_INTERVAL:
+            return sana
+        with self._lock:
+            sana, comprobado = self._estado.get(alias, (False, None))
+            if comprobado is None or ahora - comprobado >= settings.DB_REPLICA_CHECK_INTERVAL:
+                sana = self._comprobar(alias)
+                self._estado[alias] = (sana, ahora)
+        return sana
+
+    def _comprobar(self, alias):
+        try:
+            with connections[alias].cursor() as cursor:
+                # Si la réplica ya aplicó todo lo recibido no hay retraso real,
+                # aunque la primaria lleve tiempo sin escribir.
+                cursor.execute(
+                    "SELECT COALESCE(CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                    "THEN 0 ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END, 0)"
+                )
+                retraso = float(cursor.fetchone()[0])
+        except Exception:
+            return False
+        return retraso <= settings.DB_REPLICA_MAX_LAG
+
+    def elegir(self):
+        sanas = [alias for alias in settings.DATABASE_REPLICAS if self.sana(alias)]
+        return random.choice(sanas) if sanas else None
+
+
+estado_replicas = _EstadoReplicas()
+
+
+class ReplicaRouter:
+    """Envía lecturas marcadas a una réplica sana; escrituras siempre a default"""
+
+    def db_for_read(self, model, **hints):
+        request = _peticion_actual.get()
+        if request is None or not getattr(request, '_db_lectura_replica', False):
+            return None
+        if getattr(request, '_db_escritura', False) or _fijada_a_primaria(request):
+            return 'default'
+        return estado_replicas.elegir() or 'default'
+
+    def db_for_write(self, model, **hints):
+        request = _peticion_actual.get()
+        if request is not None:
+            request._db_escritura = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las réplicas contienen los mismos datos que la primaria
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+class ReplicaMiddleware:
+    """Expone la petición al router y fija a primaria a quien acaba de escribir"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request._db_lectura_replica = False
+        request._db_escritura = False
+        token = _peticion_actual.set(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _peticion_actual.reset(token)
+
+        if request._db_escritura and settings.DATABASE_REPLICAS:
+            ventana = settings.DB_REPLICA_PIN_SECONDS
+            response.set_cookie(COOKIE_PRIMARIA, '1', max_age=ventana, httponly=True, samesite='Lax')
+            usuario = request.__dict__.get('user')
+            if usuario is not None and not isinstance(usuario, LazyObject) and usuario.is_authenticated:
+                cache.set(_clave_usuario(usuario.pk), True, ventana)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if settings.DATABASE_REPLICAS:
+            request._db_lectura_replica = _vista_de_lectura(view_func, request.method)
+        return None
@@ -0,0 +1,117 @@
+"""
+Exportación en streaming (NDJSON o CSV) de querysets grandes.
+
+Las filas se leen con ``.iterator(chunk_size=...)`` (cursor del lado del
+servidor en PostgreSQL) y se escriben a un ``StreamingHttpResponse`` por
+bloques, así que la memoria usada no depende del tamaño de la tabla.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from .db_router import solo_lectura
+from .renderers import json_bytes
+
+FORMATOS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+FILAS_POR_BLOQUE = 500
+
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve lo escrito en vez de guardarlo"""
+
+    def write(self, valor):
+        return valor
+
+
+def _aplanar(fila, prefijo=''):
+    """{'residente': {'id': 1}} -> {'residente.id': 1} para columnas CSV"""
+    plano = {}
+    for clave, valor in fila.items():
+        nombre = f'{prefijo}{clave}'
+        if isinstance(valor, dict):
+            plano.update(_aplanar(valor, f'{nombre}.'))
+        elif isinstance(valor, (list, tuple)):
+            plano[nombre] = json_bytes(valor).decode()
+        else:
+            plano[nombre] = valor
+    return plano
+
+
+def _filas_ndjson(filas):
+    bloque = []
+    for fila in filas:
+        bloque.append(json_bytes(fila))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield b'\n'.join(bloque) + b'\n'
+            bloque = []
+    if bloque:
+        yield b'\n'.join(bloque) + b'\n'
+
+
+def _filas_csv(filas):
+    escritor = csv.writer(_Eco())
+    columnas = None
+    bloque = []
+    for fila in filas:
+        fila = _aplanar(fila)
+        if columnas is None:
+            columnas = list(fila)
+            bloque.append(escritor.writerow(columnas))
+        bloque.append(escritor.writerow([fila.get(c, '') for c in columnas]))
+        if len(bloque) >= FILAS_POR_BLOQUE:
+            yield ''.join(bloque)
+            bloque = []
+    if bloque:
+        yield ''.join(bloque)
+
+
+def exportar_queryset(request, queryset, serializer_class, nombre, context=None, chunk_size=2000):
+    """Respuesta en streaming con las filas de ``queryset`` ya serializadas"""
+    formato = request.query_params.get('formato', 'ndjson').lower()
+    if formato not in FORMATOS:
+        return Response(
+            {'error': f"Formato inválido. Use uno de: {', '.join(FORMATOS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # El router decide la base (réplica/primaria) ahora, mientras la petición
+    # está activa; el generador se consume después de salir de la vista.
+    queryset = queryset.using(queryset.db)
+    serializer = serializer_class(context=context or {})
+    filas = (serializer.to_representation(obj) for obj in queryset.iterator(chunk_size=chunk_size))
+    contenido = _filas_csv(filas) if formato == 'csv' else _filas_ndjson(filas)
+
+    response = StreamingHttpResponse(contenido, content_type=FORMATOS[formato])
+    fecha = timezone.localdate().strftime('%Y%m%d')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}-{fecha}.{formato}"'
+    return response
+
+
+class ExportacionMixin:
+    """Agrega ``GET <recurso>/exportar/?formato=ndjson|csv`` a un ViewSet.
+
+    Usa ``get_queryset`` y ``filter_queryset`` del propio ViewSet, por lo que
+    los filtros son los mismos que los del listado.
+    """
+    exportacion_nombre = None
+    exportacion_chunk_size = 2000
+
+    @solo_lectura
+    @action(detail=False, methods=['get'], url_path='exportar')
+    def exportar(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        return exportar_queryset(
+            request,
+            queryset,
+            self.get_serializer_class(),
+            self.exportacion_nombre or self.basename,
+            context=self.get_serializer_context(),
+            chunk_size=self.exportacion_chunk_size,
+        )
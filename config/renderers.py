@@ -0,0 +1,85 @@
+"""
+Renderer y parser JSON de DRF basados en orjson.
+
+Los montos (``Decimal``) se emiten como cadena exacta, igual que hacen los
+``DecimalField`` de DRF con ``COERCE_DECIMAL_TO_STRING``; fechas, horas y
+UUID los serializa orjson de forma nativa. Si orjson no está instalado se
+usa la implementación estándar de DRF.
+"""
+import datetime
+import decimal
+
+from django.db.models.query import QuerySet
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependencia opcional
+    orjson = None
+
+if orjson is not None:
+    OPCIONES = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _por_defecto(obj):
+    """Tipos que orjson no conoce; mismo criterio que el JSONEncoder de DRF"""
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, QuerySet):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return list(obj) if isinstance(obj, (list, tuple)) else dict(obj)
+        except Exception:
+            pass
+    if hasattr(obj, '__iter__'):
+        return list(obj)
+    raise TypeError(f'Tipo no serializable a JSON: {type(obj).__name__}')
+
+
+def json_bytes(data, indent=False):
+    """Serializa ``data`` a JSON (bytes UTF-8) con las mismas reglas del renderer"""
+    if orjson is None:
+        return JSONRenderer().render(data)
+    opciones = (OPCIONES | orjson.OPT_INDENT_2) if indent else OPCIONES
+    return orjson.dumps(data, default=_por_defecto, option=opciones)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer compatible con DRF, varias veces más rápido"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        ret = json_bytes(data, indent=bool(indent))
+        # Igual que DRF: JSON que sea un subconjunto estricto de JavaScript
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser de DRF usando orjson.loads"""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        if orjson is None:
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 import os
 import cloudinary
 
@@ -49,6 +49,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # DRF + CORS
     'rest_framework',
@@ -73,6 +74,15 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny',  
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'config.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'config.renderers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # CORS (simple dev)
@@ -88,6 +98,7 @@ CORS_ALLOW_CREDENTIALS = True
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'config.db_router.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -142,6 +153,64 @@ DATABASES = {
     }
 }
 
+# Réplicas de solo lectura (mismas credenciales que default).
+# DB_REPLICA_HOSTS=replica1.interna,replica2.interna:5433
+DATABASE_REPLICAS = []
+for _i, _host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    _host, _, _puerto = _host.partition(':')
+    DATABASES[f'replica_{_i}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': int(_puerto) if _puerto else DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{_i}')
+
+DATABASE_ROUTERS = ['config.db_router.ReplicaRouter']
+# Segundos que quien escribió sigue leyendo de la primaria
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=5, cast=int)
+# Retraso máximo tolerado (segundos) antes de descartar una réplica
+DB_REPLICA_MAX_LAG = config('DB_REPLICA_MAX_LAG', default=10, cast=float)
+# Cada cuánto se vuelve a comprobar la salud de una réplica
+DB_REPLICA_CHECK_INTERVAL = config('DB_REPLICA_CHECK_INTERVAL', default=15, cast=int)
+
+# Caché compartida entre procesos si hay Redis; en memoria en desarrollo
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Procesos de gunicorn (la misma variable que lee gunicorn si no se pasa --workers)
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+# Segundos que vive cada versión de caché (mapa semanal, disponibilidad, calendario); 0 = sin
+# vencimiento. En memoria cada proceso tiene sus versiones y una invalidación hecha en otro
+# worker solo se nota cuando vencen, así que sin Redis no pueden ser eternas.
+CACHE_VERSION_SEGUNDOS = config('CACHE_VERSION_SEGUNDOS', default=0 if REDIS_URL else 60, cast=int) or None
+
+# Disponibilidad de áreas: segundos que se guarda cada día calculado y rango máximo por consulta
+DISPONIBILIDAD_CACHE_SEGUNDOS = config('DISPONIBILIDAD_CACHE_SEGUNDOS', default=3600, cast=int)
+DISPONIBILIDAD_MAX_DIAS = config('DISPONIBILIDAD_MAX_DIAS', default=31, cast=int)
+
+# Mapa de calor de ocupación: segundos en caché de cada período y rango máximo por consulta
+MAPA_CALOR_CACHE_SEGUNDOS = config('MAPA_CALOR_CACHE_SEGUNDOS', default=3600, cast=int)
+MAPA_CALOR_MAX_DIAS = config('MAPA_CALOR_MAX_DIAS', default=5 * 366, cast=int)
+
+# Calendario mensual de reservas: segundos en caché (se invalida además al cambiar una reserva del mes)
+CALENDARIO_CACHE_SEGUNDOS = config('CALENDARIO_CACHE_SEGUNDOS', default=300, cast=int)
+
+# Horas que se guarda la respuesta de una petición con header Idempotency-Key
+IDEMPOTENCIA_HORAS = config('IDEMPOTENCIA_HORAS', default=24, cast=int)
+
 
 
 # Password validation
@@ -222,4 +291,12 @@ except:
 # En settings.py
 # CONFIGURACIÓN STRIPE
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY', default='')
-STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
\ No newline at end of file
+STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY', default='')
+STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')
+STRIPE_CURRENCY = config('STRIPE_CURRENCY', default='usd')
+# Cliente HTTP: base de la API (stripe_local.py en desarrollo), timeout por llamada y reintentos
+STRIPE_API_BASE = config('STRIPE_API_BASE', default='https://api.stripe.com')
+STRIPE_TIMEOUT = config('STRIPE_TIMEOUT', default=10, cast=float)
+STRIPE_MAX_RETRIES = config('STRIPE_MAX_RETRIES', default=2, cast=int)
+# Hilos que procesan los eventos del webhook después de responder a Stripe
+STRIPE_WEBHOOK_WORKERS = config('STRIPE_WEBHOOK_WORKERS', default=4, cast=int)
\ No newline at end of file
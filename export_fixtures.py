@@ -1,58 +1,172 @@
-# Script para exportar SOLO datos (sin estructura) desde SQLite a PostgreSQL
+# Volcado de datos en streaming (NDJSON o formato COPY, comprimido con gzip)
+#
+# Cada tabla se escribe en su propio archivo leyendo con un cursor del lado
+# del servidor (NDJSON) o con COPY TO STDOUT (formato copy), así que nunca se
+# carga una tabla completa en memoria. Las tablas se vuelcan en paralelo
+# compartiendo el mismo snapshot de PostgreSQL (como pg_dump -j), y el
+# manifest.json guarda el orden de carga por dependencias de FK.
+#
+# Uso: python export_fixtures.py [directorio] [--formato ndjson|copy] [--hilos N]
+# Carga: python load_fixtures.py [directorio]
+import argparse
+import gzip
+import json
 import os
+import time
 import django
-import json
-from django.core.management import execute_from_command_line
+from concurrent.futures import ThreadPoolExecutor
 
 # Configurar Django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 django.setup()
 
-def export_data():
-    """Exporta todos los datos como fixtures JSON"""
-    print("Exportando datos de la base de datos actual...")
-    
-    # Crear directorio de fixtures si no existe
-    os.makedirs('fixtures', exist_ok=True)
-    
-    # Apps y modelos a exportar
-    apps_to_export = [
-        'auth.User',
-        'auth.Group', 
-        'cuentas.Usuario',
-        'residentes.Residente',
-        'residentes.Residencia',
-        'residentes.Mascota',
-        'residentes.Vehiculo',
-        'residentes.Visitante',
-        'areas.AreaComun',
-        'personal.Personal',
-        'reserva_pagos.Reserva',
-        'reserva_pagos.Factura'
-    ]
-    
-    for app_model in apps_to_export:
-        try:
-            filename = f"fixtures/{app_model.replace('.', '_')}.json"
-            print(f"Exportando {app_model} -> {filename}")
-            
-            execute_from_command_line([
-                'manage.py', 'dumpdata', 
-                app_model,
-                '--format=json',
-                '--indent=2',
-                f'--output={filename}'
-            ])
-            
-        except Exception as e:
-            print(f"Error exportando {app_model}: {e}")
-    
-    print("✅ Exportación completada!")
-    print("📁 Los archivos están en la carpeta 'fixtures/'")
+from django.apps import apps
+from django.db import connection, connections, transaction
+
+APPS_PROYECTO = ['cuentas', 'residentes', 'personal', 'areas', 'reserva_pagos', 'vision_artificial']
+FORMATOS = {'ndjson': 'ndjson.gz', 'copy': 'copy.gz'}
+FILAS_POR_LECTURA = 5000
+
+
+def modelos_a_volcar():
+    """Modelos del proyecto más las tablas M2M entre ellos"""
+    modelos = []
+    for etiqueta in APPS_PROYECTO:
+        for modelo in apps.get_app_config(etiqueta).get_models(include_auto_created=True):
+            opts = modelo._meta
+            if opts.proxy or not opts.managed:
+                continue
+            # Las M2M hacia auth (grupos/permisos) dependen de IDs propios de cada base
+            if opts.auto_created and any(
+                f.related_model._meta.app_label not in APPS_PROYECTO
+                for f in opts.concrete_fields if f.is_relation
+            ):
+                continue
+            modelos.append(modelo)
+    return modelos
+
+
+def niveles_por_dependencias(modelos):
+    """Agrupa los modelos en niveles: cada nivel solo depende de los anteriores"""
+    incluidos = set(modelos)
+    dependencias = {
+        m: {
+            f.related_model for f in m._meta.concrete_fields
+            if f.is_relation and f.related_model in incluidos and f.related_model is not m
+        }
+        for m in modelos
+    }
+    niveles, hechos = [], set()
+    while len(hechos) < len(modelos):
+        nivel = [m for m in modelos if m not in hechos and dependencias[m] <= hechos]
+        if not nivel:
+            raise RuntimeError('Dependencia circular entre modelos: ' + ', '.join(
+                m._meta.label for m in modelos if m not in hechos))
+        niveles.append(nivel)
+        hechos.update(nivel)
+    return niveles
+
+
+def columnas(modelo):
+    """Columnas reales (sin columnas generadas por la base)"""
+    return [f.column for f in modelo._meta.concrete_fields if not getattr(f, 'generated', False)]
+
+
+def _sql_columnas(modelo):
+    return ', '.join(connection.ops.quote_name(c) for c in columnas(modelo))
+
+
+def _volcar_tabla(modelo, ruta, formato, snapshot):
+    tabla = connection.ops.quote_name(modelo._meta.db_table)
+    orden = connection.ops.quote_name(modelo._meta.pk.column)
+    inicio = time.perf_counter()
+    filas = 0
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", [snapshot])
+            with gzip.open(ruta, 'wb', compresslevel=3) as salida:
+                if formato == 'copy':
+                    cursor.copy_expert(
+                        f"COPY (SELECT {_sql_columnas(modelo)} FROM {tabla} ORDER BY {orden}) TO STDOUT", salida
+                    )
+                    filas = cursor.rowcount
+                else:
+                    # Cursor con nombre = cursor del lado del servidor; la fila
+                    # JSON la arma PostgreSQL.
+                    with connection.connection.cursor(name=f"volcado_{modelo._meta.db_table}") as servidor:
+                        servidor.itersize = FILAS_POR_LECTURA
+                        servidor.execute(
+                            f"SELECT row_to_json(t)::text FROM (SELECT {_sql_columnas(modelo)} "
+                            f"FROM {tabla} ORDER BY {orden}) t"
+                        )
+                        while True:
+                            lote = servidor.fetchmany(FILAS_POR_LECTURA)
+                            if not lote:
+                                break
+                            salida.write(''.join(f'{fila[0]}\n' for fila in lote).encode())
+                            filas += len(lote)
+    finally:
+        connection.close()
+    return filas, time.perf_counter() - inicio
+
+
+def export_data(directorio='fixtures', formato='ndjson', hilos=4):
+    """Vuelca todas las tablas del proyecto a ``directorio``"""
+    print(f"Exportando datos en formato {formato} a '{directorio}/'...")
+    os.makedirs(directorio, exist_ok=True)
+    modelos = modelos_a_volcar()
+    niveles = niveles_por_dependencias(modelos)
+    nivel_de = {m: i for i, nivel in enumerate(niveles) for m in nivel}
+    inicio = time.perf_counter()
+
+    # Transacción "líder": mantiene vivo el snapshot que comparten los hilos
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+        cursor.execute("SELECT pg_export_snapshot()")
+        snapshot = cursor.fetchone()[0]
+
+        tablas = []
+        with ThreadPoolExecutor(max_workers=hilos) as pool:
+            futuros = {}
+            for modelo in modelos:
+                archivo = f"{modelo._meta.label_lower}.{FORMATOS[formato]}"
+                futuros[modelo] = (archivo, pool.submit(
+                    _volcar_tabla, modelo, os.path.join(directorio, archivo), formato, snapshot
+                ))
+            for modelo, (archivo, futuro) in futuros.items():
+                filas, segundos = futuro.result()
+                print(f"  {modelo._meta.label:<40} {filas:>10,} filas  {segundos:6.2f}s -> {archivo}")
+                tablas.append({
+                    'modelo': modelo._meta.label_lower,
+                    'tabla': modelo._meta.db_table,
+                    'archivo': archivo,
+                    'columnas': columnas(modelo),
+                    'filas': filas,
+                    'nivel': nivel_de[modelo],
+                })
+
+    manifest = {
+        'formato': formato,
+        'niveles': [[m._meta.label_lower for m in nivel] for nivel in niveles],
+        'tablas': tablas,
+    }
+    with open(os.path.join(directorio, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Exportación completada en {time.perf_counter() - inicio:.1f}s")
+    print(f"📁 Los archivos están en la carpeta '{directorio}/'")
     print("")
     print("Para cargar en Docker:")
-    print("1. Los fixtures se cargarán automáticamente en el primer deploy")
-    print("2. O ejecuta: docker exec -it <container> python manage.py loaddata fixtures/*.json")
+    print("1. Se cargan automáticamente en el primer deploy si existe fixtures/manifest.json")
+    print("2. O ejecuta: docker exec -it <container> python load_fixtures.py fixtures")
+
 
 if __name__ == "__main__":
-    export_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Volcado de datos en streaming')
+    parser.add_argument('directorio', nargs='?', default='fixtures')
+    parser.add_argument('--formato', choices=list(FORMATOS), default='ndjson')
+    parser.add_argument('--hilos', type=int, default=4)
+    args = parser.parse_args()
+    export_data(args.directorio, args.formato, args.hilos)
+    connections.close_all()
@@ -0,0 +1,143 @@
+# Carga de un volcado hecho con export_fixtures.py
+#
+# Las tablas se cargan con COPY por niveles de dependencia: las tablas de un
+# mismo nivel no se referencian entre sí y se cargan en paralelo, cada una en
+# su transacción con las restricciones diferidas hasta el COMMIT. Al final se
+# ajustan las secuencias de IDs.
+#
+# Con --si-vacia no hace nada si las tablas ya tienen datos (arranques
+# posteriores del contenedor).
+#
+# Uso: python load_fixtures.py [directorio] [--truncar | --si-vacia] [--hilos N]
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import django
+from concurrent.futures import ThreadPoolExecutor
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.apps import apps
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+
+BLOQUE_LECTURA = 1 << 16
+
+
+class _JsonAFilaCopy(io.RawIOBase):
+    """Convierte un archivo NDJSON en el formato texto de COPY (una columna jsonb)"""
+
+    def __init__(self, origen):
+        self._origen = origen
+        self._pendiente = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._pendiente) < len(buffer):
+            datos = self._origen.read(BLOQUE_LECTURA)
+            if not datos:
+                break
+            # En formato texto la barra invertida es escape; el JSON no trae
+            # tabuladores ni saltos de línea sin escapar.
+            self._pendiente += datos.replace(b'\\', b'\\\\')
+        n = min(len(buffer), len(self._pendiente))
+        buffer[:n] = self._pendiente[:n]
+        self._pendiente = self._pendiente[n:]
+        return n
+
+
+def _cargar_tabla(entrada, directorio, formato):
+    tabla = connection.ops.quote_name(entrada['tabla'])
+    nombres = [connection.ops.quote_name(c) for c in entrada['columnas']]
+    cols = ', '.join(nombres)
+    inicio = time.perf_counter()
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+            with gzip.open(os.path.join(directorio, entrada['archivo']), 'rb') as origen:
+                if formato == 'copy':
+                    cursor.copy_expert(f"COPY {tabla} ({cols}) FROM STDIN", origen)
+                else:
+                    cursor.execute("CREATE TEMP TABLE _carga_ndjson (fila jsonb) ON COMMIT DROP")
+                    cursor.copy_expert(
+                        "COPY _carga_ndjson (fila) FROM STDIN",
+                        io.BufferedReader(_JsonAFilaCopy(origen), buffer_size=BLOQUE_LECTURA),
+                    )
+                    cursor.execute(
+                        f"INSERT INTO {tabla} ({cols}) "
+                        f"SELECT {', '.join('r.' + c for c in nombres)} "
+                        f"FROM _carga_ndjson, jsonb_populate_record(NULL::{tabla}, fila) r"
+                    )
+    finally:
+        connection.close()
+    return time.perf_counter() - inicio
+
+
+def _tablas_con_datos(entradas):
+    ocupadas = []
+    with connection.cursor() as cursor:
+        for entrada in entradas:
+            cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {connection.ops.quote_name(entrada['tabla'])})")
+            if cursor.fetchone()[0]:
+                ocupadas.append(entrada['tabla'])
+    return ocupadas
+
+
+def load_data(directorio='fixtures', truncar=False, hilos=4, si_vacia=False):
+    with open(os.path.join(directorio, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    formato = manifest['formato']
+    entradas = {e['modelo']: e for e in manifest['tablas']}
+    inicio = time.perf_counter()
+    print(f"📦 Cargando volcado {formato} desde '{directorio}/' ({len(entradas)} tablas)")
+
+    if truncar:
+        tablas = ', '.join(connection.ops.quote_name(e['tabla']) for e in entradas.values())
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {tablas} CASCADE")
+    else:
+        ocupadas = _tablas_con_datos(entradas.values())
+        if ocupadas and si_vacia:
+            print(f"ℹ️  Las tablas ya tienen datos ({len(ocupadas)} de {len(entradas)}): se omite la carga.")
+            return True
+        if ocupadas:
+            print(f"❌ Las tablas ya tienen datos: {', '.join(ocupadas)}. Usa --truncar para reemplazarlos.")
+            return False
+    connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        for numero, nivel in enumerate(manifest['niveles']):
+            futuros = {m: pool.submit(_cargar_tabla, entradas[m], directorio, formato) for m in nivel}
+            for modelo, futuro in futuros.items():
+                segundos = futuro.result()
+                print(f"  [{numero}] {modelo:<40} {entradas[modelo]['filas']:>10,} filas  {segundos:6.2f}s")
+
+    modelos = [apps.get_model(m) for m in entradas]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), modelos):
+            cursor.execute(sql)
+
+    print(f"✅ Carga completada en {time.perf_counter() - inicio:.1f}s")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Carga de un volcado NDJSON/COPY')
+    parser.add_argument('directorio', nargs='?', default='fixtures')
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument('--truncar', action='store_true', help='Vacía las tablas antes de cargar')
+    grupo.add_argument('--si-vacia', action='store_true', help='Omite la carga si las tablas ya tienen datos')
+    parser.add_argument('--hilos', type=int, default=4)
+    args = parser.parse_args()
+    ok = load_data(args.directorio, args.truncar, args.hilos, args.si_vacia)
+    connections.close_all()
+    sys.exit(0 if ok else 1)
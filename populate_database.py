@@ -2,6 +2,8 @@
 """
 Script para poblar la base de datos del sistema de condominios con datos realistas
 Genera más de 1000 registros usando datos CASE (Computer-Aided Software Engineering)
+
+Con --escala N delega en populate_scale.py (COPY, en paralelo, reanudable).
 """
 import os
 import sys
@@ -29,7 +31,8 @@ from apps.cuentas.models import Usuario, Rol, Bitacora, Aviso
 from apps.residentes.models import Residencia, Residente, Mascota, Vehiculo, Visitante
 from apps.areas.models import AreaComun, Regla
 from apps.personal.models import Personal, Tarea
-from apps.reserva_pagos.models import Reserva, ConceptoPago, Factura, Pago
+from apps.reserva_pagos.models import Reserva, ConceptoPago, Factura, Pago, MovimientoCuenta, SaldoResidente
+from apps.reserva_pagos import libro
 
 # Configurar Faker para español
 fake = Faker('es_ES')
@@ -479,17 +482,22 @@ class CondominiumDataGenerator:
         areas_reservables = [area for area in self.areas_comunes if area.requiere_reserva]
         
         reservas = []
+        ocupadas = {}  # área -> [(inicio, fin)] de reservas no canceladas
         for i in range(cantidad):
             area = random.choice(areas_reservables)
             residente = random.choice(self.residentes)
             
-            # Fecha de reserva (últimos 6 meses o próximos 3 meses)
-            fecha_reserva = fake.date_between(start_date='-6m', end_date='+3m')
-            
-            # Horarios realistas
-            hora_inicio = fake.time_object()
-            duracion = random.randint(area.tiempo_reserva_minima or 60, area.tiempo_reserva_maxima or 240)
-            hora_fin = (datetime.combine(date.today(), hora_inicio) + timedelta(minutes=duracion)).time()
+            # Fecha y horario sin pisar otra reserva del área (la base lo rechaza)
+            for _ in range(20):
+                # Fecha de reserva (últimos 6 meses o próximos 3 meses)
+                fecha_reserva = fake.date_between(start_date='-6m', end_date='+3m')
+                hora_inicio = fake.time_object().replace(second=0, microsecond=0)
+                duracion = random.randint(area.tiempo_reserva_minima or 60, area.tiempo_reserva_maxima or 240)
+                inicio = datetime.combine(fecha_reserva, hora_inicio)
+                fin = inicio + timedelta(minutes=duracion)
+                if not any(inicio < b and a < fin for a, b in ocupadas.get(area.id, [])):
+                    break
+            hora_fin = fin.time()
             
             # Estado según la fecha
             if fecha_reserva < date.today():
@@ -502,6 +510,11 @@ class CondominiumDataGenerator:
                     ['confirmada', 'pendiente', 'cancelada'],
                     weights=[70, 25, 5]
                 )[0]
+            # Si no se encontró hueco se guarda como cancelada
+            if any(inicio < b and a < fin for a, b in ocupadas.get(area.id, [])):
+                estado = 'cancelada'
+            if estado != 'cancelada':
+                ocupadas.setdefault(area.id, []).append((inicio, fin))
             
             reserva = Reserva(
                 residente=residente,
@@ -524,6 +537,8 @@ class CondominiumDataGenerator:
         
         Factura.objects.all().delete()
         Pago.objects.all().delete()
+        MovimientoCuenta.objects.all().delete()
+        SaldoResidente.objects.all().delete()
         
         facturas = []
         pagos = []
@@ -584,7 +599,11 @@ class CondominiumDataGenerator:
                 )
                 pagos.append(pago)
         
-        Pago.objects.bulk_create(pagos)
+        pagos_creados = Pago.objects.bulk_create(pagos)
+
+        # Libro de cuenta: cargos de las facturas y abonos de los pagos
+        libro.sincronizar_facturas([f.id for f in facturas_creadas])
+        libro.abonar([p.id for p in pagos_creados])
         print(f"✅ {len(facturas_creadas)} facturas y {len(pagos)} pagos creados")
 
     def crear_usuarios_adicionales(self, cantidad=50):
@@ -765,6 +784,14 @@ class CondominiumDataGenerator:
 
 def main():
     """Función principal"""
+    # Modo escala: python populate_database.py --escala 100 [--procesos 8 ...]
+    if '--escala' in sys.argv:
+        import populate_scale
+        argv = sys.argv[1:]
+        argv[argv.index('--escala')] = '--factor'
+        populate_scale.main(argv)
+        return
+
     generator = CondominiumDataGenerator()
     generator.ejecutar_generacion_completa()
 
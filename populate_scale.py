@@ -0,0 +1,639 @@
+#!/usr/bin/env python
+"""
+Generador de datos a escala (100x-1000x) para pruebas de rendimiento.
+
+A diferencia de CondominiumDataGenerator no borra nada: agrega datos sobre
+los existentes usando COPY de PostgreSQL alimentado por generadores, en
+bloques que se reparten entre varios procesos. Cada bloque usa una semilla
+derivada de (semilla, tabla, bloque), así que la misma ejecución produce
+siempre los mismos datos y puede reanudarse: los bloques terminados quedan
+registrados en la tabla escala_progreso dentro de la misma transacción que
+su COPY.
+
+Uso:
+    python populate_scale.py --factor 100 --procesos 8 --ejecucion escala-100
+    python populate_database.py --escala 100      (equivalente)
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+import django
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+# Configurar Django
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+django.setup()
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection, connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from apps.cuentas.models import Usuario, Rol, Bitacora
+from apps.residentes.models import Residencia, Residente, Vehiculo, Visitante
+from apps.areas.models import AreaComun
+from apps.reserva_pagos import libro
+from apps.reserva_pagos.models import Reserva, ConceptoPago, Factura, DetalleFactura, Pago, MovimientoCuenta
+from apps.vision_artificial.models import logReconocimiento, logReconocimientoPlaca
+
+# Filas por tabla con factor 1 (similar a populate_database.py)
+BASE = {
+    'residencias': 150,
+    'residentes': 400,
+    'usuarios': 50,
+    'vehiculos': 300,
+    'visitantes': 500,
+    'reservas': 100,
+    'facturas': 300,
+    'bitacora': 2000,
+    'logs_facial': 1000,
+    'logs_placa': 1000,
+}
+
+# Niveles por dependencias de FK: un nivel empieza cuando el anterior terminó
+NIVELES = [
+    ['residencias'],
+    ['residentes'],
+    ['usuarios', 'vehiculos', 'visitantes', 'reservas', 'facturas', 'logs_facial'],
+    ['bitacora', 'logs_placa'],
+]
+
+# Modelo principal de cada tabla (define la base de IDs)
+MODELOS = {
+    'residencias': Residencia,
+    'residentes': Residente,
+    'usuarios': Usuario,
+    'vehiculos': Vehiculo,
+    'visitantes': Visitante,
+    'reservas': Reserva,
+    'facturas': Factura,
+    'detalles': DetalleFactura,
+    'pagos': Pago,
+    'bitacora': Bitacora,
+    'logs_facial': logReconocimiento,
+    'logs_placa': logReconocimientoPlaca,
+}
+
+BLOQUE = 20000
+DETALLES_POR_FACTURA = 6  # IDs reservados por factura (se usan de 3 a 6)
+
+NOMBRES = ['Ana', 'Luis', 'María', 'Carlos', 'Lucía', 'Jorge', 'Sofía', 'Diego', 'Valeria', 'Pedro',
+           'Camila', 'Andrés', 'Paola', 'Miguel', 'Daniela', 'Javier', 'Gabriela', 'Fernando']
+APELLIDOS = ['Rojas', 'Vargas', 'Mamani', 'Quispe', 'Flores', 'Gutiérrez', 'Pérez', 'Choque',
+             'Fernández', 'López', 'Torrez', 'Soliz', 'Romero', 'Suárez', 'Castro', 'Méndez']
+ACCIONES = ['LOGIN', 'LOGOUT', 'PERFIL', 'LOGIN_FALLIDO', 'REGISTRO', 'CREAR_RESERVA', 'PAGO']
+MARCAS = ['Toyota', 'Chevrolet', 'Nissan', 'Hyundai', 'Kia', 'Mazda', 'Honda', 'Ford', 'Volkswagen', 'Suzuki']
+
+SQL_ESTADO = """
+CREATE TABLE IF NOT EXISTS escala_ejecucion (
+    nombre varchar(100) PRIMARY KEY,
+    parametros jsonb NOT NULL,
+    creado timestamptz NOT NULL DEFAULT now()
+);
+CREATE TABLE IF NOT EXISTS escala_progreso (
+    ejecucion varchar(100) NOT NULL REFERENCES escala_ejecucion (nombre) ON DELETE CASCADE,
+    tabla varchar(50) NOT NULL,
+    bloque integer NOT NULL,
+    filas integer NOT NULL,
+    terminado timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (ejecucion, tabla, bloque)
+);
+"""
+
+
+# ---------------------------------------------------------------------------
+# COPY
+# ---------------------------------------------------------------------------
+
+def _valor_copy(valor):
+    """Valor Python -> campo CSV para COPY (NULL se escribe como \\N)"""
+    if valor is None:
+        return '\\N'
+    if valor is True:
+        return 't'
+    if valor is False:
+        return 'f'
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    valor = str(valor)
+    if any(c in valor for c in ',"\n\r') or valor == '\\N':
+        return '"' + valor.replace('"', '""') + '"'
+    return valor
+
+
+class _FlujoCopy(io.RawIOBase):
+    """Archivo de solo lectura que va generando líneas CSV bajo demanda"""
+
+    def __init__(self, lineas):
+        self._lineas = lineas
+        self._pendiente = b''
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while len(self._pendiente) < len(buffer):
+            try:
+                self._pendiente += next(self._lineas)
+            except StopIteration:
+                break
+        n = min(len(buffer), len(self._pendiente))
+        buffer[:n] = self._pendiente[:n]
+        self._pendiente = self._pendiente[n:]
+        return n
+
+
+def _campos(modelo):
+    return [f for f in modelo._meta.concrete_fields if not getattr(f, 'generated', False)]
+
+
+def copiar(cursor, modelo, filas):
+    """COPY de una secuencia de dicts (claves = attname) a la tabla del modelo.
+
+    Los campos que el generador no trae toman su valor por defecto, así que
+    columnas nuevas con default no rompen el generador. Las que tienen
+    ``db_default`` y no vienen en las filas se dejan fuera del COPY: las
+    completa la base.
+    """
+    filas = iter(filas)
+    primera = next(filas, None)
+    if primera is None:
+        return
+    filas = chain([primera], filas)
+    campos = [f for f in _campos(modelo) if f.attname in primera or not f.has_db_default()]
+    defectos = {f.attname: f.get_default() for f in campos}
+    nombres = [f.attname for f in campos]
+
+    def lineas():
+        bloque = []
+        for fila in filas:
+            bloque.append(','.join(_valor_copy(fila.get(n, defectos[n])) for n in nombres))
+            if len(bloque) >= 1000:
+                yield ('\n'.join(bloque) + '\n').encode()
+                bloque = []
+        if bloque:
+            yield ('\n'.join(bloque) + '\n').encode()
+
+    columnas = ', '.join(connection.ops.quote_name(f.column) for f in campos)
+    sql = (
+        f"COPY {connection.ops.quote_name(modelo._meta.db_table)} ({columnas}) "
+        f"FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+    )
+    cursor.copy_expert(sql, io.BufferedReader(_FlujoCopy(lineas()), buffer_size=1 << 16))
+
+
+# ---------------------------------------------------------------------------
+# Generadores por tabla. Reciben (rng, índices 1..N del bloque, contexto) y
+# devuelven {modelo: iterable de filas}
+# ---------------------------------------------------------------------------
+
+def _momento(rng, ctx, dias=730):
+    return ctx['ahora'] - timedelta(seconds=rng.randrange(dias * 86400))
+
+
+def _id(ctx, tabla, i):
+    return ctx['bases'][tabla] + i
+
+
+def _aleatorio(rng, ctx, tabla):
+    return _id(ctx, tabla, rng.randint(1, ctx['totales'][tabla]))
+
+
+def gen_residencias(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            tipo = rng.choice(['APARTAMENTO', 'CASA'])
+            yield {
+                'numero': _id(ctx, 'residencias', i),
+                'direccion': f"Torre {rng.choice('ABCD')}, Piso {rng.randint(1, 20)}, Apt {i}"
+                if tipo == 'APARTAMENTO' else f"Casa {i}, Sector {rng.choice(['Norte', 'Sur', 'Este', 'Oeste'])}",
+                'tipo': tipo,
+                'num_habitaciones': rng.randint(1, 5),
+                'num_residentes': 0,
+            }
+    return {Residencia: filas()}
+
+
+def gen_residentes(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            pk = _id(ctx, 'residentes', i)
+            creado = _momento(rng, ctx)
+            yield {
+                'id': pk,
+                'nombre': rng.choice(NOMBRES),
+                'apellidos': f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+                'fecha_nacimiento': date(1940, 1, 1) + timedelta(days=rng.randrange(25000)),
+                'telefono': f"7{rng.randrange(10 ** 7):07d}",
+                'correo': f"residente{pk}@escala.test",
+                'dni': f"E{ctx['semilla']}-{pk}",
+                'sexo': rng.choice('MF'),
+                'tipo': rng.choices(
+                    ['PROPIETARIO', 'INQUILINO', 'FAMILIAR_PROPIETARIO', 'FAMILIAR_INQUILINO', 'OTRO'],
+                    weights=[40, 30, 15, 10, 5])[0],
+                'residencia_id': _aleatorio(rng, ctx, 'residencias'),
+                'foto_perfil': f"https://picsum.photos/200/200?random={pk}",
+                'activo': rng.random() < 0.75,
+                'fecha_creacion': creado,
+                'actualizado': creado,
+            }
+    return {Residente: filas()}
+
+
+def gen_usuarios(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            pk = _id(ctx, 'usuarios', i)
+            alta = _momento(rng, ctx)
+            yield {
+                'id': pk,
+                'password': ctx['password'],
+                'correo': f"usuario{pk}@escala.test",
+                'nombre': rng.choice(NOMBRES),
+                'apellido': rng.choice(APELLIDOS),
+                'telefono': f"6{rng.randrange(10 ** 7):07d}",
+                'rol_id': ctx['rol_residente'],
+                'residente_id': _id(ctx, 'residentes', (i - 1) % ctx['totales']['residentes'] + 1),
+                'is_active': True,
+                'date_joined': alta,
+                'actualizado': alta,
+            }
+    return {Usuario: filas()}
+
+
+def gen_vehiculos(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            pk = _id(ctx, 'vehiculos', i)
+            yield {
+                'id': pk,
+                'marca': rng.choice(MARCAS),
+                'modelo': f"Modelo {rng.randint(1, 50)}",
+                'matricula': f"ESC{ctx['semilla']}-{pk}",
+                'color': rng.choice(['Blanco', 'Negro', 'Gris', 'Rojo', 'Azul', 'Plata']),
+                'tipo': rng.choices(['COCHE', 'MOTO', 'BICICLETA', 'OTRO'], weights=[70, 20, 8, 2])[0],
+                'residente_id': _aleatorio(rng, ctx, 'residentes'),
+            }
+    return {Vehiculo: filas()}
+
+
+def gen_visitantes(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            llegada = _momento(rng, ctx)
+            yield {
+                'id': _id(ctx, 'visitantes', i),
+                'nombre': rng.choice(NOMBRES),
+                'apellidos': f"{rng.choice(APELLIDOS)} {rng.choice(APELLIDOS)}",
+                'dni': str(rng.randint(1000000, 9999999)),
+                'telefono': f"7{rng.randrange(10 ** 7):07d}",
+                'residente_id': _aleatorio(rng, ctx, 'residentes'),
+                'fecha_visita': llegada,
+                'hora_entrada': llegada,
+                'hora_salida': llegada + timedelta(minutes=rng.randint(15, 240)),
+            }
+    return {Visitante: filas()}
+
+
+def gen_reservas(rng, indices, ctx):
+    """Franjas de una hora sin solapamiento: (área, día, hora) sale del índice"""
+    areas = ctx['areas']
+    hoy = ctx['ahora'].date()
+
+    def filas():
+        for i in indices:
+            area_id, costo = areas[(i - 1) % len(areas)]
+            resto = (i - 1) // len(areas)
+            dia = ctx['fecha_reservas'] + timedelta(days=resto // 12)
+            hora = 8 + resto % 12
+            if dia < hoy:
+                estado = rng.choices(['finalizada', 'cancelada'], weights=[80, 20])[0]
+            else:
+                estado = rng.choices(['confirmada', 'pendiente', 'cancelada'], weights=[70, 25, 5])[0]
+            yield {
+                'id': _id(ctx, 'reservas', i),
+                'residente_id': _aleatorio(rng, ctx, 'residentes'),
+                'area_id': area_id,
+                'monto_total': costo or Decimal('0'),
+                'descripcion': 'Reserva generada para pruebas de escala',
+                'fecha_reserva': dia,
+                'hora_inicio': f"{hora:02d}:00:00",
+                'hora_fin': f"{hora + 1:02d}:00:00",
+                'estado': estado,
+            }
+    return {Reserva: filas()}
+
+
+def gen_facturas(rng, indices, ctx):
+    """Facturas con sus detalles y pagos, con monto_total igual a la suma"""
+    facturas, detalles, pagos = [], [], []
+    hoy = ctx['ahora'].date()
+    for i in indices:
+        pk = _id(ctx, 'facturas', i)
+        residente_id = _aleatorio(rng, ctx, 'residentes')
+        emision = hoy - timedelta(days=rng.randrange(730))
+        limite = emision + timedelta(days=30)
+        conceptos = rng.sample(ctx['conceptos'], min(len(ctx['conceptos']), rng.randint(3, DETALLES_POR_FACTURA)))
+        total = Decimal('0')
+        for k, (concepto_id, monto) in enumerate(conceptos):
+            total += monto
+            detalles.append({
+                'id': ctx['bases']['detalles'] + (i - 1) * DETALLES_POR_FACTURA + k + 1,
+                'factura_id': pk,
+                'concepto_id': concepto_id,
+                'monto': monto,
+            })
+        if limite < hoy:
+            estado = rng.choices(['pagada', 'vencida', 'cancelada'], weights=[70, 25, 5])[0]
+        else:
+            estado = rng.choices(['pendiente', 'pagada'], weights=[60, 40])[0]
+        emitida = datetime.combine(emision, datetime.min.time(), tzinfo=ctx['ahora'].tzinfo)
+        factura = {
+            'id': pk,
+            'residente_id': residente_id,
+            'monto_total': total,
+            'estado': estado,
+            'fecha_limite': limite,
+            'fecha_emision': emision,
+            'fecha_actualizacion': emitida,
+            'descripcion': f"Factura mensual - {emision.strftime('%m/%Y')}",
+        }
+        facturas.append(factura)
+        if estado == 'pagada':
+            pagado = emitida + timedelta(days=rng.randrange(30))
+            factura['fecha_actualizacion'] = pagado
+            pagos.append({
+                'id': ctx['bases']['pagos'] + i,
+                'factura_id': pk,
+                'residente_id': residente_id,
+                'monto': total,
+                'metodo_pago': rng.choice(['efectivo', 'transferencia', 'stripe']),
+                'estado': 'completado',
+                'fecha_creacion': pagado,
+                'fecha_actualizacion': pagado,
+                'referencia_pago': f"REF-{pk}",
+            })
+    return {Factura: facturas, DetalleFactura: detalles, Pago: pagos}
+
+
+def gen_bitacora(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            accion = rng.choice(ACCIONES)
+            ip = f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}"
+            yield {
+                'id': _id(ctx, 'bitacora', i),
+                'usuario_id': _aleatorio(rng, ctx, 'usuarios'),
+                'accion': accion,
+                'descripcion': f"{accion.title()} desde {ip}",
+                'ip': ip,
+                'fecha': _momento(rng, ctx),
+            }
+    return {Bitacora: filas()}
+
+
+def gen_logs_facial(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            conocido = rng.random() < 0.85
+            yield {
+                'id': _id(ctx, 'logs_facial', i),
+                'residente_id': _aleatorio(rng, ctx, 'residentes') if conocido else None,
+                'fecha_hora': _momento(rng, ctx),
+                'foto_ruta': f"https://picsum.photos/400/400?random={i}",
+                'descripcion': 'Reconocimiento facial exitoso' if conocido else 'No pertenece al residencial',
+                'coincidencia': round(rng.uniform(70, 99.9) if conocido else rng.uniform(0, 69), 3),
+            }
+    return {logReconocimiento: filas()}
+
+
+def gen_logs_placa(rng, indices, ctx):
+    def filas():
+        for i in indices:
+            conocido = rng.random() < 0.8
+            yield {
+                'id': _id(ctx, 'logs_placa', i),
+                'vehiculo_id': _aleatorio(rng, ctx, 'vehiculos') if conocido else None,
+                'fecha_hora': _momento(rng, ctx),
+                'foto_ruta': f"https://picsum.photos/640/480?random={i}",
+                'placa_detectada': f"{rng.randint(1000, 9999)}{''.join(rng.choices('ABCDEFGHJKLMNPRSTUVWXYZ', k=3))}",
+                'descripcion': 'Placa reconocida - Vehículo autorizado' if conocido else 'Placa no autorizada',
+                'confianza': round(rng.uniform(60, 99.9), 3),
+            }
+    return {logReconocimientoPlaca: filas()}
+
+
+GENERADORES = {
+    'residencias': gen_residencias,
+    'residentes': gen_residentes,
+    'usuarios': gen_usuarios,
+    'vehiculos': gen_vehiculos,
+    'visitantes': gen_visitantes,
+    'reservas': gen_reservas,
+    'facturas': gen_facturas,
+    'bitacora': gen_bitacora,
+    'logs_facial': gen_logs_facial,
+    'logs_placa': gen_logs_placa,
+}
+
+
+# ---------------------------------------------------------------------------
+# Ejecución
+# ---------------------------------------------------------------------------
+
+def _procesar_bloque(ejecucion, tabla, bloque, ctx):
+    """Genera y copia un bloque; se ejecuta en un proceso del pool"""
+    total = ctx['totales'][tabla]
+    indices = range(bloque * BLOQUE + 1, min((bloque + 1) * BLOQUE, total) + 1)
+    rng = random.Random(f"{ctx['semilla']}:{tabla}:{bloque}")
+    inicio = time.perf_counter()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM escala_progreso WHERE ejecucion = %s AND tabla = %s AND bloque = %s",
+            [ejecucion, tabla, bloque],
+        )
+        if cursor.fetchone():
+            return tabla, bloque, 0, 0.0
+        for modelo, filas in GENERADORES[tabla](rng, indices, ctx).items():
+            copiar(cursor, modelo, filas)
+        cursor.execute(
+            "INSERT INTO escala_progreso (ejecucion, tabla, bloque, filas) VALUES (%s, %s, %s, %s)",
+            [ejecucion, tabla, bloque, len(indices)],
+        )
+    return tabla, bloque, len(indices), time.perf_counter() - inicio
+
+
+class EscalaDataGenerator:
+    def __init__(self, factor=100, procesos=None, semilla=42, ejecucion=None):
+        self.factor = factor
+        self.procesos = procesos or os.cpu_count() or 2
+        self.semilla = semilla
+        self.ejecucion = ejecucion or f"escala-{factor}-s{semilla}"
+
+        print("🏗️ Generador de datos a escala (COPY)")
+        print("=" * 60)
+
+    def _contexto_nuevo(self):
+        """Parámetros fijos de la ejecución (se guardan para poder reanudar)"""
+        areas = list(AreaComun.objects.filter(requiere_reserva=True).values_list('id', 'costo_reserva'))
+        areas = areas or list(AreaComun.objects.values_list('id', 'costo_reserva'))
+        conceptos = list(ConceptoPago.objects.values_list('id', 'monto'))
+        if not areas or not conceptos:
+            raise RuntimeError("Se necesitan áreas comunes y conceptos de pago. Ejecuta primero populate_database.py")
+
+        bases = {}
+        for tabla, modelo in MODELOS.items():
+            pk = modelo._meta.pk.attname
+            bases[tabla] = modelo.objects.aggregate(m=Max(pk))['m'] or 0
+        ultima_reserva = Reserva.objects.aggregate(m=Max('fecha_reserva'))['m']
+        rol = Rol.objects.filter(nombre='Residente').values_list('id', flat=True).first()
+
+        return {
+            'semilla': self.semilla,
+            'factor': self.factor,
+            'ahora': timezone.now().replace(microsecond=0).isoformat(),
+            'bases': bases,
+            'totales': {tabla: base * self.factor for tabla, base in BASE.items()},
+            'areas': [[a, str(c) if c is not None else None] for a, c in areas],
+            'conceptos': [[c, str(m)] for c, m in conceptos],
+            'fecha_reservas': ((ultima_reserva or timezone.localdate()) + timedelta(days=1)).isoformat(),
+            'rol_residente': rol,
+            'password': make_password('password123'),
+        }
+
+    def _cargar_contexto(self):
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_ESTADO)
+            cursor.execute("SELECT parametros FROM escala_ejecucion WHERE nombre = %s", [self.ejecucion])
+            fila = cursor.fetchone()
+            if fila:
+                ctx = fila[0] if isinstance(fila[0], dict) else json.loads(fila[0])
+                if ctx['factor'] != self.factor or ctx['semilla'] != self.semilla:
+                    raise RuntimeError(
+                        f"La ejecución '{self.ejecucion}' ya existe con factor={ctx['factor']} "
+                        f"semilla={ctx['semilla']}; usa otro nombre con --ejecucion"
+                    )
+                print(f"🔁 Reanudando ejecución '{self.ejecucion}'")
+            else:
+                ctx = self._contexto_nuevo()
+                cursor.execute(
+                    "INSERT INTO escala_ejecucion (nombre, parametros) VALUES (%s, %s)",
+                    [self.ejecucion, json.dumps(ctx)],
+                )
+                print(f"🆕 Ejecución '{self.ejecucion}' registrada")
+
+        # Tipos Python para los generadores
+        ctx['ahora'] = datetime.fromisoformat(ctx['ahora'])
+        ctx['fecha_reservas'] = date.fromisoformat(ctx['fecha_reservas'])
+        ctx['areas'] = [(a, Decimal(c) if c is not None else None) for a, c in ctx['areas']]
+        ctx['conceptos'] = [(c, Decimal(m)) for c, m in ctx['conceptos']]
+        return ctx
+
+    def _pendientes(self, tablas, ctx):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT tabla, bloque FROM escala_progreso WHERE ejecucion = %s", [self.ejecucion]
+            )
+            hechos = set(cursor.fetchall())
+        tareas = []
+        for tabla in tablas:
+            bloques = -(-ctx['totales'][tabla] // BLOQUE)
+            tareas += [(tabla, b) for b in range(bloques) if (tabla, b) not in hechos]
+        return tareas
+
+    def _finalizar(self, ctx):
+        """Secuencias al máximo ID, conteo de residentes por residencia y libro de cuenta"""
+        modelos = list(MODELOS.values())
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), modelos):
+                cursor.execute(sql)
+            cursor.execute(
+                f"UPDATE {Residencia._meta.db_table} r SET num_residentes = c.n "
+                f"FROM (SELECT residencia_id, COUNT(*) AS n FROM {Residente._meta.db_table} "
+                f"WHERE residencia_id > %s GROUP BY residencia_id) c WHERE r.numero = c.residencia_id",
+                [ctx['bases']['residencias']],
+            )
+        self._asentar_libro(ctx)
+
+    def _asentar_libro(self, ctx):
+        """Cargos de las facturas y abonos de los pagos generados, en el libro de cuenta.
+
+        Igual que libro.sincronizar_facturas/abonar pero por rango de IDs, en
+        un statement por tipo; al reanudar no se repite nada (la factura ya
+        tiene cargo, el pago ya tiene abono).
+        """
+        movimientos = MovimientoCuenta._meta.db_table
+        with transaction.atomic():
+            cargos = libro._asentar(
+                f"""
+                SELECT f.residente_id, 'cargo', f.monto_total, f.id, NULL::bigint, 'Factura #' || f.id
+                FROM {Factura._meta.db_table} f
+                WHERE f.id > %s AND f.estado <> 'cancelada' AND f.monto_total <> 0
+                  AND NOT EXISTS (SELECT 1 FROM {movimientos} m WHERE m.factura_id = f.id AND m.tipo = 'cargo')
+                """,
+                [ctx['bases']['facturas']],
+            )
+            abonos = libro._asentar(
+                f"""
+                SELECT residente_id, 'abono', -monto, factura_id, id, 'Pago #' || id
+                FROM {Pago._meta.db_table}
+                WHERE id > %s AND estado = 'completado'
+                """,
+                [ctx['bases']['pagos']],
+            )
+        print(f"📒 Libro de cuenta: saldos de {cargos:,} residentes con cargos y {abonos:,} con abonos")
+
+    def ejecutar(self):
+        inicio = time.perf_counter()
+        ctx = self._cargar_contexto()
+        totales = ctx['totales']
+        print(f"📐 Factor {self.factor}x, semilla {self.semilla}, {self.procesos} procesos")
+        print(f"📋 Filas objetivo: {sum(totales.values()):,} (+ detalles y pagos de facturas)")
+
+        # Cada proceso hijo abre su propia conexión
+        connections.close_all()
+        contexto_mp = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto_mp) as pool:
+            for nivel in NIVELES:
+                tareas = self._pendientes(nivel, ctx)
+                connections.close_all()
+                if not tareas:
+                    print(f"⏭️  {', '.join(nivel)}: ya completado")
+                    continue
+                print(f"🚚 {', '.join(nivel)}: {len(tareas)} bloques")
+                futuros = [pool.submit(_procesar_bloque, self.ejecucion, t, b, ctx) for t, b in tareas]
+                for futuro in as_completed(futuros):
+                    tabla, bloque, filas, segundos = futuro.result()
+                    if filas:
+                        print(f"  ✅ {tabla}[{bloque}] {filas:,} filas en {segundos:.1f}s "
+                              f"({filas / max(segundos, 1e-6):,.0f} filas/s)")
+
+        self._finalizar(ctx)
+        print("=" * 60)
+        print(f"🎉 Ejecución '{self.ejecucion}' completada en {time.perf_counter() - inicio:.1f}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--factor', type=int, default=100, help='Multiplicador sobre el tamaño base')
+    parser.add_argument('--procesos', type=int, default=None, help='Procesos en paralelo (def: CPUs)')
+    parser.add_argument('--semilla', type=int, default=42, help='Semilla determinista')
+    parser.add_argument('--ejecucion', default=None, help='Nombre para reanudar una ejecución')
+    args = parser.parse_args(argv)
+
+    EscalaDataGenerator(
+        factor=args.factor, procesos=args.procesos, semilla=args.semilla, ejecucion=args.ejecucion
+    ).ejecutar()
+
+
+if __name__ == "__main__":
+    main()
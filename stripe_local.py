@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""
+Stripe local para desarrollo, pruebas y benchmarks (sin red ni cuenta de Stripe).
+
+Implementa lo que usa el backend de la API de PaymentIntents (crear, consultar,
+listar por fecha, confirmar y cancelar, respetando el header Idempotency-Key) y envía
+los webhooks firmados igual que Stripe (header Stripe-Signature, HMAC-SHA256).
+
+Uso:
+    python stripe_local.py --puerto 12111 \\
+        --webhook http://localhost:8000/api/stripe/webhook/ --secreto whsec_local
+
+y en el backend: STRIPE_API_BASE=http://localhost:12111 STRIPE_WEBHOOK_SECRET=whsec_local
+
+Con --fallos 0.2 el 20% de las peticiones responde 500 (para probar reintentos).
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import secrets
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+
+def firmar(payload, secreto, timestamp=None):
+    """Valor del header Stripe-Signature para ``payload`` (bytes)"""
+    timestamp = int(timestamp or time.time())
+    firmado = f'{timestamp}.'.encode() + payload
+    firma = hmac.new(secreto.encode(), firmado, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={firma}'
+
+
+def evento(tipo, objeto, evento_id=None):
+    return {
+        'id': evento_id or f'evt_{secrets.token_hex(12)}',
+        'object': 'event',
+        'api_version': '2024-06-20',
+        'created': int(time.time()),
+        'type': tipo,
+        'livemode': False,
+        'pending_webhooks': 1,
+        'data': {'object': objeto},
+    }
+
+
+def enviar_webhook(url, datos, secreto, timeout=10):
+    """POST firmado de un evento a ``url``; devuelve el código HTTP"""
+    payload = json.dumps(datos).encode()
+    peticion = urllib.request.Request(url, data=payload, method='POST', headers={
+        'Content-Type': 'application/json',
+        'Stripe-Signature': firmar(payload, secreto),
+    })
+    try:
+        with urllib.request.urlopen(peticion, timeout=timeout) as respuesta:
+            return respuesta.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def _formulario(cuerpo):
+    """Formulario de la librería de Stripe (metadata[clave]=valor) a dict"""
+    datos = {}
+    for clave, valor in parse_qsl(cuerpo, keep_blank_values=True):
+        if '[' in clave and clave.endswith(']'):
+            padre, hijo = clave[:-1].split('[', 1)
+            datos.setdefault(padre, {})[hijo] = valor
+        else:
+            datos[clave] = valor
+    return datos
+
+
+class EstadoLocal:
+    def __init__(self, webhook=None, secreto='whsec_local', fallos=0.0, latencia=0.0):
+        self.webhook = webhook
+        self.secreto = secreto
+        self.fallos = fallos
+        self.latencia = latencia
+        self.intents = {}
+        self.idempotencia = {}
+        self.bloqueo = threading.Lock()
+
+    def crear_intent(self, datos):
+        creado = int(time.time())
+        intent_id = f'pi_{secrets.token_hex(12)}'
+        intent = {
+            'id': intent_id,
+            'object': 'payment_intent',
+            'amount': int(datos.get('amount', 0)),
+            'amount_received': 0,
+            'currency': datos.get('currency', 'usd'),
+            'client_secret': f'{intent_id}_secret_{secrets.token_hex(8)}',
+            'created': creado,
+            'metadata': datos.get('metadata', {}),
+            'status': 'requires_payment_method',
+            'last_payment_error': None,
+            'livemode': False,
+        }
+        self.intents[intent_id] = intent
+        return intent
+
+    def confirmar(self, intent, exito=True):
+        if exito:
+            intent.update(status='succeeded', amount_received=intent['amount'], last_payment_error=None)
+            tipo = 'payment_intent.succeeded'
+        else:
+            intent.update(status='requires_payment_method',
+                          last_payment_error={'message': 'Tarjeta rechazada (Stripe local)'})
+            tipo = 'payment_intent.payment_failed'
+        if self.webhook:
+            datos = evento(tipo, dict(intent))
+            threading.Thread(target=enviar_webhook, args=(self.webhook, datos, self.secreto), daemon=True).start()
+        return intent
+
+    def listar(self, filtros):
+        limite = min(int(filtros.get('limit', 10)), 100)
+        intents = sorted(self.intents.values(), key=lambda i: (-i['created'], i['id']))
+        creado = filtros.get('created', {})
+        if 'gte' in creado:
+            intents = [i for i in intents if i['created'] >= int(creado['gte'])]
+        if 'lt' in creado:
+            intents = [i for i in intents if i['created'] < int(creado['lt'])]
+        if filtros.get('starting_after'):
+            ids = [i['id'] for i in intents]
+            if filtros['starting_after'] in ids:
+                intents = intents[ids.index(filtros['starting_after']) + 1:]
+        return {
+            'object': 'list',
+            'url': '/v1/payment_intents',
+            'data': intents[:limite],
+            'has_more': len(intents) > limite,
+        }
+
+
+class Manejador(BaseHTTPRequestHandler):
+    estado = None  # EstadoLocal, se asigna al crear el servidor
+
+    def log_message(self, formato, *args):
+        pass
+
+    def _responder(self, codigo, datos):
+        cuerpo = json.dumps(datos).encode()
+        self.send_response(codigo)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def _no_encontrado(self, mensaje='Recurso no encontrado'):
+        self._responder(404, {'error': {'type': 'invalid_request_error', 'message': mensaje}})
+
+    def _falla(self):
+        if self.estado.latencia:
+            time.sleep(self.estado.latencia)
+        if self.estado.fallos and random.random() < self.estado.fallos:
+            self._responder(500, {'error': {'type': 'api_error', 'message': 'Fallo simulado'}})
+            return True
+        return False
+
+    def do_GET(self):
+        if self._falla():
+            return
+        url = urlsplit(self.path)
+        partes = url.path.strip('/').split('/')
+        with self.estado.bloqueo:
+            if partes == ['v1', 'payment_intents']:
+                return self._responder(200, self.estado.listar(_formulario(url.query)))
+            if len(partes) == 3 and partes[:2] == ['v1', 'payment_intents']:
+                intent = self.estado.intents.get(partes[2])
+                return self._responder(200, intent) if intent else self._no_encontrado()
+        self._no_encontrado()
+
+    def do_POST(self):
+        if self._falla():
+            return
+        largo = int(self.headers.get('Content-Length') or 0)
+        datos = _formulario(self.rfile.read(largo).decode())
+        partes = urlsplit(self.path).path.strip('/').split('/')
+        clave = self.headers.get('Idempotency-Key')
+        with self.estado.bloqueo:
+            if clave and (clave, self.path) in self.estado.idempotencia:
+                return self._responder(200, self.estado.idempotencia[(clave, self.path)])
+            if partes == ['v1', 'payment_intents']:
+                respuesta = self.estado.crear_intent(datos)
+            elif len(partes) == 4 and partes[:2] == ['v1', 'payment_intents'] and partes[3] in ('confirm', 'cancel'):
+                intent = self.estado.intents.get(partes[2])
+                if intent is None:
+                    return self._no_encontrado()
+                if partes[3] == 'cancel':
+                    intent['status'] = 'canceled'
+                    respuesta = intent
+                else:
+                    respuesta = self.estado.confirmar(
+                        intent, exito=datos.get('payment_method') != 'pm_card_chargeDeclined'
+                    )
+            else:
+                return self._no_encontrado()
+            if clave:
+                self.estado.idempotencia[(clave, self.path)] = respuesta
+        self._responder(200, respuesta)
+
+
+def servidor(puerto=12111, **opciones):
+    """Servidor listo para ``serve_forever()`` (o para usar desde un hilo en pruebas)"""
+    manejador = type('ManejadorLocal', (Manejador,), {'estado': EstadoLocal(**opciones)})
+    return ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Stripe local (PaymentIntents + webhooks)')
+    parser.add_argument('--puerto', type=int, default=12111)
+    parser.add_argument('--webhook', help='URL del webhook del backend')
+    parser.add_argument('--secreto', default='whsec_local', help='Secreto para firmar los webhooks')
+    parser.add_argument('--fallos', type=float, default=0.0, help='Fracción de peticiones que responden 500')
+    parser.add_argument('--latencia', type=float, default=0.0, help='Segundos de espera por petición')
+    args = parser.parse_args()
+    srv = servidor(args.puerto, webhook=args.webhook, secreto=args.secreto,
+                   fallos=args.fallos, latencia=args.latencia)
+    print(f'💳 Stripe local en http://127.0.0.1:{args.puerto} (webhook: {args.webhook or "ninguno"})')
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass